@@ -0,0 +1,48 @@
+# Read throughput of concurrent SELECTs against one table, by thread count.
+# Readers share the table's read lock, so on a free-threaded CPython build
+# (python3.13t or later, PYTHON_GIL=0) throughput should grow with the number
+# of threads up to the number of cores; with the GIL it stays flat.
+import sys
+import threading
+from time import perf_counter
+import sql_compiler as sc
+from database import Database
+
+ROWS = 20000
+QUERIES_PER_THREAD = 50
+QUERY = "SELECT COUNT(*), AVG(b) FROM t WHERE a > 2000 AND b < 9000"
+
+def build_database() -> Database:
+    db = Database()
+    sc.SQLGenerator(db).execute_without_cursor("CREATE TABLE t (a INT, b FLOAT);")
+    db.get_table("t").add_rows([[i, i * 0.5] for i in range(ROWS)])
+    return db
+
+def run_readers(db: Database, threads: int) -> float:
+    # Queries per second with the given number of reader threads
+    generator = sc.SQLGenerator(db)
+    barrier = threading.Barrier(threads + 1)
+
+    def reader():
+        barrier.wait()
+        for _ in range(QUERIES_PER_THREAD):
+            generator.open_cursor(QUERY).fetchall()
+
+    workers = [threading.Thread(target=reader) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = perf_counter()
+    for worker in workers:
+        worker.join()
+    return threads * QUERIES_PER_THREAD / (perf_counter() - start)
+
+if __name__ == "__main__":
+    gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil_enabled else 'disabled'}")
+    db = build_database()
+    baseline = None
+    for threads in (1, 2, 4, 8):
+        throughput = run_readers(db, threads)
+        baseline = baseline or throughput
+        print(f"{threads} thread(s): {throughput:8.1f} queries/s ({throughput / baseline:.2f}x)")
@@ -0,0 +1,109 @@
+from contextlib import contextmanager
+from typing import Dict, List, Any, Tuple, Iterator, Iterable
+import gc
+import mmap
+import os
+import struct
+import wal
+
+# File layout: MAGIC, HEADER (log id, log offset, table count), then per table
+# its CREATE TABLE record, the number of indexes and a CREATE INDEX record for
+# each, and its rows as blocks of column-encoded values ending with an empty
+# block. Records and blocks are prefixed with their length.
+MAGIC = b'SQLCKPT1'
+HEADER = struct.Struct('<QQI')
+LENGTH = struct.Struct('<I')
+
+# Rows per block; a block is encoded (and decoded) in one go
+BLOCK_ROWS = 65536
+
+# A table read from a checkpoint: name, title, storage, [(column name, type name)],
+# [(index name, column name, method, options)] and its blocks of rows, a list of values per column
+CheckpointTable = Tuple[str, str, str, List[Tuple[str, str]], List[Tuple[str, str, str, Dict[str, float]]], Iterator[List[List[Any]]]]
+
+def write_checkpoint(path: str, tables: Iterable[Any], snapshot: Any, log_id: int = 0, log_offset: int = 0) -> None:
+    # Writes the rows of the tables visible to snapshot. log_id and log_offset
+    # tell which part of which write-ahead log the checkpoint covers. The file
+    # is written under a temporary name and renamed once synced, so path
+    # always holds a complete checkpoint.
+    tables = list(tables)
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(MAGIC + HEADER.pack(log_id, log_offset, len(tables)))
+        for table in tables:
+            _write_block(file, wal.create_table_record(table.name, table.title, table.storage,
+                                                       [(col.name, col.type.name) for col in table.columns]))
+            file.write(LENGTH.pack(len(table.indexes)))
+            for index in table.indexes.values():
+                _write_block(file, wal.create_index_record(index.name, table.name, table.columns[index.column_index].name, index.kind, index.settings()))
+            for start in range(0, table.version_count(), BLOCK_ROWS):
+                columns = table.slice_columns(start, start + BLOCK_ROWS, snapshot)
+                if columns[0]:
+                    _write_block(file, wal.encode_columns(columns, len(columns[0])))
+            file.write(LENGTH.pack(0))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+@contextmanager
+def read_checkpoint(path: str) -> Iterator[Tuple[int, int, Iterator[CheckpointTable]]]:
+    # Yields (log id, log offset, tables). The file is memory-mapped and each
+    # table's blocks are decoded as they are iterated, so they must be consumed
+    # before moving on to the next table. Raises ValueError if the file is not
+    # a checkpoint.
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size < len(MAGIC) + HEADER.size:
+            raise ValueError("not a checkpoint file")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(MAGIC)] != MAGIC:
+                raise ValueError("not a checkpoint file")
+            log_id, log_offset, table_count = HEADER.unpack_from(data, len(MAGIC))
+            yield log_id, log_offset, _read_tables(data, len(MAGIC) + HEADER.size, table_count)
+
+def _read_tables(data: mmap.mmap, offset: int, count: int) -> Iterator[CheckpointTable]:
+    def read_block() -> Tuple[int, int]:
+        # (start, length) of the next length-prefixed block
+        nonlocal offset
+        (length,) = LENGTH.unpack_from(data, offset)
+        start = offset + LENGTH.size
+        offset = start + length
+        return start, length
+
+    def blocks() -> Iterator[List[List[Any]]]:
+        while True:
+            start, length = read_block()
+            if not length:
+                return
+            yield wal.decode_columns(data, start)[0]
+
+    for _ in range(count):
+        start, length = read_block()
+        _, name, title, storage, columns = wal.decode_record(data[start:start + length])
+        (index_count,) = LENGTH.unpack_from(data, offset)
+        offset += LENGTH.size
+        indexes = []
+        for _ in range(index_count):
+            start, length = read_block()
+            _, index_name, _, column_name, method, options = wal.decode_record(data[start:start + length])
+            indexes.append((index_name, column_name, method, options))
+        table_blocks = blocks()
+        yield name, title, storage, columns, indexes, table_blocks
+        # Skips whatever the caller did not read
+        for _ in table_blocks:
+            pass
+
+@contextmanager
+def paused_gc() -> Iterator[None]:
+    # For bulk copies of whole tables: they create millions of row lists, which
+    # the cyclic garbage collector would otherwise traverse over and over
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+def _write_block(file: Any, block: bytes) -> None:
+    file.write(LENGTH.pack(len(block)))
+    file.write(block)
@@ -0,0 +1,151 @@
+from array import array
+from typing import Dict, List, Any, Optional, Iterable
+
+class NullBitmap:
+    # One bit per row, set when the row's value is NULL
+    def __init__(self):
+        self.bits = bytearray()
+        self.length = 0
+        self.null_count = 0
+
+    def append(self, is_null: bool) -> None:
+        if self.length % 8 == 0:
+            self.bits.append(0)
+        if is_null:
+            self.bits[self.length >> 3] |= 1 << (self.length & 7)
+            self.null_count += 1
+        self.length += 1
+
+    def extend(self, flags: List[bool]) -> None:
+        if any(flags):
+            for is_null in flags:
+                self.append(is_null)
+            return
+        # No NULLs: only zero bytes need to be added
+        self.length += len(flags)
+        self.bits.extend(bytes(((self.length + 7) >> 3) - len(self.bits)))
+
+    def is_null(self, i: int) -> bool:
+        return (self.bits[i >> 3] >> (i & 7)) & 1 == 1
+
+    def set(self, i: int, is_null: bool) -> None:
+        if self.is_null(i) == is_null:
+            return
+        self.bits[i >> 3] ^= 1 << (i & 7)
+        self.null_count += 1 if is_null else -1
+
+    def __len__(self) -> int:
+        return self.length
+
+class NumericColumn:
+    # INT/FLOAT values packed into an array.array; NULL slots hold 0
+    def __init__(self, typecode: str):
+        self.values = array(typecode)
+        self.nulls = NullBitmap()
+
+    def append(self, value: Any) -> None:
+        self.nulls.append(value is None)
+        self.values.append(0 if value is None else value)
+
+    def extend(self, values: List[Any]) -> None:
+        nulls = [value is None for value in values]
+        self.nulls.extend(nulls)
+        self.values.extend([0 if value is None else value for value in values] if any(nulls) else values)
+
+    def get(self, i: int) -> Any:
+        if self.nulls.null_count and self.nulls.is_null(i):
+            return None
+        return self.values[i]
+
+    def set(self, i: int, value: Any) -> None:
+        self.nulls.set(i, value is None)
+        self.values[i] = 0 if value is None else value
+
+    def to_list(self) -> List[Any]:
+        if not self.nulls.null_count:
+            return self.values.tolist()
+        bits = self.nulls.bits
+        return [None if (bits[i >> 3] >> (i & 7)) & 1 else value for i, value in enumerate(self.values)]
+
+    def take(self, positions: Iterable[int]) -> List[Any]:
+        # Values at the given row positions (a selection vector)
+        values = self.values
+        if not self.nulls.null_count:
+            return [values[i] for i in positions]
+        bits = self.nulls.bits
+        return [None if (bits[i >> 3] >> (i & 7)) & 1 else values[i] for i in positions]
+
+    def delete(self, positions: set) -> None:
+        values = self.to_list()
+        self.values = array(self.values.typecode)
+        self.nulls = NullBitmap()
+        for i, value in enumerate(values):
+            if i not in positions:
+                self.append(value)
+
+    def nbytes(self) -> int:
+        return self.values.itemsize * len(self.values) + len(self.nulls.bits)
+
+class DictionaryColumn:
+    # TEXT/DATE values stored as integer codes into a per-column dictionary
+    # of distinct strings; NULL slots hold code 0 and are marked in the bitmap
+    def __init__(self):
+        self.codes = array('i')
+        self.dictionary: List[str] = []
+        self.lookup: Dict[str, int] = {}
+        self.nulls = NullBitmap()
+
+    def encode(self, value: str) -> int:
+        code = self.lookup.get(value)
+        if code is None:
+            code = len(self.dictionary)
+            self.dictionary.append(value)
+            self.lookup[value] = code
+        return code
+
+    def append(self, value: Optional[str]) -> None:
+        self.nulls.append(value is None)
+        self.codes.append(0 if value is None else self.encode(value))
+
+    def extend(self, values: List[Optional[str]]) -> None:
+        self.nulls.extend([value is None for value in values])
+        encode = self.encode
+        self.codes.extend([0 if value is None else encode(value) for value in values])
+
+    def get(self, i: int) -> Optional[str]:
+        if self.nulls.null_count and self.nulls.is_null(i):
+            return None
+        return self.dictionary[self.codes[i]]
+
+    def set(self, i: int, value: Optional[str]) -> None:
+        self.nulls.set(i, value is None)
+        self.codes[i] = 0 if value is None else self.encode(value)
+
+    def to_list(self) -> List[Optional[str]]:
+        dictionary = self.dictionary
+        if not self.nulls.null_count:
+            return [dictionary[code] for code in self.codes]
+        bits = self.nulls.bits
+        return [None if (bits[i >> 3] >> (i & 7)) & 1 else dictionary[code] for i, code in enumerate(self.codes)]
+
+    def take(self, positions: Iterable[int]) -> List[Optional[str]]:
+        dictionary = self.dictionary
+        codes = self.codes
+        if not self.nulls.null_count:
+            return [dictionary[codes[i]] for i in positions]
+        bits = self.nulls.bits
+        return [None if (bits[i >> 3] >> (i & 7)) & 1 else dictionary[codes[i]] for i in positions]
+
+    def delete(self, positions: set) -> None:
+        # Re-encoding also drops dictionary entries no longer referenced
+        values = self.to_list()
+        self.codes = array('i')
+        self.dictionary = []
+        self.lookup = {}
+        self.nulls = NullBitmap()
+        for i, value in enumerate(values):
+            if i not in positions:
+                self.append(value)
+
+    def nbytes(self) -> int:
+        return self.codes.itemsize * len(self.codes) + len(self.nulls.bits)
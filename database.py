@@ -1,5 +1,85 @@
-from typing import Dict, List, Any, Optional, Union, Tuple
+from typing import Dict, List, Any, Optional, Union, Tuple, Callable, Iterable, Iterator
+from itertools import islice, compress, repeat, chain
+from array import array
+from bisect import bisect_right
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, ExitStack
+import threading
+import weakref
+import csv
+import os
+import struct
+import tempfile
+from math import log2
+from time import perf_counter
+import operator
 import sql_compiler as sc
+from indexes import HashIndex, OrderedIndex, BloomIndex, INDEX_METHODS
+from locks import ReadWriteLock
+from mvcc import VersionManager, Snapshot, NEVER
+import wal
+from wal import WriteAheadLog
+from checkpoint import read_checkpoint, write_checkpoint, paused_gc
+from columnar import NumericColumn, DictionaryColumn
+from pager import PageFile, BufferPool, PAGE_SIZE
+from zonemap import ZoneMap, ZoneFilter, ZoneTerm, MAY_MATCH
+from vectorized import BatchCompiler, NotVectorizable, BATCH_SIZE
+from executor import (RowSchema, Operator, SeqScan, IndexScan, OrderedIndexScan, ColumnarScan, Filter, Project, Limit,
+                      Sort, HashJoin, SortMergeJoin, IndexNestedLoopJoin, NestedLoopJoin, Cursor, HashAggregate,
+                      Gather, ParallelAggregate, column_reference, sort_key, aggregate_label, aggregate_rows,
+                      AGGREGATE_FUNCTIONS)
+
+# Comparison operators supported in WHERE clauses, mapped to their Python equivalents
+COMPARISON_OPERATORS = {
+    sc.TokenType.EQUALS: operator.eq,
+    sc.TokenType.NOT_EQUALS: operator.ne,
+    sc.TokenType.GREATER: operator.gt,
+    sc.TokenType.LESS: operator.lt,
+    sc.TokenType.GREATER_EQUALS: operator.ge,
+    sc.TokenType.LESS_EQUALS: operator.le,
+}
+
+ARITHMETIC_OPERATORS = {
+    sc.TokenType.PLUS: operator.add,
+    sc.TokenType.MINUS: operator.sub,
+    sc.TokenType.ASTERISK: operator.mul,
+}
+
+# "literal < column" is evaluated as "column > literal"
+SWAPPED_OPERATORS = {
+    sc.TokenType.GREATER: sc.TokenType.LESS,
+    sc.TokenType.LESS: sc.TokenType.GREATER,
+    sc.TokenType.GREATER_EQUALS: sc.TokenType.LESS_EQUALS,
+    sc.TokenType.LESS_EQUALS: sc.TokenType.GREATER_EQUALS,
+}
+
+NUMERIC_TYPES = (sc.TokenType.INT, sc.TokenType.FLOAT)
+
+# Parsers for CSV fields by column type; an empty field is NULL
+CSV_CONVERTERS = {
+    sc.TokenType.INT: int,
+    sc.TokenType.FLOAT: float,
+    sc.TokenType.TEXT: str,
+    sc.TokenType.DATE: str,
+}
+
+# Rows read from a CSV file and appended per batch by COPY ... FROM
+COPY_BATCH_SIZE = 10000
+
+# Parallel execution (Database.max_workers > 1): tables with fewer rows than
+# this are scanned serially, larger ones are split into morsels of MORSEL_SIZE rows
+PARALLEL_MIN_ROWS = 100000
+MORSEL_SIZE = 50000
+
+# Seconds between background vacuum runs, which reclaim dead row versions
+VACUUM_INTERVAL = 1.0
+
+# Default memory budget of the buffer pool caching the pages of PAGED tables
+BUFFER_POOL_SIZE = 64 * 1024 * 1024
+# Rows per batch when a PAGED table's data file is rewritten
+PAGED_REWRITE_BATCH = 10000
+STRING_TYPES = (sc.TokenType.TEXT, sc.TokenType.DATE)
 
 class ColumnDef:
     def __init__(self, name: str, data_type: sc.TokenType):
@@ -7,13 +87,69 @@ class ColumnDef:
         self.type = data_type
 
 class Table:
-    def __init__(self, name: str, columns: List[ColumnDef], title: Optional[str] = None):
+    # Row-oriented storage: each row version is a Python list in self.row_versions.
+    #
+    # Tables are multi-versioned. Every stored row version carries the version of
+    # the write that created it (self.created) and of the one that deleted it
+    # (self.deleted, NEVER while it is live); positions index all three. Writes
+    # only ever append versions and stamp deleted ones, so readers, which filter
+    # by their snapshot, never wait for writers. Vacuum removes the versions no
+    # snapshot can see any more.
+    storage = "ROW"
+
+    def __init__(self, name: str, columns: List[ColumnDef], title: Optional[str] = None, versions: Optional[VersionManager] = None):
         self.name = name
         self.title = title if title else name
         self.columns = columns
-        self.rows = []
-
-    def add_row(self, values: List[Any]) -> bool:
+        self.indexes: Dict[str, Union[HashIndex, OrderedIndex, BloomIndex]] = {}
+        self._init_storage()
+        # Per row group statistics that let scans skip groups; see zonemap.py
+        self.zone_map = ZoneMap(len(columns))
+        self.versions = versions if versions else VersionManager()
+        self.created = array('q')
+        self.deleted = array('q')
+        # Newest created stamp, and number of versions deleted or rolled back; while
+        # there are none of the latter, a snapshot newer than every stamp sees all rows
+        self.newest_version = 0
+        self.dead_versions = 0
+        self._live_rows = 0
+        # Shared by statements reading the table; exclusive for DDL and vacuum,
+        # which move rows and replace indexes
+        self.lock = ReadWriteLock()
+        # Held by the statement writing the table; writers take turns
+        self.write_lock = threading.Lock()
+
+    def _init_storage(self) -> None:
+        self.row_versions: List[List[Any]] = []
+
+    @contextmanager
+    def writing(self, commit: bool = True) -> Iterator[int]:
+        # Runs a write to this table: yields the version to stamp the changes
+        # with, which become visible together when the block exits. An exception
+        # rolls them back; so does calling rollback() inside the block. With
+        # commit=False the caller ends the version once the block is done.
+        with self.write_lock:
+            version = self.versions.begin_write()
+            try:
+                yield version
+            except BaseException:
+                self.rollback(version)
+                self.versions.end_write(version)
+                raise
+            if commit:
+                self.versions.end_write(version)
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        # For changes that move rows or replace indexes: waits for the running
+        # writer and readers, and keeps new ones out until done
+        with self.write_lock, self.lock.write_locked():
+            yield
+
+    def add_row(self, values: List[Any], version: Optional[int] = None) -> bool:
+        if version is None:
+            with self.writing() as version:
+                return self.add_row(values, version)
         if len(values) != len(self.columns):
             print(f"Error: Column count mismatch. Expected {len(self.columns)}, got {len(values)}")
             return False
@@ -21,9 +157,228 @@ class Table:
             if not self._validate_type(value, self.columns[i].type):
                 print(f"Error: Type mismatch for column '{self.columns[i].name}'. Expected {self.columns[i].type}, got {type(value)}")
                 return False
-        self.rows.append(values)
+        self._append_versions([values], version)
+        return True
+
+    def add_rows(self, rows: List[List[Any]], version: Optional[int] = None) -> bool:
+        # Bulk append: every row is checked before any is stored, so a bad
+        # row leaves the table unchanged
+        if version is None:
+            with self.writing() as version:
+                return self.add_rows(rows, version)
+        for row_number, values in enumerate(rows, 1):
+            if len(values) != len(self.columns):
+                print(f"Error: Column count mismatch in row {row_number}. Expected {len(self.columns)}, got {len(values)}")
+                return False
+        for i, col in enumerate(self.columns):
+            for row_number, values in enumerate(rows, 1):
+                if not self._validate_type(values[i], col.type):
+                    print(f"Error: Type mismatch for column '{col.name}' in row {row_number}. Expected {col.type}, got {type(values[i])}")
+                    return False
+        self._append_versions(rows, version)
         return True
 
+    def update_rows(self, changes: List[Tuple[int, List[Any]]], version: int) -> None:
+        # (position, new values) pairs: each old version is ended and the new one
+        # appended, so snapshots taken before the update still see the old rows
+        self.delete_rows([position for position, _ in changes], version)
+        self._append_versions([values for _, values in changes], version)
+
+    def delete_rows(self, positions: Iterable[int], version: int) -> None:
+        deleted = self.deleted
+        count = 0
+        for position in positions:
+            deleted[position] = version
+            count += 1
+        self.dead_versions += count
+        self._live_rows -= count
+
+    def rollback(self, version: int) -> None:
+        # Undoes a write: the rows it deleted come back, and the rows it created
+        # are stamped so that no snapshot sees them and vacuum removes them
+        created, deleted = self.created, self.deleted
+        for position in range(len(created)):
+            if deleted[position] == version:
+                deleted[position] = NEVER
+                self.dead_versions -= 1
+                self._live_rows += 1
+            if created[position] == version:
+                created[position] = NEVER
+                deleted[position] = 0
+                self.dead_versions += 1
+                self._live_rows -= 1
+
+    def _append_versions(self, rows: List[List[Any]], version: int) -> None:
+        # Data and index entries go in before the stamps: a reader only looks at
+        # positions that have stamps, and newest_version is raised first so that
+        # no reader takes the new rows for ones its snapshot sees
+        position = len(self.created)
+        self._append_rows(rows)
+        self.zone_map.extend(rows)
+        for index in self.indexes.values():
+            if len(rows) > position:
+                # Cheaper to rebuild than to add more keys than the index holds
+                index.build(self.column_values(index.column_index))
+            else:
+                for offset, values in enumerate(rows):
+                    index.add(values[index.column_index], position + offset)
+        self._stamp_versions(len(rows), version)
+
+    def load_columns(self, columns: List[List[Any]], version: int) -> None:
+        # Bulk append of values known to be valid, e.g. from a checkpoint, given
+        # as a list per column. Indexes are rebuilt, so create them afterwards.
+        self._append_columns(columns)
+        self.zone_map.extend_columns(columns, len(columns[0]))
+        for index in self.indexes.values():
+            index.build(self.column_values(index.column_index))
+        self._stamp_versions(len(columns[0]), version)
+
+    def _stamp_versions(self, count: int, version: int) -> None:
+        # Publishes the count row versions just appended
+        self.newest_version = max(self.newest_version, version)
+        self.deleted.extend(repeat(NEVER, count))
+        self.created.extend(repeat(version, count))
+        self._live_rows += count
+
+    def vacuum(self) -> int:
+        # Removes the row versions no snapshot can see any more, and rebuilds the
+        # indexes and zone map since the remaining rows move. Skipped while the table is being
+        # read or written, so vacuum never makes a statement wait.
+        # Returns the number of versions removed.
+        if not self.dead_versions or not self.write_lock.acquire(blocking=False):
+            return 0
+        try:
+            if not self.lock.try_acquire_write():
+                return 0
+            try:
+                if self.versions.is_pinned(self):
+                    return 0
+                horizon = self.versions.vacuum_horizon()
+                dead = {position for position, deleted in enumerate(self.deleted) if deleted < horizon}
+                if not dead:
+                    return 0
+                self._remove_rows(dead)
+                keep = [position not in dead for position in range(len(self.created))]
+                self.created = array('q', compress(self.created, keep))
+                self.deleted = array('q', compress(self.deleted, keep))
+                self.dead_versions -= len(dead)
+                for index in self.indexes.values():
+                    index.build(self.column_values(index.column_index))
+                self.zone_map.rebuild(self.stored_rows())
+                return len(dead)
+            finally:
+                self.lock.release_write()
+        finally:
+            self.write_lock.release()
+
+    def visibility(self, snapshot: Optional[Snapshot] = None) -> Tuple[int, Optional[Callable[[int], bool]]]:
+        # (number of positions to read, predicate on those positions telling
+        # whether snapshot sees the row version there); the predicate is None
+        # when it sees all of them. Without a snapshot, the latest committed
+        # state is read.
+        if snapshot is None:
+            snapshot = self.versions.latest()
+        count = len(self.created)
+        if not self.dead_versions and self.newest_version < snapshot.xmin:
+            return count, None
+        created, deleted, sees = self.created, self.deleted, snapshot.sees
+        return count, lambda position: sees(created[position]) and not sees(deleted[position])
+
+    def visible_positions(self, positions: Iterable[int], snapshot: Optional[Snapshot] = None) -> Iterator[int]:
+        count, visible = self.visibility(snapshot)
+        if visible is None:
+            return (position for position in positions if position < count)
+        return (position for position in positions if position < count and visible(position))
+
+    def live_ordinals(self, positions: List[int]) -> List[int]:
+        # Rank of each of the given live positions (ascending) among all live row
+        # versions. Ranks identify rows however dead versions are laid out, so
+        # the WAL uses them. Called by the table's writer.
+        if not self.dead_versions:
+            return list(positions)
+        deleted, ordinals = self.deleted, []
+        live = previous = 0
+        for position in positions:
+            live += deleted[previous:position].count(NEVER)
+            previous = position
+            ordinals.append(live)
+        return ordinals
+
+    def ordinal_positions(self, ordinals: List[int]) -> List[int]:
+        # Inverse of live_ordinals
+        if not self.dead_versions:
+            return list(ordinals)
+        live = list(compress(range(len(self.deleted)), map(NEVER.__eq__, self.deleted)))
+        return [live[ordinal] for ordinal in ordinals]
+
+    @property
+    def rows(self) -> List[List[Any]]:
+        return list(self.scan_rows())
+
+    def row_count(self) -> int:
+        # Live rows as of the latest write
+        return self._live_rows
+
+    def version_count(self) -> int:
+        # Stored row versions, live or not; positions range over these
+        return len(self.created)
+
+    def get_row(self, position: int) -> List[Any]:
+        return self.row_versions[position]
+
+    def get_value(self, position: int, col_idx: int) -> Any:
+        return self.row_versions[position][col_idx]
+
+    def scan_rows(self, snapshot: Optional[Snapshot] = None) -> Iterable[List[Any]]:
+        count, visible = self.visibility(snapshot)
+        rows = islice(self.row_versions, count)
+        return rows if visible is None else compress(rows, map(visible, range(count)))
+
+    def slice_rows(self, start: int, stop: int, snapshot: Optional[Snapshot] = None) -> List[List[Any]]:
+        count, visible = self.visibility(snapshot)
+        stop = min(stop, count)
+        rows = self.row_versions[start:stop]
+        return rows if visible is None else list(compress(rows, map(visible, range(start, stop))))
+
+    def slice_columns(self, start: int, stop: int, snapshot: Optional[Snapshot] = None) -> List[List[Any]]:
+        # Like slice_rows, as a list of values per column
+        rows = self.slice_rows(start, stop, snapshot)
+        return [list(values) for values in zip(*rows)] if rows else [[] for _ in self.columns]
+
+    def column_values(self, col_idx: int) -> Iterable[Any]:
+        # Values of every stored version, for building indexes
+        return (row[col_idx] for row in self.row_versions)
+
+    def stored_rows(self) -> Iterable[List[Any]]:
+        # Every stored version, live or not, in position order
+        return iter(self.row_versions)
+
+    def _append_rows(self, rows: List[List[Any]]) -> None:
+        self.row_versions.extend(rows)
+
+    def _append_columns(self, columns: List[List[Any]]) -> None:
+        self.row_versions.extend(map(list, zip(*columns)))
+
+    def _remove_rows(self, positions: set) -> None:
+        self.row_versions = [row for position, row in enumerate(self.row_versions) if position not in positions]
+
+    def create_index(self, name: str, col_idx: int, method: str = HashIndex.kind, options: Optional[Dict[str, Any]] = None) -> Union[HashIndex, OrderedIndex, BloomIndex]:
+        index = INDEX_METHODS[method](name, col_idx, **(options or {}))
+        index.build(self.column_values(col_idx))
+        self.indexes[name.lower()] = index
+        return index
+
+    def get_index_for_column(self, col_idx: int, ordered: bool = False) -> Optional[Union[HashIndex, OrderedIndex]]:
+        # Any index on the column that holds positions answers equality; range
+        # lookups need an ordered one
+        for index in self.indexes.values():
+            if index.column_index == col_idx and not isinstance(index, BloomIndex) and (not ordered or isinstance(index, OrderedIndex)):
+                return index
+        return None
+
+    def bloom_filters(self, col_idx: int) -> List[BloomIndex]:
+        return [index for index in self.indexes.values() if index.column_index == col_idx and isinstance(index, BloomIndex)]
+
     def _validate_type(self, value: Any, expected_type: sc.TokenType) -> bool:
         if value is None:
             return True
@@ -38,7 +393,9 @@ class Table:
             return isinstance(value, str)
         return False
 
-    def get_column_index(self, column_name: str) -> int:
+    def get_column_index(self, column_name: str, qualifier: Optional[str] = None) -> int:
+        if qualifier is not None and qualifier.lower() != self.name.lower():
+            return -1
         for i, col in enumerate(self.columns):
             if col.name.lower() == column_name.lower():
                 return i
@@ -51,24 +408,476 @@ class Table:
         header = [self.columns[i].name for i in columns]
         print(" | ".join(header))
         print("-" * (sum(len(h) for h in header) + 3 * (len(header) - 1)))
-        for row in self.rows:
+        for row in self.scan_rows():
             row_data = ["NULL" if row[i] is None else str(row[i]) for i in columns]
             print(" | ".join(row_data))
 
+class ColumnarTable(Table):
+    # Column-oriented storage: INT and FLOAT columns are packed into typed
+    # arrays, TEXT and DATE columns are dictionary encoded, and NULLs live in a
+    # per-column bitmap. Rows are assembled on demand, so self.rows is a
+    # read-only snapshot; changes must go through add_rows/update_rows/delete_rows.
+    storage = "COLUMNAR"
+
+    def _init_storage(self) -> None:
+        self.vectors = [self._new_vector(col.type) for col in self.columns]
+
+    @staticmethod
+    def _new_vector(data_type: sc.TokenType) -> Union[NumericColumn, DictionaryColumn]:
+        if data_type == sc.TokenType.INT:
+            return NumericColumn('q')
+        if data_type == sc.TokenType.FLOAT:
+            return NumericColumn('d')
+        return DictionaryColumn()
+
+    def get_row(self, position: int) -> List[Any]:
+        return [vector.get(position) for vector in self.vectors]
+
+    def get_value(self, position: int, col_idx: int) -> Any:
+        return self.vectors[col_idx].get(position)
+
+    def scan_rows(self, snapshot: Optional[Snapshot] = None) -> Iterable[List[Any]]:
+        # Rows are assembled one chunk at a time rather than decoding whole columns
+        count, visible = self.visibility(snapshot)
+        vectors = self.vectors
+        for start in range(0, count, BATCH_SIZE):
+            positions = range(start, min(start + BATCH_SIZE, count))
+            if visible is not None:
+                positions = list(filter(visible, positions))
+            yield from map(list, zip(*[vector.take(positions) for vector in vectors]))
+
+    def slice_rows(self, start: int, stop: int, snapshot: Optional[Snapshot] = None) -> List[List[Any]]:
+        return list(map(list, zip(*self.slice_columns(start, stop, snapshot))))
+
+    def slice_columns(self, start: int, stop: int, snapshot: Optional[Snapshot] = None) -> List[List[Any]]:
+        count, visible = self.visibility(snapshot)
+        positions = range(start, min(stop, count))
+        if visible is not None:
+            positions = list(filter(visible, positions))
+        return [vector.take(positions) for vector in self.vectors]
+
+    def column_values(self, col_idx: int) -> Iterable[Any]:
+        return self.vectors[col_idx].to_list()
+
+    def stored_rows(self) -> Iterable[List[Any]]:
+        vectors, count = self.vectors, self.version_count()
+        for start in range(0, count, BATCH_SIZE):
+            positions = range(start, min(start + BATCH_SIZE, count))
+            yield from map(list, zip(*[vector.take(positions) for vector in vectors]))
+
+    def _append_rows(self, rows: List[List[Any]]) -> None:
+        for vector, values in zip(self.vectors, zip(*rows)):
+            vector.extend(list(values))
+
+    def _append_columns(self, columns: List[List[Any]]) -> None:
+        for vector, values in zip(self.vectors, columns):
+            vector.extend(values)
+
+    def _remove_rows(self, positions: set) -> None:
+        for vector in self.vectors:
+            vector.delete(positions)
+
+    def _validate_type(self, value: Any, expected_type: sc.TokenType) -> bool:
+        if not super()._validate_type(value, expected_type):
+            return False
+        # INT columns are 64-bit signed integers in columnar storage
+        if expected_type == sc.TokenType.INT and value is not None:
+            return -2**63 <= value < 2**63
+        return True
+
+    def nbytes(self) -> int:
+        return sum(vector.nbytes() for vector in self.vectors)
+
+def _estimated_size(row: List[Any]) -> int:
+    # Rough encoded size of a row in a page; PageFile.write_page checks the real one
+    return sum(len(value) + 1 if isinstance(value, str) else 8 for value in row)
+
+class PagedTable(Table):
+    # Disk-backed storage for tables larger than memory: row versions are
+    # appended to the pages of a data file and read back through a buffer pool
+    # (shared with the database's other paged tables). Only the rows of the
+    # page being filled, the page directory and the version stamps stay in
+    # memory. The data file is scratch space; durability comes from the WAL
+    # and checkpoints like for the other storages.
+    storage = "PAGED"
+
+    def __init__(self, name: str, columns: List[ColumnDef], title: Optional[str] = None, versions: Optional[VersionManager] = None,
+                 pool: Optional[BufferPool] = None, directory: Optional[str] = None):
+        self.pool = pool if pool else BufferPool(BUFFER_POOL_SIZE)
+        self.directory = directory if directory else tempfile.gettempdir()
+        super().__init__(name, columns, title, versions)
+
+    def _init_storage(self) -> None:
+        self.pages = PageFile(self.directory, self.name.lower())
+        # First position of each extent of pages, and the extent's (first page, page count)
+        self.page_starts = array('q')
+        self.extents: List[Tuple[int, int]] = []
+        # Rows not yet written to a page, as (position of the first, rows). The
+        # tuple is replaced, never changed, when rows move to a page, so readers
+        # always see a consistent pair.
+        self._tail: Tuple[int, List[List[Any]]] = (0, [])
+        self._tail_sizes: List[int] = []
+
+    def get_row(self, position: int) -> List[Any]:
+        start, tail = self._tail
+        if position >= start:
+            return tail[position - start]
+        extent = bisect_right(self.page_starts, position) - 1
+        with self.pool.pinned(self.pages, *self.extents[extent]) as rows:
+            return rows[position - self.page_starts[extent]]
+
+    def get_value(self, position: int, col_idx: int) -> Any:
+        return self.get_row(position)[col_idx]
+
+    def scan_rows(self, snapshot: Optional[Snapshot] = None) -> Iterable[List[Any]]:
+        count, visible = self.visibility(snapshot)
+        return self._read(0, count, visible)
+
+    def slice_rows(self, start: int, stop: int, snapshot: Optional[Snapshot] = None) -> List[List[Any]]:
+        count, visible = self.visibility(snapshot)
+        return list(self._read(start, min(stop, count), visible))
+
+    def column_values(self, col_idx: int) -> Iterable[Any]:
+        return (row[col_idx] for row in self.stored_rows())
+
+    def stored_rows(self) -> Iterable[List[Any]]:
+        # Up to the end of the tail rather than version_count(): indexes are
+        # rebuilt from rows appended but not stamped yet
+        start, tail = self._tail
+        return self._read(0, start + len(tail), None)
+
+    def _layout(self) -> Tuple[Tuple[int, List[List[Any]]], PageFile, array, List[Tuple[int, int]]]:
+        # The tail is read first: pages are added to the directory before rows
+        # leave the tail, so every position before the tail is in a page already
+        return self._tail, self.pages, self.page_starts, self.extents
+
+    def _read(self, start: int, stop: int, visible: Optional[Callable[[int], bool]], layout: Optional[Tuple] = None) -> Iterator[List[Any]]:
+        # Rows at positions start..stop, a page at a time; each page is pinned
+        # while its rows are read
+        (tail_start, tail), pages, page_starts, extents = layout if layout else self._layout()
+        extent = max(bisect_right(page_starts, start) - 1, 0)
+        while extent < len(extents) and page_starts[extent] < min(stop, tail_start):
+            first = page_starts[extent]
+            frame = self.pool.pin(pages, *extents[extent])
+            try:
+                low, high = max(start, first), min(stop, first + len(frame.rows))
+                rows = islice(frame.rows, low - first, high - first)
+                yield from (rows if visible is None else compress(rows, map(visible, range(low, high))))
+            finally:
+                self.pool.unpin(frame)
+            extent += 1
+        if stop > tail_start:
+            low = max(start, tail_start)
+            rows = islice(tail, low - tail_start, stop - tail_start)
+            yield from (rows if visible is None else compress(rows, map(visible, range(low, stop))))
+
+    def _append_rows(self, rows: List[List[Any]]) -> None:
+        self._tail[1].extend(rows)
+        self._tail_sizes.extend(map(_estimated_size, rows))
+        if sum(self._tail_sizes) >= PAGE_SIZE:
+            self._write_pages()
+
+    def _append_columns(self, columns: List[List[Any]]) -> None:
+        self._append_rows(list(map(list, zip(*columns))))
+
+    def _write_pages(self) -> None:
+        # Moves the tail's rows to pages, as long as they fill one
+        start, tail = self._tail
+        sizes = self._tail_sizes
+        remaining = sum(sizes)
+        written = 0
+        while remaining >= PAGE_SIZE:
+            end, size = written, 0
+            while end < len(tail) and size + sizes[end] <= PAGE_SIZE:
+                size += sizes[end]
+                end += 1
+            first, pages, count = self.pages.write_page(tail[written:max(end, written + 1)])
+            self.extents.append((first, pages))
+            self.page_starts.append(start + written)
+            remaining -= sum(sizes[written:written + count])
+            written += count
+        self._tail = (start + written, tail[written:])
+        self._tail_sizes = sizes[written:]
+
+    def _remove_rows(self, positions: set) -> None:
+        # Rewrites the data file without the given rows (vacuum holds the table
+        # exclusively), streaming them from the old file to a new one
+        old = self._layout()
+        count = self.version_count()
+        self._init_storage()
+        batch = []
+        for position, row in enumerate(self._read(0, count, None, old)):
+            if position not in positions:
+                batch.append(row)
+                if len(batch) >= PAGED_REWRITE_BATCH:
+                    self._append_rows(batch)
+                    batch = []
+        self._append_rows(batch)
+        self.pool.discard(old[1])
+
+# Table implementations by the storage name used in CREATE TABLE ... USING <storage>
+TABLE_STORAGES = {
+    Table.storage: Table,
+    ColumnarTable.storage: ColumnarTable,
+    PagedTable.storage: PagedTable,
+}
+
+class ExpressionCompiler:
+    """Compiles condition/expression ASTs into closures that take a row.
+
+    Column names are resolved against the table once, at compile time, so the
+    per-row work is only the closure calls themselves. The closures follow the
+    semantics of Database._evaluate_condition/_evaluate_expression.
+    """
+
+    def __init__(self, table: Optional[Table] = None):
+        self.table = table
+
+    def compile_condition(self, condition: sc.ASTNode) -> Callable[[List[Any]], Any]:
+        if condition.type == sc.NodeType.CONDITION and 'operator' in condition.data:
+            op = condition.data['operator']
+            if op == sc.TokenType.AND:
+                left = self._compile_boolean(condition.data['left'])
+                right = self._compile_boolean(condition.data['right'])
+                return lambda row: left(row) and right(row)
+            if op == sc.TokenType.OR:
+                left = self._compile_boolean(condition.data['left'])
+                right = self._compile_boolean(condition.data['right'])
+                return lambda row: left(row) or right(row)
+            if op == sc.TokenType.NOT:
+                right = self._compile_boolean(condition.data['right'])
+                return lambda row: not right(row)
+            return self._compile_comparison(op, condition.data['left'], condition.data['right'])
+        # Not a comparison or logical operation: the expression value itself is the result
+        return self.compile_expression(condition)
+
+    def _compile_boolean(self, condition: sc.ASTNode) -> Callable[[List[Any]], bool]:
+        # Operands of AND/OR/NOT must be booleans; anything else counts as False
+        compiled = self.compile_condition(condition)
+        if condition.type == sc.NodeType.CONDITION:
+            return compiled
+        return lambda row: compiled(row) is True
+
+    def _compile_comparison(self, op: sc.TokenType, left_node: sc.ASTNode, right_node: sc.ASTNode) -> Callable[[List[Any]], bool]:
+        compare = COMPARISON_OPERATORS.get(op)
+        if compare is None:
+            print(f"Error: Unsupported operator: {op}")
+            return lambda row: False
+
+        # Fast path for the common "column <op> literal" shape: the types of both
+        # sides are known up front, so the per-row type check reduces to a NULL check
+        column_comparison = split_column_comparison(op, left_node, right_node, self.table)
+        if column_comparison is not None and column_comparison[2] is not None:
+            col_idx, op, value = column_comparison
+            compare = COMPARISON_OPERATORS[op]
+            col_type = self.table.columns[col_idx].type
+            if is_comparable(col_type, value):
+                return lambda row: row[col_idx] is not None and compare(row[col_idx], value)
+            print(f"Error: Type mismatch in comparison: {col_type} vs {type(value)}")
+            return lambda row: False
+
+        left = self.compile_expression(left_node)
+        right = self.compile_expression(right_node)
+
+        ordering = compare not in (operator.eq, operator.ne)
+
+        def comparison(row):
+            left_value = left(row)
+            right_value = right(row)
+            if type(left_value) != type(right_value) and not (isinstance(left_value, (int, float)) and isinstance(right_value, (int, float))):
+                return False
+            if ordering and left_value is None:
+                # NULLs only compare equal to each other; they have no order
+                return False
+            return compare(left_value, right_value)
+        return comparison
+
+    def _column_index(self, column_name: str, qualifier: Optional[str] = None) -> int:
+        if self.table is None:
+            return -1
+        return self.table.get_column_index(column_name, qualifier)
+
+    def compile_expression(self, expr: sc.ASTNode) -> Callable[[List[Any]], Any]:
+        reference = column_reference(expr)
+        if reference is not None:
+            qualifier, name = reference
+            col_idx = self._column_index(name, qualifier)
+            if col_idx != -1:
+                return operator.itemgetter(col_idx)
+            # Not a column of the table, so the identifier evaluates to its own name
+            return lambda row: name
+        elif expr.type == sc.NodeType.LITERAL:
+            value = expr.data['value']
+            return lambda row: value
+        elif expr.type == sc.NodeType.PARAMETER:
+            # Read at execution time: prepared statements bind values into the node
+            return lambda row: expr.data.get('value')
+        elif expr.type == sc.NodeType.FUNCTION_CALL:
+            # Aggregates are computed by the aggregation below the expression, which
+            # stores each result in a column named after the call
+            argument = expr.data['argument']
+            if argument is None or column_reference(argument) is not None:
+                col_idx = self._column_index(aggregate_label(expr))
+                if col_idx != -1:
+                    return operator.itemgetter(col_idx)
+            print(f"Error: Aggregate function {expr.data['name']} is not allowed here")
+            return lambda row: None
+        elif expr.type == sc.NodeType.EXPRESSION:
+            op = expr.data['operator']
+            left = self.compile_expression(expr.data['left'])
+            right = self.compile_expression(expr.data['right'])
+            if op == sc.TokenType.DIVIDE:
+                apply = _divide
+            elif op in ARITHMETIC_OPERATORS:
+                apply = ARITHMETIC_OPERATORS[op]
+            else:
+                print(f"Error: Unsupported operator: {op}")
+                return lambda row: None
+
+            def arithmetic(row):
+                left_value = left(row)
+                right_value = right(row)
+                if not isinstance(left_value, (int, float)) or not isinstance(right_value, (int, float)):
+                    print(f"Error: Invalid types for arithmetic operation {op}: {type(left_value)}, {type(right_value)}")
+                    return None
+                return apply(left_value, right_value)
+            return arithmetic
+        else:
+            print(f"Error: Unsupported expression type: {expr.type}")
+            return lambda row: None
+
+def split_column_comparison(op: sc.TokenType, left_node: sc.ASTNode, right_node: sc.ASTNode, table: Optional[Table]) -> Optional[Tuple[int, sc.TokenType, Any]]:
+    # Normalizes "column <op> literal" and "literal <op> column" into
+    # (column index, operator, value) with the column on the left
+    if table is None:
+        return None
+    left_reference = column_reference(left_node)
+    right_reference = column_reference(right_node)
+    if left_reference is not None and right_node.type == sc.NodeType.LITERAL:
+        col_idx = table.get_column_index(left_reference[1], left_reference[0])
+        if col_idx != -1:
+            return col_idx, op, right_node.data['value']
+    if left_node.type == sc.NodeType.LITERAL and right_reference is not None:
+        col_idx = table.get_column_index(right_reference[1], right_reference[0])
+        if col_idx != -1:
+            return col_idx, SWAPPED_OPERATORS.get(op, op), left_node.data['value']
+    return None
+
+def is_comparable(col_type: sc.TokenType, value: Any) -> bool:
+    return (isinstance(value, (int, float)) and col_type in NUMERIC_TYPES) or (isinstance(value, str) and col_type in STRING_TYPES)
+
+def _divide(left_value: Any, right_value: Any) -> Any:
+    if right_value == 0:
+        print("Error: Division by zero")
+        return None
+    return left_value / right_value
+
+def _filter_morsel(table_name: str, columns: List[ColumnDef], condition: sc.ASTNode, rows: List[List[Any]]) -> List[List[Any]]:
+    # Runs in a worker process. Compiled closures cannot be pickled, so the
+    # condition travels as an AST and is compiled here.
+    schema = RowSchema([table_name.lower()] * len(columns), columns)
+    return list(filter(ExpressionCompiler(schema).compile_condition(condition), rows))
+
+def _aggregate_morsel(table_name: str, columns: List[ColumnDef], condition: Optional[sc.ASTNode],
+                      group_indices: List[int], aggregates: List[Tuple[str, Optional[int]]], rows: List[List[Any]]) -> Dict[Tuple[Any, ...], List[Any]]:
+    # Runs in a worker process: filters the morsel and returns its partial aggregation
+    if condition is not None:
+        rows = _filter_morsel(table_name, columns, condition, rows)
+    return aggregate_rows(rows, group_indices, aggregates)
+
+def _autovacuum(database_ref: 'weakref.ReferenceType[Database]', closed: threading.Event, interval: float) -> None:
+    # Background vacuum thread; it only holds a weak reference, so it ends once
+    # the database is closed or garbage collected
+    while not closed.wait(interval):
+        db = database_ref()
+        if db is None:
+            return
+        db.vacuum()
+        del db
+
 class Database:
-    def __init__(self):
+    def __init__(self, max_workers: int = 1, vacuum_interval: Optional[float] = VACUUM_INTERVAL, log_path: Optional[str] = None,
+                 data_dir: Optional[str] = None, buffer_pool_size: int = BUFFER_POOL_SIZE):
         self.tables: Dict[str, Table] = {}
-
-    def create_table(self, name: str, columns: List[ColumnDef], title: Optional[str] = None) -> bool:
-        if name.lower() in self.tables:
-            print(f"Error: Table '{name}' already exists")
+        # Data files of PAGED tables go to data_dir, by default a temporary
+        # directory removed with the database; their pages are cached in the buffer pool
+        self.data_dir = data_dir
+        self._temporary_dir: Optional[tempfile.TemporaryDirectory] = None
+        self.buffer_pool = BufferPool(buffer_pool_size)
+        # Held while tables and indexes are created or dropped; statements only
+        # take the locks of the tables they use (see _reading and Table.writing)
+        self._catalog_lock = threading.Lock()
+        # Write versions and snapshots, shared by all tables
+        self.versions = VersionManager()
+        # Bumped whenever tables or indexes are created or dropped, so compiled
+        # statements know when their resolved tables/indexes may be stale
+        self.schema_version = 0
+        # Write-ahead log: with a log_path, every change made by a statement is
+        # appended to the log before it becomes visible, and the tables are
+        # rebuilt from the log (and the checkpoint it starts from, see
+        # checkpoint()) when the database is opened again
+        self.wal: Optional[WriteAheadLog] = None
+        if log_path is not None:
+            log_id = self._replay(log_path)
+            self.wal = WriteAheadLog(log_path, self.versions.end_writes, log_id)
+        # Worker processes for scans and aggregations over large tables; 1 runs everything serially
+        self.max_workers = max_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_workers = 0
+        # Background vacuum every vacuum_interval seconds; None turns it off
+        self._closed = threading.Event()
+        if vacuum_interval is not None:
+            threading.Thread(target=_autovacuum, args=(weakref.ref(self), self._closed, vacuum_interval), daemon=True).start()
+
+    def _worker_pool(self) -> ProcessPoolExecutor:
+        # Started on first use, and restarted if max_workers has changed since
+        if self._pool is None or self._pool_workers != self.max_workers:
+            self._shutdown_pool()
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            self._pool_workers = self.max_workers
+        return self._pool
+
+    def _shutdown_pool(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def close(self) -> None:
+        # Stops the background vacuum, shuts down the worker processes, if any
+        # were started, and closes the log
+        self._closed.set()
+        self._shutdown_pool()
+        if self.wal is not None:
+            self.wal.close()
+            self.wal = None
+
+    def create_table(self, name: str, columns: List[ColumnDef], title: Optional[str] = None, storage: str = Table.storage) -> bool:
+        if storage not in TABLE_STORAGES:
+            print(f"Error: Unsupported table storage '{storage}'. Expected one of: {', '.join(TABLE_STORAGES)}")
             return False
-        self.tables[name.lower()] = Table(name, columns, title)
+        with self._catalog_lock:
+            if name.lower() in self.tables:
+                print(f"Error: Table '{name}' already exists")
+                return False
+            if storage == PagedTable.storage:
+                table = PagedTable(name, columns, title, self.versions, self.buffer_pool, self._data_directory())
+            else:
+                table = TABLE_STORAGES[storage](name, columns, title, self.versions)
+            self.tables[name.lower()] = table
+            self.schema_version += 1
+            self._log_schema_change(wal.create_table_record(table.name, table.title, storage, [(col.name, col.type.name) for col in columns]))
         return True
     
+    def _data_directory(self) -> str:
+        if self.data_dir is not None:
+            return self.data_dir
+        if self._temporary_dir is None:
+            self._temporary_dir = tempfile.TemporaryDirectory(prefix="sqldb-")
+        return self._temporary_dir.name
+
     def get_schema(self) -> dict:
         schema_dict = {}
-        for table_name, table in self.tables.items():
+        for table_name, table in list(self.tables.items()):
             
            columns = []
            for idx, col in enumerate(table.columns):
@@ -90,7 +899,7 @@ class Database:
         schema_info = "Database Schema:\n"
         schema_info += "================\n\n"
 
-        for table_name, table in self.tables.items():
+        for table_name, table in list(self.tables.items()):
             
             schema_info += f"Table: {table.title} ({table.name})\n"
             schema_info += "-" * (len(f"Table: {table.title} ({table.name})")) + "\n"
@@ -110,22 +919,290 @@ class Database:
                data_type_str = str(col.type).replace('TokenType.', "")
                schema_info += f"{idx:<{widths[0]}} | {col.name:<{widths[1]}} | {data_type_str:<{widths[2]}}\n"
 
-            schema_info += f"\nTotal rows: {len(table.rows)}\n\n"
+            schema_info += f"\nTotal rows: {table.row_count()}\n"
+            schema_info += f"Storage: {table.storage}\n\n"
 
         return schema_info
 
 
 
     def drop_table(self, name: str) -> bool:
-        if name.lower() not in self.tables:
-            print(f"Error: Table '{name}' does not exist")
-            return False
-        del self.tables[name.lower()]
+        with self._catalog_lock:
+            table = self.tables.get(name.lower())
+            if not table:
+                print(f"Error: Table '{name}' does not exist")
+                return False
+            # Waits for statements still using the table
+            with table.exclusive():
+                del self.tables[name.lower()]
+            if isinstance(table, PagedTable):
+                self.buffer_pool.discard(table.pages)
+            self.schema_version += 1
+            self._log_schema_change(wal.drop_table_record(name))
         return True
     
     def get_table(self, name: str) -> Optional[Table]:
         return self.tables.get(name.lower())
-    
+
+    def create_index(self, index_name: str, table_name: str, column_name: str, method: str = HashIndex.kind,
+                     options: Optional[Dict[str, Any]] = None) -> bool:
+        table = self.get_table(table_name)
+        if not table:
+            print(f"Error: Table '{table_name}' not found")
+            return False
+        if method not in INDEX_METHODS:
+            print(f"Error: Unsupported index method '{method}'. Expected one of: {', '.join(INDEX_METHODS)}")
+            return False
+        for option, value in (options or {}).items():
+            if option not in INDEX_METHODS[method].options:
+                print(f"Error: Unsupported option '{option}' for index method '{method}'")
+                return False
+            # Every option so far is a probability
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 < value < 1:
+                print(f"Error: Index option '{option}' must be a number between 0 and 1, got {value!r}")
+                return False
+        col_idx = table.get_column_index(column_name)
+        if col_idx == -1:
+            print(f"Error: Column '{column_name}' not found in table '{table_name}'")
+            return False
+        with self._catalog_lock:
+            if self._find_index_table(index_name):
+                print(f"Error: Index '{index_name}' already exists")
+                return False
+            with table.exclusive():
+                index = table.create_index(index_name, col_idx, method, options)
+            self.schema_version += 1
+            self._log_schema_change(wal.create_index_record(index_name, table.name, table.columns[col_idx].name, method, index.settings()))
+        return True
+
+    def drop_index(self, index_name: str) -> bool:
+        with self._catalog_lock:
+            table = self._find_index_table(index_name)
+            if not table:
+                print(f"Error: Index '{index_name}' does not exist")
+                return False
+            with table.exclusive():
+                del table.indexes[index_name.lower()]
+            self.schema_version += 1
+            self._log_schema_change(wal.drop_index_record(index_name))
+        return True
+
+    def _find_index_table(self, index_name: str) -> Optional[Table]:
+        # Index names are unique across the whole database
+        for table in list(self.tables.values()):
+            if index_name.lower() in table.indexes:
+                return table
+        return None
+
+    def _log_schema_change(self, record: bytes) -> None:
+        # Called with the catalog lock held, so schema changes are logged in the
+        # order they are made, and each is durable before the next one starts
+        if self.wal is not None:
+            self.wal.wait(self.wal.append([record]))
+
+    @contextmanager
+    def _writing(self, table: Table) -> Iterator[Tuple[int, Optional[List[bytes]]]]:
+        # Runs a write statement on table: yields its version and, when there is
+        # a log, the list to add the statement's WAL records to. The records are
+        # appended while the table's write lock is still held, so they are in
+        # the order the writes were made. The changes then become visible once
+        # the log is synced; the lock is released meanwhile, and statements
+        # finishing during one fsync all share the next (group commit).
+        records: Optional[List[bytes]] = [] if self.wal is not None else None
+        lsn = None
+        with table.writing(commit=False) as version:
+            yield version, records
+            # Writes to a table dropped meanwhile are lost anyway
+            if records and self.tables.get(table.name.lower()) is table:
+                lsn = self.wal.append(records, version)
+                self.versions.settle(version)
+        if lsn is None:
+            self.versions.end_write(version)
+        else:
+            self.wal.wait(lsn)
+
+    def _replay(self, path: str) -> Optional[int]:
+        # Rebuilds the tables from the checkpoint the log starts from and the
+        # records in the log, oldest first. Returns the log's id, None if there
+        # is no log yet.
+        log_id, covered = None, 0
+        for offset, (kind, *fields) in wal.read_log(path):
+            if kind == wal.LOG_START:
+                log_id, checkpoint_path = fields
+                loaded = self._load(checkpoint_path) if checkpoint_path else None
+                # A checkpoint taken from this very log covers its records up
+                # to the offset it was taken at; the log was to be restarted
+                # after that, but the database stopped first
+                if loaded is not None and loaded[0] == log_id:
+                    covered = loaded[1]
+            elif offset <= covered:
+                continue
+            elif kind == wal.CREATE_TABLE:
+                name, title, storage, columns = fields
+                self.create_table(name, [ColumnDef(column_name, sc.TokenType[type_name]) for column_name, type_name in columns], title, storage)
+            elif kind == wal.DROP_TABLE:
+                self.drop_table(fields[0])
+            elif kind == wal.CREATE_INDEX:
+                self.create_index(*fields)
+            elif kind == wal.DROP_INDEX:
+                self.drop_index(fields[0])
+            else:
+                table = self.get_table(fields[0])
+                if not table:
+                    print(f"Error: Log record for unknown table '{fields[0]}'")
+                    continue
+                with table.writing() as version:
+                    if kind == wal.INSERT:
+                        table.add_rows(fields[1], version)
+                    elif kind == wal.UPDATE:
+                        table.update_rows(list(zip(table.ordinal_positions(fields[1]), fields[2])), version)
+                    else:
+                        table.delete_rows(table.ordinal_positions(fields[1]), version)
+        return log_id
+
+    def checkpoint(self, path: str) -> bool:
+        # Writes every table, with its indexes, to a binary checkpoint file that
+        # load() reads back far faster than statements can be replayed. Writers
+        # wait while it is taken; readers do not. With a log, the log is then
+        # restarted from the checkpoint, so it only holds later changes.
+        with self._catalog_lock, ExitStack() as stack:
+            tables = sorted(self.tables.values(), key=lambda table: table.name.lower())
+            for table in tables:
+                stack.enter_context(table.write_lock)
+            # No write is running now; the ones waiting for their fsync commit here
+            if self.wal is not None:
+                self.wal.flush()
+            log_id, log_offset = (self.wal.log_id, self.wal.size) if self.wal is not None else (0, 0)
+            try:
+                with paused_gc():
+                    write_checkpoint(path, tables, self.versions.latest(), log_id, log_offset)
+                if self.wal is not None:
+                    self.wal.restart(path)
+            except OSError as e:
+                print(f"Error: Checkpoint failed: {e}")
+                if os.path.exists(path + '.tmp'):
+                    os.remove(path + '.tmp')
+                return False
+        return True
+
+    def load(self, path: str) -> bool:
+        # Adds the tables in a checkpoint file written by checkpoint()
+        return self._load(path) is not None
+
+    def _load(self, path: str) -> Optional[Tuple[int, int]]:
+        # Returns the (log id, log offset) the checkpoint was taken at, None on error
+        try:
+            with paused_gc(), read_checkpoint(path) as (log_id, log_offset, tables):
+                for name, title, storage, columns, indexes, blocks in tables:
+                    if not self.create_table(name, [ColumnDef(column_name, sc.TokenType[type_name]) for column_name, type_name in columns], title, storage):
+                        return None
+                    table = self.get_table(name)
+                    with self._writing(table) as (version, log):
+                        for block in blocks:
+                            table.load_columns(block, version)
+                            if log is not None:
+                                log.append(wal.insert_columns_record(name, block, len(block[0])))
+                    for index_name, column_name, method, options in indexes:
+                        if not self.create_index(index_name, name, column_name, method, options):
+                            return None
+                return log_id, log_offset
+        except (OSError, ValueError, KeyError, struct.error) as e:
+            print(f"Error: Could not load checkpoint '{path}': {e}")
+            return None
+
+    def vacuum(self) -> int:
+        # Reclaims the row versions no snapshot can see any more, in every table
+        # not in use right now. Returns the number of versions removed.
+        return sum(table.vacuum() for table in list(self.tables.values()))
+
+    @contextmanager
+    def _table_locks(self, tables: Iterable[Table]) -> Iterator[None]:
+        # Readers share the locks of the tables they use, which only DDL and
+        # vacuum wait for. They are taken in name order, so two statements can
+        # never each hold a lock the other is waiting for.
+        with ExitStack() as stack:
+            for table in sorted(set(tables), key=lambda table: table.name.lower()):
+                stack.enter_context(table.lock.read_locked())
+            yield
+
+    @contextmanager
+    def _reading(self, tables: Iterable[Table]) -> Iterator[Snapshot]:
+        # Runs a read of the given tables: locks them and yields the snapshot the read sees
+        with self._table_locks(tables):
+            snapshot = self.versions.snapshot()
+            try:
+                yield snapshot
+            finally:
+                self.versions.release(snapshot)
+
+    def _select_tables(self, ast: sc.ASTNode) -> List[Table]:
+        # The tables a SELECT reads; unknown names are reported by the planner
+        nodes = ast.data.get('tables', []) + [join.data['table'] for join in ast.data.get('joins', [])]
+        return [table for table in (self.get_table(node.data['name']) for node in nodes) if table]
+
+    def import_csv(self, table_name: str, path: str, header: bool = False, batch_size: int = COPY_BATCH_SIZE) -> Optional[int]:
+        # Streams the file in batches of rows, so only one batch is held in memory
+        # besides the table itself. The rows become visible together when the
+        # import completes; on any error they are rolled back. With a log, the
+        # encoded batches are kept until then too, as they are only logged if the
+        # import succeeds. Returns the number of rows imported, or None on error.
+        table = self.get_table(table_name)
+        if not table:
+            print(f"Error: Table '{table_name}' not found")
+            return None
+        converters = [CSV_CONVERTERS[col.type] for col in table.columns]
+        with self._writing(table) as (version, log):
+            count = 0
+            try:
+                with open(path, newline='') as file:
+                    reader = csv.reader(file)
+                    if header:
+                        next(reader, None)
+                    while True:
+                        batch = []
+                        for record in islice(reader, batch_size):
+                            if len(record) != len(converters):
+                                raise ValueError(f"Column count mismatch at line {reader.line_num}. Expected {len(converters)}, got {len(record)}")
+                            try:
+                                batch.append([convert(field) if field != '' else None for convert, field in zip(converters, record)])
+                            except ValueError:
+                                raise ValueError(f"Invalid value at line {reader.line_num}: {record}")
+                        if not batch:
+                            break
+                        if not table.add_rows(batch, version):
+                            raise ValueError(f"Rows ending at line {reader.line_num} could not be added to '{table_name}'")
+                        if log is not None:
+                            log.append(wal.insert_record(table.name, batch))
+                        count += len(batch)
+            except (OSError, ValueError, csv.Error) as e:
+                print(f"Error: COPY failed: {e}")
+                table.rollback(version)
+                if log is not None:
+                    log.clear()
+                return None
+            return count
+
+    def export_csv(self, path: str, column_names: List[str], rows: Iterable[List[Any]], header: bool = False, batch_size: int = COPY_BATCH_SIZE) -> Optional[int]:
+        # Rows are pulled from the iterable and written one batch at a time, so a
+        # result set never has to fit in memory. NULLs are written as empty fields.
+        # Returns the number of rows written, or None on error.
+        count = 0
+        try:
+            with open(path, 'w', newline='') as file:
+                writer = csv.writer(file)
+                if header:
+                    writer.writerow(column_names)
+                rows = iter(rows)
+                while True:
+                    batch = [['' if value is None else value for value in row] for row in islice(rows, batch_size)]
+                    if not batch:
+                        break
+                    writer.writerows(batch)
+                    count += len(batch)
+        except OSError as e:
+            print(f"Error: COPY failed: {e}")
+            return None
+        return count
 
     def execute_query(self, ast: sc.ASTNode) -> Any: # Changed return type to Any to accommodate tuple for SELECT
         if ast.type == sc.NodeType.SELECT_STMT:
@@ -140,66 +1217,572 @@ class Database:
             return self._execute_create(ast)
         elif ast.type == sc.NodeType.DROP_STMT:
             return self._execute_drop(ast)
+        elif ast.type == sc.NodeType.CREATE_INDEX_STMT:
+            return self._execute_create_index(ast)
+        elif ast.type == sc.NodeType.DROP_INDEX_STMT:
+            return self._execute_drop_index(ast)
+        elif ast.type == sc.NodeType.EXPLAIN_STMT:
+            return self._execute_explain(ast)
+        elif ast.type == sc.NodeType.COPY_STMT:
+            return self._execute_copy(ast)
         else:
             print(f"Error: Unsupported query type: {ast.type}")
             return False
 
+    def open_cursor(self, ast: sc.ASTNode) -> Optional[Cursor]:
+        # Plans a SELECT without running it; the rows are produced as the caller
+        # fetches them. The cursor reads the snapshot taken when it was opened, so
+        # later changes never show up in its rows. The tables are read-locked
+        # during each fetch, not while the cursor is idle, and vacuum leaves them
+        # alone until the cursor is closed or exhausted.
+        if ast.type != sc.NodeType.SELECT_STMT:
+            print("Error: Cursors are only supported for SELECT statements")
+            return None
+        tables = self._select_tables(ast)
+        with self._table_locks(tables):
+            try:
+                plan = self._plan_select(ast)
+            except ValueError as e:
+                print(f"Error: {e}")
+                return None
+            if plan is None:
+                return None
+            snapshot = self.versions.snapshot(pinned=tables)
+        plan.use_snapshot(snapshot)
+        return Cursor(plan, lock=partial(self._table_locks, tables), release=partial(self.versions.release, snapshot))
+
+    def prepare(self, ast: sc.ASTNode, parameters: Optional[List[sc.ASTNode]] = None) -> 'PreparedStatement':
+        return PreparedStatement(self, ast, parameters or [])
+
+    def compile_query(self, ast: sc.ASTNode) -> Optional[Callable[[], Any]]:
+        # Resolves tables and columns and compiles expressions once; the returned
+        # function executes the statement and can be called repeatedly.
+        # None means the statement failed to compile (the error is printed).
+        compilers = {
+            sc.NodeType.SELECT_STMT: self._compile_select,
+            sc.NodeType.INSERT_STMT: self._compile_insert,
+            sc.NodeType.UPDATE_STMT: self._compile_update,
+            sc.NodeType.DELETE_STMT: self._compile_delete,
+        }
+        compile_statement = compilers.get(ast.type)
+        if compile_statement is None:
+            return lambda: self.execute_query(ast)
+        return compile_statement(ast)
+
     def _execute_select(self, ast: sc.ASTNode) -> Union[Tuple[List[str], List[List[Any]]], bool]: # Specify return type for SELECT
-        if not ast.data.get('tables', []):
-            print("Error: No table specified in SELECT statement")
+        run = self._compile_select(ast)
+        return run() if run else False
+
+    def _compile_select(self, ast: sc.ASTNode) -> Optional[Callable[[], Tuple[List[str], List[List[Any]]]]]:
+        tables = self._select_tables(ast)
+        try:
+            with self._table_locks(tables):
+                plan = self._plan_select(ast)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return None
+        if plan is None:
+            return None
+
+        def run() -> Tuple[List[str], List[List[Any]]]:
+            selected_column_names = plan.column_names
+            with self._reading(tables) as snapshot:
+                plan.use_snapshot(snapshot)
+                filtered_rows = list(plan.rows())
+
+            # Print what is being returned for debugging
+            print(f"DEBUG: _execute_select returning columns: {selected_column_names}, rows: {filtered_rows}")
+
+            # Return the column names and the filtered rows
+            return selected_column_names, filtered_rows
+        return run
+
+    def _execute_explain(self, ast: sc.ASTNode) -> Union[Tuple[List[str], List[List[Any]]], bool]:
+        # The plan is returned as a one-column result, one row per operator.
+        # EXPLAIN ANALYZE also runs the query and reports what each operator did.
+        statement = ast.data['statement']
+        if statement.type != sc.NodeType.SELECT_STMT:
+            print("Error: EXPLAIN is only supported for SELECT statements")
             return False
-        table_node = ast.data['tables'][0]
-        table_name = table_node.data['name']
-        table = self.get_table(table_name)
-        if not table:
-            print(f"Error: Table '{table_name}' not found")
+        tables = self._select_tables(statement)
+        try:
+            with self._table_locks(tables):
+                plan = self._plan_select(statement)
+        except ValueError as e:
+            print(f"Error: {e}")
             return False
-        selected_columns_indices = []
-        selected_column_names = [] # List to store selected column names for the header
-        if ast.data['columns'][0].data['name'] == '*':
-            selected_columns_indices = list(range(len(table.columns)))
-            selected_column_names = [col.name for col in table.columns] # Get all column names
+        if plan is None:
+            return False
+        if not ast.data.get('analyze'):
+            return ['QUERY PLAN'], [[line] for line in plan.explain()]
+        plan.instrument()
+        with self._reading(tables) as snapshot:
+            plan.use_snapshot(snapshot)
+            start = perf_counter()
+            rows_returned = sum(1 for _ in plan.rows())
+            execution_time = perf_counter() - start
+        lines = plan.explain(analyze=True)
+        lines.append(f"Rows examined: {plan.total_rows_read()}, rows returned: {rows_returned}")
+        lines.append(f"Execution time: {execution_time * 1000:.3f} ms")
+        return ['QUERY PLAN'], [[line] for line in lines]
+
+    def _plan_select(self, ast: sc.ASTNode) -> Optional[Project]:
+        # Builds the operator tree for a SELECT: one scan per table (with its part
+        # of the WHERE clause pushed down), joined left to right, aggregated,
+        # sorted, limited, then projected
+        if not ast.data.get('tables', []):
+            print("Error: No table specified in SELECT statement")
+            return None
+        tables = []
+        for table_node in ast.data['tables'] + [join.data['table'] for join in ast.data.get('joins', [])]:
+            table_name = table_node.data['name']
+            table = self.get_table(table_name)
+            if not table:
+                print(f"Error: Table '{table_name}' not found")
+                return None
+            if table in tables:
+                print(f"Error: Table '{table_name}' appears more than once in the query")
+                return None
+            tables.append(table)
+
+        where_clause = ast.data.get('where_clause')
+        if self._aggregate_calls([where_clause]):
+            print("Error: Aggregate functions are not allowed in WHERE")
+            return None
+        limit, offset = ast.data.get('limit'), ast.data.get('offset', 0)
+        limited = limit is not None or offset > 0
+        order_by = ast.data.get('order_by') or []
+        group_by = ast.data.get('group_by') or []
+        having = ast.data.get('having')
+        expressions = ast.data['columns'] + group_by + [having] + [item.data['expression'] for item in order_by]
+        aggregates = self._aggregate_calls(expressions)
+        aggregated = bool(aggregates or group_by or having)
+        parallel = None
+        if len(tables) == 1 and not ast.data.get('joins'):
+            source = None if aggregated else self._index_ordered_scan(tables[0], where_clause, order_by)
+            # A LIMIT without ORDER BY stops the scan early, and vectorized filters on
+            # columnar tables are cheaper than shipping rows, so those stay serial
+            filter_in_parallel = where_clause and (order_by or not limited) and not isinstance(tables[0], ColumnarTable)
+            if source is None and self._parallel_allowed(tables[0], where_clause) and (aggregated or filter_in_parallel):
+                parallel = (tables[0], where_clause)
+            if source is not None:
+                order_by = []
+            elif parallel and aggregated:
+                # The workers read the table themselves; see _plan_aggregate
+                source = None
+            elif parallel:
+                source = Gather(tables[0], self._worker_pool, self.max_workers,
+                                partial(_filter_morsel, tables[0].name, tables[0].columns, where_clause), MORSEL_SIZE,
+                                description=f"filter: {self._condition_text(where_clause)}", zone_filter=self._zone_filter(where_clause, tables[0]))
+            else:
+                referenced = self._referenced_columns(self._column_nodes(expressions), tables[0])
+                source = self._plan_scan(tables[0], where_clause, referenced, index_order=limited and not order_by and not aggregated)
         else:
-            for col_node in ast.data['columns']:
-                # Ensure we get the string name for column lookup
-                if col_node.type == sc.NodeType.IDENTIFIER:
-                     col_name = col_node.data['name']
-                elif col_node.type == sc.NodeType.EXPRESSION and col_node.data.get('operator') == sc.TokenType.DOT:
-                     # Handle table.column format in SELECT
-                     col_name = col_node.data['right'].data['name']
+            conditions = [join.data['condition'] for join in ast.data['joins']]
+            if where_clause:
+                conditions.append(where_clause)
+            source = self._plan_joins(tables, conditions)
+        if aggregated:
+            source = self._plan_aggregate(source, ast.data['columns'], group_by, aggregates, having, parallel)
+            if source is None:
+                return None
+        if order_by:
+            source = self._plan_sort(source, order_by, None if limit is None else offset + limit)
+            if source is None:
+                return None
+        if limited:
+            source = Limit(source, limit, offset)
+        return self._plan_projection(ast.data['columns'], source, tables)
+
+    def _plan_scan(self, table: Table, condition: Optional[sc.ASTNode], column_indices: Optional[List[int]] = None, index_order: bool = False) -> Operator:
+        # Access path for one table: an index scan when an index narrows the
+        # condition, a vectorized scan for columnar tables, a sequential scan otherwise.
+        # column_indices limits which columns a vectorized scan decodes; index_order
+        # (used under a LIMIT) streams index scans in index order instead of table order.
+        access = self._index_access(condition, table)
+        if access is not None:
+            return Filter(IndexScan(table, *access, index_order=index_order), ExpressionCompiler(table).compile_condition(condition), self._condition_text(condition))
+        if isinstance(table, ColumnarTable):
+            select = None
+            if condition:
+                try:
+                    select = BatchCompiler(table).compile_filter(condition)
+                except NotVectorizable:
+                    pass
+            if not condition or select is not None:
+                if column_indices is None:
+                    column_indices = list(range(len(table.columns)))
+                return ColumnarScan(table, select, column_indices, BATCH_SIZE, self._condition_text(condition) if condition else "",
+                                    self._zone_filter(condition, table))
+            scan = ColumnarScan(table, None, list(range(len(table.columns))), BATCH_SIZE, zone_filter=self._zone_filter(condition, table))
+        else:
+            scan = SeqScan(table, self._zone_filter(condition, table))
+        if not condition:
+            return scan
+        return Filter(scan, ExpressionCompiler(table).compile_condition(condition), self._condition_text(condition))
+
+    def _index_ordered_scan(self, table: Table, condition: Optional[sc.ASTNode], order_by: List[sc.ASTNode]) -> Optional[Operator]:
+        # ORDER BY one column, ascending, with an ordered index on it: reading the
+        # table in index order (NULLs last) makes the sort unnecessary, and a LIMIT
+        # can stop after offset + count rows. Not used when the WHERE clause has
+        # an index access path of its own.
+        if len(order_by) != 1 or order_by[0].data['descending'] or self._index_access(condition, table) is not None:
+            return None
+        reference = column_reference(order_by[0].data['expression'])
+        if reference is None:
+            return None
+        col_idx = table.get_column_index(reference[1], reference[0])
+        if col_idx == -1:
+            return None
+        return self._ordered_scan((table, condition), col_idx)
+
+    def _plan_sort(self, source: Operator, order_by: List[sc.ASTNode], limit: Optional[int]) -> Optional[Sort]:
+        # limit is the number of rows needed (offset + count) when there is a LIMIT
+        keys = []
+        for item in order_by:
+            if item.data['expression'].type == sc.NodeType.FUNCTION_CALL:
+                keys.append((source.schema.get_column_index(aggregate_label(item.data['expression'])), item.data['descending']))
+                continue
+            reference = column_reference(item.data['expression'])
+            if reference is None:
+                print(f"Error: Unsupported ORDER BY expression: {item.data['expression'].type}")
+                return None
+            col_idx = source.schema.get_column_index(reference[1], reference[0])
+            if col_idx == -1:
+                print(f"Error: Column '{reference[1]}' in ORDER BY not found")
+                return None
+            keys.append((col_idx, item.data['descending']))
+        return Sort(source, sort_key(keys), sc.SQLGenerator(self).generate_order_by(order_by), limit)
+
+    def _plan_aggregate(self, source: Optional[Operator], columns: List[sc.ASTNode], group_by: List[sc.ASTNode],
+                        aggregates: List[sc.ASTNode], having: Optional[sc.ASTNode],
+                        parallel: Optional[Tuple[Table, Optional[sc.ASTNode]]] = None) -> Optional[Operator]:
+        # Hash aggregation over the group columns, followed by the HAVING filter.
+        # Its rows hold the group columns, then one column per distinct aggregate call.
+        # With parallel (table, WHERE clause), worker processes filter and
+        # pre-aggregate morsels of the table and only their results are merged.
+        schema = RowSchema.for_table(parallel[0]) if parallel is not None else source.schema
+        group_indices = []
+        for expr in group_by:
+            reference = column_reference(expr)
+            if reference is None or reference[1] == '*':
+                print(f"Error: Unsupported GROUP BY expression: {expr.type}")
+                return None
+            col_idx = schema.get_column_index(reference[1], reference[0])
+            if col_idx == -1:
+                print(f"Error: Column '{reference[1]}' in GROUP BY not found")
+                return None
+            if col_idx not in group_indices:
+                group_indices.append(col_idx)
+
+        qualifiers = [schema.qualifiers[i] for i in group_indices]
+        output_columns = [schema.columns[i] for i in group_indices]
+        specs = []
+        labels = []
+        for call in aggregates:
+            name = call.data['name']
+            if name not in AGGREGATE_FUNCTIONS:
+                print(f"Error: Unsupported function: {name}")
+                return None
+            argument = call.data['argument']
+            if argument is None:
+                if name != 'COUNT':
+                    print(f"Error: {name}(*) is not supported")
+                    return None
+                arg_idx, result_type = None, sc.TokenType.INT
+            else:
+                reference = column_reference(argument)
+                if reference is None or reference[1] == '*':
+                    print(f"Error: {name} only accepts a column as its argument")
+                    return None
+                arg_idx = schema.get_column_index(reference[1], reference[0])
+                if arg_idx == -1:
+                    print(f"Error: Column '{reference[1]}' in {name} not found")
+                    return None
+                result_type = schema.columns[arg_idx].type
+                if name in ('SUM', 'AVG') and result_type not in NUMERIC_TYPES:
+                    print(f"Error: {name} requires a numeric column, got '{reference[1]}'")
+                    return None
+                if name == 'COUNT':
+                    result_type = sc.TokenType.INT
+                elif name == 'AVG':
+                    result_type = sc.TokenType.FLOAT
+            label = aggregate_label(call)
+            if label.lower() in (existing.lower() for existing in labels):
+                continue
+            specs.append((name, arg_idx))
+            labels.append(label)
+            qualifiers.append("")
+            output_columns.append(ColumnDef(label, result_type))
+        if parallel is not None:
+            table, condition = parallel
+            task = partial(_aggregate_morsel, table.name, table.columns, condition, group_indices, specs)
+            description = f"partial aggregate, filter: {self._condition_text(condition)}" if condition else "partial aggregate"
+            gather = Gather(table, self._worker_pool, self.max_workers, task, MORSEL_SIZE, flatten=False, description=description,
+                            zone_filter=self._zone_filter(condition, table))
+            aggregate = ParallelAggregate(gather, RowSchema(qualifiers, output_columns), group_indices, specs, labels)
+        else:
+            aggregate = HashAggregate(source, RowSchema(qualifiers, output_columns), group_indices, specs, labels)
+
+        for col_node in columns:
+            reference = column_reference(col_node)
+            if reference is None:
+                continue
+            if reference[1] == '*':
+                print("Error: SELECT * cannot be combined with GROUP BY or aggregate functions")
+                return None
+            if aggregate.schema.get_column_index(reference[1], reference[0]) == -1:
+                print(f"Error: Column '{reference[1]}' must appear in the GROUP BY clause or be used in an aggregate function")
+                return None
+        if having is None:
+            return aggregate
+        return Filter(aggregate, ExpressionCompiler(aggregate.schema).compile_condition(having), self._condition_text(having))
+
+    def _parallel_allowed(self, table: Table, condition: Optional[sc.ASTNode]) -> bool:
+        # Shipping morsels to worker processes costs a pickling round trip per
+        # row, so only large tables that would otherwise be scanned in full qualify
+        return self.max_workers > 1 and table.row_count() >= PARALLEL_MIN_ROWS and self._index_access(condition, table) is None
+
+    def _aggregate_calls(self, nodes: List[Optional[sc.ASTNode]]) -> List[sc.ASTNode]:
+        # FUNCTION_CALL nodes used anywhere in the given expressions and conditions
+        calls = []
+        for node in nodes:
+            if node is None:
+                continue
+            if node.type == sc.NodeType.FUNCTION_CALL:
+                calls.append(node)
+            elif node.type in (sc.NodeType.CONDITION, sc.NodeType.EXPRESSION):
+                calls.extend(self._aggregate_calls([node.data.get('left'), node.data.get('right')]))
+        return calls
+
+    def _column_nodes(self, nodes: List[Optional[sc.ASTNode]]) -> List[sc.ASTNode]:
+        # Column references used anywhere in the given expressions and conditions
+        found = []
+        for node in nodes:
+            if node is None:
+                continue
+            if column_reference(node) is not None:
+                found.append(node)
+            elif node.type == sc.NodeType.FUNCTION_CALL:
+                found.extend(self._column_nodes([node.data['argument']]))
+            elif node.type in (sc.NodeType.CONDITION, sc.NodeType.EXPRESSION):
+                found.extend(self._column_nodes([node.data.get('left'), node.data.get('right')]))
+        return found
+
+    def _plan_joins(self, tables: List[Table], conditions: List[sc.ASTNode]) -> Operator:
+        # The ON and WHERE conditions of an inner join are interchangeable, so they
+        # are split into conjuncts and each one is applied as early as possible:
+        # in the scan of the only table it references, or at the first join
+        # where all the tables it references are available.
+        conjuncts = []
+        pushed: Dict[str, List[sc.ASTNode]] = {table.name.lower(): [] for table in tables}
+        for condition in conditions:
+            for conjunct in self._conjuncts(condition):
+                referenced = self._referenced_tables(conjunct, tables)
+                if len(referenced) == 1:
+                    pushed[referenced.pop()].append(conjunct)
                 else:
-                     print(f"Error: Unsupported column reference in SELECT: {col_node.type}")
-                     return False
-
-                col_idx = table.get_column_index(col_name)
-                if col_idx == -1:
-                    print(f"Error: Column '{col_name}' not found in table '{table_name}'")
-                    return False
-                selected_columns_indices.append(col_idx)
-                selected_column_names.append(col_name) # Add the selected column name
-
-        filtered_rows = []
-        for row in table.rows:
-            if not ast.data.get('where_clause') or self._evaluate_condition(ast.data['where_clause'], table, row):
-                # Create a new list with only the selected columns for the filtered row
-                filtered_row_data = [row[i] for i in selected_columns_indices]
-                filtered_rows.append(filtered_row_data)
-
-        # Print what is being returned for debugging
-        print(f"DEBUG: _execute_select returning columns: {selected_column_names}, rows: {filtered_rows}")
-
-        # Return the column names and the filtered rows
-        return selected_column_names, filtered_rows
-
+                    conjuncts.append((conjunct, referenced))
+
+        first = (tables[0], self._combine_conjuncts(pushed[tables[0].name.lower()]))
+        plan = self._plan_scan(*first)
+        joined = {tables[0].name.lower()}
+        for table in tables[1:]:
+            joined.add(table.name.lower())
+            ready = [conjunct for conjunct, referenced in conjuncts if referenced <= joined]
+            conjuncts = [(conjunct, referenced) for conjunct, referenced in conjuncts if not referenced <= joined]
+            right = (table, self._combine_conjuncts(pushed[table.name.lower()]))
+            # Only the first input of the first join is still a plain table scan
+            plan = self._plan_join(plan, first if len(joined) == 2 else None, right, ready)
+        return plan
+
+    def _plan_join(self, left: Operator, left_source: Optional[Tuple[Table, Optional[sc.ASTNode]]],
+                   right_source: Tuple[Table, Optional[sc.ASTNode]], conditions: List[sc.ASTNode]) -> Operator:
+        # Picks the cheapest join strategy for the equality conditions between the
+        # two inputs; everything else is checked on the joined rows.
+        # left_source/right_source are (table, pushed-down condition) for inputs
+        # that are base tables, which lets them be read through an index instead.
+        right_table, right_condition = right_source
+        right = self._plan_scan(right_table, right_condition)
+        keys, residual = [], []
+        for condition in conditions:
+            key = self._equi_join_keys(condition, left.schema, right.schema)
+            if key is None:
+                residual.append(condition)
+            else:
+                keys.append((key[0], key[1], condition))
+        schema = left.schema.concat(right.schema)
+        text = self._condition_text(self._combine_conjuncts(conditions)) if conditions else ""
+
+        def with_residual(plan: Operator, extra: List[sc.ASTNode]) -> Operator:
+            remaining = self._combine_conjuncts(extra)
+            if remaining is None:
+                return plan
+            return Filter(plan, ExpressionCompiler(schema).compile_condition(remaining), self._condition_text(remaining))
+
+        if not keys:
+            predicate = ExpressionCompiler(schema).compile_condition(self._combine_conjuncts(residual)) if residual else None
+            return NestedLoopJoin(left, right, predicate, text)
+
+        left_keys = [left_key for left_key, _, _ in keys]
+        right_keys = [right_key for _, right_key, _ in keys]
+        left_rows = left.estimated_rows()
+        right_rows = right.estimated_rows()
+        # Rough per-row costs: a hash join reads both inputs and hashes the
+        # smaller one; a merge join sorts whatever is not already in key order;
+        # an index nested loop join probes the index once per left row
+        candidates = [(2 * min(left_rows, right_rows) + max(left_rows, right_rows),
+                       lambda: with_residual(HashJoin(left, right, left_keys, right_keys, text), residual))]
+
+        for i, (left_key, right_key, _) in enumerate(keys):
+            if not self._join_key_orderable(left.schema.columns[left_key].type, right.schema.columns[right_key].type):
+                continue
+            other_keys = [condition for j, (_, _, condition) in enumerate(keys) if j != i]
+            if len(keys) == 1:
+                left_sorted = self._ordered_scan(left_source, left_key) if left_source else None
+                right_sorted = self._ordered_scan(right_source, right_key)
+                merge_left = left_sorted or left
+                merge_right = right_sorted or right
+                cost = (merge_left.estimated_rows() if left_sorted else self._sort_cost(left_rows)) \
+                    + (merge_right.estimated_rows() if right_sorted else self._sort_cost(right_rows))
+                candidates.append((cost, lambda left_key=left_key, right_key=right_key, merge_left=merge_left, merge_right=merge_right, left_sorted=left_sorted, right_sorted=right_sorted:
+                                   with_residual(SortMergeJoin(merge_left, merge_right, left_key, right_key,
+                                                               left_sorted is not None, right_sorted is not None, text), residual)))
+            index = right_table.get_index_for_column(right_key)
+            if index is not None:
+                probe_cost = 1 if isinstance(index, HashIndex) else log2(right_table.row_count() + 1)
+                right_predicate = ExpressionCompiler(right_table).compile_condition(right_condition) if right_condition else None
+                candidates.append((left_rows * (probe_cost + 2),
+                                   lambda left_key=left_key, index=index, right_predicate=right_predicate, other_keys=other_keys:
+                                   with_residual(IndexNestedLoopJoin(left, right_table, index, left_key, right_predicate, text,
+                                                                     self._condition_text(right_condition) if right_condition else ""), other_keys + residual)))
+
+        return min(candidates, key=lambda candidate: candidate[0])[1]()
+
+    def _ordered_scan(self, source: Tuple[Table, Optional[sc.ASTNode]], col_idx: int) -> Optional[Operator]:
+        # Reads a base table in the order of an ordered index on col_idx, if it has one
+        table, condition = source
+        index = table.get_index_for_column(col_idx, ordered=True)
+        if index is None:
+            return None
+        scan = OrderedIndexScan(table, index)
+        if condition is None:
+            return scan
+        return Filter(scan, ExpressionCompiler(table).compile_condition(condition), self._condition_text(condition))
+
+    def _join_key_orderable(self, left_type: sc.TokenType, right_type: sc.TokenType) -> bool:
+        # Merge joins and index probes compare keys with < and >, which only works
+        # when both columns hold numbers or both hold strings
+        return (left_type in NUMERIC_TYPES and right_type in NUMERIC_TYPES) or (left_type in STRING_TYPES and right_type in STRING_TYPES)
+
+    def _sort_cost(self, rows: int) -> float:
+        return rows * log2(rows + 1)
+
+    def _equi_join_keys(self, condition: sc.ASTNode, left: RowSchema, right: RowSchema) -> Optional[Tuple[int, int]]:
+        # (left column, right column) for "a.x = b.y" with one side from each input
+        if condition.type != sc.NodeType.CONDITION or condition.data.get('operator') != sc.TokenType.EQUALS:
+            return None
+        references = [column_reference(condition.data['left']), column_reference(condition.data['right'])]
+        if None in references:
+            return None
+        schema = left.concat(right)
+        first, second = [schema.get_column_index(name, qualifier) for qualifier, name in references]
+        if first == -1 or second == -1:
+            return None
+        width = len(left.columns)
+        if first < width <= second:
+            return first, second - width
+        if second < width <= first:
+            return second, first - width
+        return None
+
+    def _plan_projection(self, columns: List[sc.ASTNode], source: Operator, tables: List[Table]) -> Optional[Project]:
+        schema = source.schema
+        if columns[0].type == sc.NodeType.IDENTIFIER and columns[0].data['name'] == '*':
+            selected_columns_indices = list(range(len(schema.columns)))
+            return Project(source, selected_columns_indices, [schema.column_label(i) for i in selected_columns_indices])
+        selected_columns_indices = []
+        selected_column_names = [] # List to store selected column names for the header
+        for col_node in columns:
+            if col_node.type == sc.NodeType.FUNCTION_CALL:
+                # Computed by the aggregation below
+                selected_columns_indices.append(schema.get_column_index(aggregate_label(col_node)))
+                selected_column_names.append(aggregate_label(col_node))
+                continue
+            reference = column_reference(col_node)
+            if reference is None:
+                print(f"Error: Unsupported column reference in SELECT: {col_node.type}")
+                return None
+            qualifier, col_name = reference
+            col_idx = schema.get_column_index(col_name, qualifier)
+            if col_idx == -1:
+                table_names = qualifier or ", ".join(table.name for table in tables)
+                print(f"Error: Column '{col_name}' not found in table '{table_names}'")
+                return None
+            selected_columns_indices.append(col_idx)
+            label = schema.column_label(col_idx)
+            selected_column_names.append(col_name if label == schema.columns[col_idx].name else label)
+        return Project(source, selected_columns_indices, selected_column_names)
+
+    def _referenced_columns(self, columns: List[sc.ASTNode], table: Table) -> Optional[List[int]]:
+        # Columns of the table used by the given column references; None means all of them
+        indices = []
+        for col_node in columns:
+            reference = column_reference(col_node)
+            if reference is None or reference[1] == '*':
+                return None
+            col_idx = table.get_column_index(reference[1], reference[0])
+            if col_idx == -1:
+                return None
+            if col_idx not in indices:
+                indices.append(col_idx)
+        return indices
+
+    def _referenced_tables(self, condition: sc.ASTNode, tables: List[Table]) -> set:
+        # Names of the tables whose columns the condition reads
+        referenced = set()
+        reference = column_reference(condition)
+        if reference is not None:
+            qualifier, name = reference
+            for table in tables:
+                if table.get_column_index(name, qualifier) != -1:
+                    referenced.add(table.name.lower())
+            return referenced
+        for key in ('left', 'right'):
+            child = condition.data.get(key)
+            if isinstance(child, sc.ASTNode):
+                referenced |= self._referenced_tables(child, tables)
+        return referenced
+
+    def _condition_text(self, condition: sc.ASTNode) -> str:
+        return sc.SQLGenerator(self).generate_condition(condition)
+
+    def _combine_conjuncts(self, conjuncts: List[sc.ASTNode]) -> Optional[sc.ASTNode]:
+        # Inverse of _conjuncts: ANDs the conditions back into one tree
+        if not conjuncts:
+            return None
+        condition = conjuncts[0]
+        for conjunct in conjuncts[1:]:
+            combined = sc.ASTNode(sc.NodeType.CONDITION)
+            combined.data['left'] = condition
+            combined.data['operator'] = sc.TokenType.AND
+            combined.data['right'] = conjunct
+            condition = combined
+        return condition
 
     def _execute_insert(self, ast: sc.ASTNode) -> bool:
+        run = self._compile_insert(ast)
+        return run() if run else False
+
+    def _compile_insert(self, ast: sc.ASTNode) -> Optional[Callable[[], bool]]:
         table_name = ast.data['table'].data['name']
         table = self.get_table(table_name)
         if not table:
             print(f"Error: Table '{table_name}' not found")
-            return False
+            return None
 
-        values_to_insert = [self._evaluate_expression(expr) for expr in ast.data['values']]
+        compiler = ExpressionCompiler()
+        rows = [[compiler.compile_expression(expr) for expr in row] for row in ast.data['rows']]
 
         if ast.data['columns']:
             column_indices = []
@@ -209,43 +1792,58 @@ class Database:
                     col_name = col_node.data['name']
                 else:
                     print(f"Error: Unsupported column reference in INSERT: {col_node.type}")
-                    return False
+                    return None
 
                 col_idx = table.get_column_index(col_name)
                 if col_idx == -1:
                     print(f"Error: Column '{col_name}' not found in table '{table_name}'")
-                    return False
+                    return None
                 column_indices.append(col_idx)
 
-            # Create a list with None for all columns, then fill in the specified ones
-            row_values = [None] * len(table.columns)
-            if len(column_indices) != len(values_to_insert):
-                 print(f"Error: Column and value count mismatch. Expected {len(column_indices)} values, got {len(values_to_insert)}")
-                 return False
-
-            for i, col_idx in enumerate(column_indices):
-                row_values[col_idx] = values_to_insert[i]
-
-            if not table.add_row(row_values):
-                return False
+            for values in rows:
+                if len(column_indices) != len(values):
+                    print(f"Error: Column and value count mismatch. Expected {len(column_indices)} values, got {len(values)}")
+                    return None
         else:
             # If no columns specified, assume values are in order of table columns
-            if len(values_to_insert) != len(table.columns):
-                 print(f"Error: Value count mismatch. Expected {len(table.columns)} values, got {len(values_to_insert)}")
-                 return False
-            if not table.add_row(values_to_insert):
-                return False
-
-        print("1 row inserted")
-        return True
+            for values in rows:
+                if len(values) != len(table.columns):
+                    print(f"Error: Value count mismatch. Expected {len(table.columns)} values, got {len(values)}")
+                    return None
+            column_indices = None
+
+        def run() -> bool:
+            rows_to_insert = [[evaluate(None) for evaluate in values] for values in rows]
+            if column_indices is not None:
+                # Create a list with None for all columns, then fill in the specified ones
+                for n, values_to_insert in enumerate(rows_to_insert):
+                    row_values = [None] * len(table.columns)
+                    for i, col_idx in enumerate(column_indices):
+                        row_values[col_idx] = values_to_insert[i]
+                    rows_to_insert[n] = row_values
+            with self._writing(table) as (version, log):
+                if len(rows_to_insert) == 1:
+                    if not table.add_row(rows_to_insert[0], version):
+                        return False
+                elif not table.add_rows(rows_to_insert, version):
+                    return False
+                if log is not None:
+                    log.append(wal.insert_record(table.name, rows_to_insert))
+            print("1 row inserted" if len(rows_to_insert) == 1 else f"{len(rows_to_insert)} rows inserted")
+            return True
+        return run
 
 
     def _execute_update(self, ast: sc.ASTNode) -> bool:
+        run = self._compile_update(ast)
+        return run() if run else False
+
+    def _compile_update(self, ast: sc.ASTNode) -> Optional[Callable[[], bool]]:
         table_name = ast.data['table'].data['name']
         table = self.get_table(table_name)
         if not table:
             print(f"Error: Table '{table_name}' not found")
-            return False
+            return None
         set_clauses = []
         for set_node in ast.data['set_clauses']:
             # Ensure we get the string name for column lookup
@@ -253,42 +1851,96 @@ class Database:
                 col_name = set_node.data['left'].data['name']
             else:
                 print(f"Error: Unsupported column reference in UPDATE SET clause: {set_node.data['left'].type}")
-                return False
+                return None
 
             col_idx = table.get_column_index(col_name)
             if col_idx == -1:
                 print(f"Error: Column '{col_name}' not found in table '{table_name}'")
-                return False
-            value = self._evaluate_expression(set_node.data['right'])
+                return None
+            # SET values may reference columns (e.g. salary = salary * 2), so they are evaluated per row
+            value = ExpressionCompiler(table).compile_expression(set_node.data['right'])
             set_clauses.append((col_idx, value))
-        rows_updated = 0
-        for row in table.rows:
-            if not ast.data.get('where_clause') or self._evaluate_condition(ast.data['where_clause'], table, row):
-                for col_idx, value in set_clauses:
-                    # Validate type before updating
-                    if not table._validate_type(value, table.columns[col_idx].type):
-                         print(f"Error: Type mismatch for column '{table.columns[col_idx].name}' during update. Expected {table.columns[col_idx].type}, got {type(value)}")
-                         return False
-                    row[col_idx] = value
-                rows_updated += 1
-        print(f"{rows_updated} row(s) updated")
-        return True
+        where_clause = ast.data.get('where_clause')
+        predicate = self._compile_where(where_clause, table)
+
+        def run() -> bool:
+            # Updated rows are written as new versions; rows are only changed if
+            # every new value is valid
+            changes = []
+            with self._writing(table) as (version, log):
+                for position in self._candidate_positions(where_clause, table):
+                    row = table.get_row(position)
+                    if predicate is None or predicate(row):
+                        new_row = list(row)
+                        # All SET expressions see the row as it was before this update
+                        for col_idx, evaluate in set_clauses:
+                            value = evaluate(row)
+                            # Validate type before updating
+                            if not table._validate_type(value, table.columns[col_idx].type):
+                                 print(f"Error: Type mismatch for column '{table.columns[col_idx].name}' during update. Expected {table.columns[col_idx].type}, got {type(value)}")
+                                 return False
+                            new_row[col_idx] = value
+                        changes.append((position, new_row))
+                if log is not None and changes:
+                    log.append(wal.update_record(table.name, table.live_ordinals([position for position, _ in changes]), [row for _, row in changes]))
+                table.update_rows(changes, version)
+            print(f"{len(changes)} row(s) updated")
+            return True
+        return run
 
     def _execute_delete(self, ast: sc.ASTNode) -> bool:
+        run = self._compile_delete(ast)
+        return run() if run else False
+
+    def _compile_delete(self, ast: sc.ASTNode) -> Optional[Callable[[], bool]]:
         table_name = ast.data['table'].data['name']
         table = self.get_table(table_name)
         if not table:
             print(f"Error: Table '{table_name}' not found")
+            return None
+        where_clause = ast.data.get('where_clause')
+        predicate = self._compile_where(where_clause, table)
+
+        def run() -> bool:
+            positions_to_delete = []
+            with self._writing(table) as (version, log):
+                for position in self._candidate_positions(where_clause, table):
+                    if predicate is None or predicate(table.get_row(position)):
+                        positions_to_delete.append(position)
+                if log is not None and positions_to_delete:
+                    log.append(wal.delete_record(table.name, table.live_ordinals(positions_to_delete)))
+                table.delete_rows(positions_to_delete, version)
+            rows_deleted = len(positions_to_delete)
+            print(f"{rows_deleted} row(s) deleted")
+            return True
+        return run
+
+    def _execute_copy(self, ast: sc.ASTNode) -> bool:
+        if ast.data['direction'] == "FROM":
+            copied = self.import_csv(ast.data['table'].data['name'], ast.data['path'], header=ast.data['header'])
+        elif 'query' in ast.data:
+            tables = self._select_tables(ast.data['query'])
+            with self._reading(tables) as snapshot:
+                try:
+                    plan = self._plan_select(ast.data['query'])
+                except ValueError as e:
+                    print(f"Error: {e}")
+                    return False
+                if plan is None:
+                    return False
+                plan.use_snapshot(snapshot)
+                copied = self.export_csv(ast.data['path'], plan.column_names, plan.rows(), header=ast.data['header'])
+        else:
+            table_name = ast.data['table'].data['name']
+            table = self.get_table(table_name)
+            if not table:
+                print(f"Error: Table '{table_name}' not found")
+                return False
+            with self._reading([table]) as snapshot:
+                copied = self.export_csv(ast.data['path'], [col.name for col in table.columns], table.scan_rows(snapshot), header=ast.data['header'])
+        if copied is None:
             return False
-        rows_to_keep = []
-        rows_deleted = 0
-        for row in table.rows:
-            if ast.data.get('where_clause') and not self._evaluate_condition(ast.data['where_clause'], table, row):
-                rows_to_keep.append(row)
-            else:
-                rows_deleted += 1
-        table.rows = rows_to_keep
-        print(f"{rows_deleted} row(s) deleted")
+        print(f"{copied} row(s) copied")
         return True
 
     def _execute_create(self, ast: sc.ASTNode) -> bool:
@@ -305,7 +1957,7 @@ class Database:
             col_type = col_node.data['data_type']
             columns.append(ColumnDef(col_name, col_type))
         title = ast.data.get('title')
-        if self.create_table(table_name, columns, title=title):
+        if self.create_table(table_name, columns, title=title, storage=ast.data.get('storage', Table.storage)):
             print(f"Table '{table_name}' created")
             return True
         return False
@@ -318,6 +1970,179 @@ class Database:
             return True
         return False
 
+    def _execute_create_index(self, ast: sc.ASTNode) -> bool:
+        index_name = ast.data['index'].data['name']
+        table_name = ast.data['table'].data['name']
+        if self.create_index(index_name, table_name, ast.data['column'].data['name'], ast.data.get('method', HashIndex.kind), ast.data.get('options')):
+            print(f"Index '{index_name}' created on '{table_name}'")
+            return True
+        return False
+
+    def _execute_drop_index(self, ast: sc.ASTNode) -> bool:
+        index_name = ast.data['index'].data['name']
+        if self.drop_index(index_name):
+            print(f"Index '{index_name}' dropped")
+            return True
+        return False
+
+    def _candidate_positions(self, where_clause: Optional[sc.ASTNode], table: Table) -> Iterable[int]:
+        # Positions of the live rows that may satisfy the WHERE clause, in table
+        # order. Called by writers, whose own new row versions are not included.
+        positions = self._index_lookup(where_clause, table)
+        if positions is None:
+            zone_filter = self._zone_filter(where_clause, table)
+            if zone_filter is None:
+                positions = range(table.version_count())
+            else:
+                ranges = zone_filter.ranges(table, table.version_count())[0]
+                positions = chain.from_iterable(range(start, stop) for start, stop in ranges)
+        return table.visible_positions(positions)
+
+    def _index_lookup(self, where_clause: Optional[sc.ASTNode], table: Table) -> Optional[List[int]]:
+        # Uses the table's indexes to narrow the WHERE clause down to a sorted list
+        # of row positions. None means no index applies and the table must be scanned.
+        # The full predicate is still evaluated against every returned row.
+        access = self._index_access(where_clause, table)
+        if access is None:
+            return None
+        return sorted(access[1]())
+
+    def _index_access(self, where_clause: Optional[sc.ASTNode], table: Table) -> Optional[Tuple[int, Callable[[], Iterable[int]], str]]:
+        # Returns (estimated row count, fetch function, index names) for the
+        # cheapest index access path, without materializing any positions yet
+        if not where_clause or not table.indexes or where_clause.type != sc.NodeType.CONDITION:
+            return None
+        if where_clause.data.get('operator') == sc.TokenType.OR:
+            left = self._index_access(where_clause.data['left'], table)
+            right = self._index_access(where_clause.data['right'], table)
+            if left is None or right is None:
+                return None
+            return left[0] + right[0], lambda: set(left[1]()) | set(right[1]()), f"{left[2]}, {right[2]}"
+
+        candidates = []
+        # Per column: [low, low_inclusive, high, high_inclusive] from range conjuncts
+        bounds: Dict[int, List[Any]] = {}
+        for conjunct in self._conjuncts(where_clause):
+            op = conjunct.data.get('operator') if conjunct.type == sc.NodeType.CONDITION else None
+            if op == sc.TokenType.OR:
+                access = self._index_access(conjunct, table)
+                if access is not None:
+                    candidates.append(access)
+                continue
+            if op not in COMPARISON_OPERATORS or op == sc.TokenType.NOT_EQUALS:
+                continue
+            if op == sc.TokenType.EQUALS:
+                access = self._parameter_index_access(conjunct, table)
+                if access is not None:
+                    candidates.append(access)
+                    continue
+            column_comparison = split_column_comparison(op, conjunct.data['left'], conjunct.data['right'], table)
+            if column_comparison is None:
+                continue
+            col_idx, op, value = column_comparison
+            if value is not None and not is_comparable(table.columns[col_idx].type, value):
+                # The predicate can never hold, so no row qualifies
+                return 0, lambda: [], "no index (condition is always false)"
+            if op == sc.TokenType.EQUALS:
+                index = table.get_index_for_column(col_idx)
+                if index is not None:
+                    # Positions are fetched when the plan runs, so a compiled plan sees later changes
+                    candidates.append((len(index.lookup(value)), lambda index=index, value=value: index.lookup(value), index.name))
+            elif value is not None and table.get_index_for_column(col_idx, ordered=True) is not None:
+                low, low_inclusive, high, high_inclusive = bounds.get(col_idx, [None, True, None, True])
+                if op in (sc.TokenType.GREATER, sc.TokenType.GREATER_EQUALS):
+                    inclusive = op == sc.TokenType.GREATER_EQUALS
+                    if low is None or value > low or (value == low and not inclusive):
+                        low, low_inclusive = value, inclusive
+                else:
+                    inclusive = op == sc.TokenType.LESS_EQUALS
+                    if high is None or value < high or (value == high and not inclusive):
+                        high, high_inclusive = value, inclusive
+                bounds[col_idx] = [low, low_inclusive, high, high_inclusive]
+
+        for col_idx, (low, low_inclusive, high, high_inclusive) in bounds.items():
+            index = table.get_index_for_column(col_idx, ordered=True)
+            start, stop = index.range_bounds(index.keys, low, low_inclusive, high, high_inclusive)
+            candidates.append((stop - start, lambda index=index, bounds=(low, low_inclusive, high, high_inclusive): index.iter_range(*bounds), index.name))
+
+        if not candidates:
+            return None
+        return min(candidates, key=lambda candidate: candidate[0])
+
+    def _parameter_index_access(self, condition: sc.ASTNode, table: Table) -> Optional[Tuple[int, Callable[[], Iterable[int]], str]]:
+        # Index access path for "column = <parameter>". The value is only known
+        # when the statement runs, so the estimate is the average rows per key.
+        left, right = condition.data['left'], condition.data['right']
+        if left.type == sc.NodeType.PARAMETER:
+            left, right = right, left
+        reference = column_reference(left)
+        if reference is None or right.type != sc.NodeType.PARAMETER:
+            return None
+        col_idx = table.get_column_index(reference[1], reference[0])
+        index = table.get_index_for_column(col_idx) if col_idx != -1 else None
+        if index is None:
+            return None
+        col_type = table.columns[col_idx].type
+
+        def fetch() -> List[int]:
+            value = right.data.get('value')
+            if value is not None and not is_comparable(col_type, value):
+                return []
+            return index.lookup(value)
+        return max(1, table.row_count() // max(1, index.distinct_count())), fetch, index.name
+
+    def _zone_filter(self, condition: Optional[sc.ASTNode], table: Table) -> Optional[ZoneFilter]:
+        # The conjuncts of condition comparing a column with a literal or a
+        # parameter, which scans check against the table's zone map; None if there
+        # are none
+        if not condition:
+            return None
+        terms, texts = [], []
+        for conjunct in self._conjuncts(condition):
+            op = conjunct.data.get('operator') if conjunct.type == sc.NodeType.CONDITION else None
+            if op not in MAY_MATCH:
+                continue
+            term = self._zone_term(op, conjunct.data['left'], conjunct.data['right'], table)
+            if term is not None:
+                terms.append(term)
+                texts.append(self._condition_text(conjunct))
+        return ZoneFilter(terms, " AND ".join(texts)) if terms else None
+
+    def _zone_term(self, op: sc.TokenType, left: sc.ASTNode, right: sc.ASTNode, table: Table) -> Optional[ZoneTerm]:
+        column_comparison = split_column_comparison(op, left, right, table)
+        if column_comparison is not None:
+            col_idx, op, value = column_comparison
+            if value is None or not is_comparable(table.columns[col_idx].type, value):
+                return None
+            return col_idx, op, lambda: value
+        if left.type == sc.NodeType.PARAMETER:
+            left, right, op = right, left, SWAPPED_OPERATORS.get(op, op)
+        reference = column_reference(left)
+        if reference is None or right.type != sc.NodeType.PARAMETER:
+            return None
+        col_idx = table.get_column_index(reference[1], reference[0])
+        if col_idx == -1:
+            return None
+        col_type = table.columns[col_idx].type
+
+        def operand() -> Any:
+            # Bound when the statement runs; a NULL or mismatched value prunes nothing
+            value = right.data.get('value')
+            return value if value is not None and is_comparable(col_type, value) else None
+        return col_idx, op, operand
+
+    def _conjuncts(self, condition: sc.ASTNode) -> List[sc.ASTNode]:
+        # Flattens nested ANDs into the list of conditions that must all hold
+        if condition.type == sc.NodeType.CONDITION and condition.data.get('operator') == sc.TokenType.AND:
+            return self._conjuncts(condition.data['left']) + self._conjuncts(condition.data['right'])
+        return [condition]
+
+    def _compile_where(self, where_clause: Optional[sc.ASTNode], table: Table) -> Optional[Callable[[List[Any]], Any]]:
+        # Compiled once per statement; None means there is no WHERE clause
+        if not where_clause:
+            return None
+        return ExpressionCompiler(table).compile_condition(where_clause)
+
     def _evaluate_condition(self, condition: sc.ASTNode, table: Table, row: List[Any]) -> Any: # Changed return type to Any for flexibility
         if condition.type == sc.NodeType.CONDITION:
             if 'operator' in condition.data and condition.data['operator'] == sc.TokenType.AND:
@@ -386,16 +2211,20 @@ class Database:
             return expr.data['name']
         elif expr.type == sc.NodeType.LITERAL:
             return expr.data['value']
+        elif expr.type == sc.NodeType.PARAMETER:
+            return expr.data.get('value')
         elif expr.type == sc.NodeType.EXPRESSION:
+            if expr.data['operator'] == sc.TokenType.DOT and table and row:
+                col_idx = table.get_column_index(expr.data['right'].data['name'], expr.data['left'].data['name'])
+                if col_idx != -1:
+                    return row[col_idx]
             left_value = self._evaluate_expression(expr.data['left'], table, row)
             if expr.data['operator'] == sc.TokenType.DOT:
                 right_value = self._evaluate_expression(expr.data['right'], table, row)
                 # Handle table.column notation - assuming left_value is table name string
                 if isinstance(left_value, str) and isinstance(right_value, str):
-                    # In a real scenario, you'd use left_value to find the table
-                    # For this in-memory DB, we'll just return the column name for now
-                    # This part might need adjustment depending on how you intend to use table.column in expressions
-                    return right_value # Returning the column name string
+                    # Not a column of the given table, so it evaluates to the column name
+                    return right_value
                 else:
                      print(f"Error: Invalid operands for DOT operator: {type(left_value)}, {type(right_value)}")
                      return None # Or raise an error
@@ -424,6 +2253,63 @@ class Database:
             print(f"Error: Unsupported expression type: {expr.type}")
             return None
 
+class PreparedStatement:
+    """A parsed statement that can be executed many times with different parameters.
+
+    Placeholders are written as ? (bound from a sequence, in order) or :name
+    (bound from a dict). Tables and columns are resolved, expressions compiled
+    and SELECT plans chosen once; execute() only stores the parameter values in
+    the statement's PARAMETER nodes and runs the compiled statement. The
+    statement is recompiled from its AST when tables or indexes change.
+    Executions from several threads take turns, since they share the
+    parameter nodes.
+    """
+
+    def __init__(self, db: Database, ast: sc.ASTNode, parameters: List[sc.ASTNode]):
+        self.db = db
+        self.ast = ast
+        self.parameters = parameters
+        self._run: Optional[Callable[[], Any]] = None
+        self._schema_version = -1
+        self._lock = threading.Lock()
+
+    def execute(self, params: Union[Tuple[Any, ...], List[Any], Dict[str, Any]] = ()) -> Any:
+        with self._lock:
+            if not self._bind(params):
+                return False
+            if self._run is None or self._schema_version != self.db.schema_version:
+                self._schema_version = self.db.schema_version
+                self._run = self.db.compile_query(self.ast)
+                if self._run is None:
+                    return False
+            return self._run()
+
+    def _bind(self, params: Union[Tuple[Any, ...], List[Any], Dict[str, Any]]) -> bool:
+        if isinstance(params, dict):
+            for parameter in self.parameters:
+                name = parameter.data.get('name')
+                if name is None:
+                    print("Error: Positional (?) parameters must be bound with a sequence of values")
+                    return False
+                if name not in params:
+                    print(f"Error: No value given for parameter ':{name}'")
+                    return False
+                parameter.data['value'] = params[name]
+        else:
+            if any('name' in parameter.data for parameter in self.parameters):
+                print("Error: Named (:name) parameters must be bound with a dict")
+                return False
+            if len(params) != len(self.parameters):
+                print(f"Error: Parameter count mismatch. Expected {len(self.parameters)}, got {len(params)}")
+                return False
+            for parameter, value in zip(self.parameters, params):
+                parameter.data['value'] = value
+        for parameter in self.parameters:
+            if not isinstance(parameter.data['value'], (int, float, str, type(None))):
+                print(f"Error: Unsupported parameter value type: {type(parameter.data['value'])}")
+                return False
+        return True
+
 class SQLGenerator:
     def __init__(self, db):
         self.db = db
@@ -568,12 +2454,11 @@ class SQLGenerator:
             sql += self.generate_column_list(ast.data['columns'])
             sql += ")"
 
-        sql += " VALUES ("
-        value_strs = []
-        for value in ast.data['values']:
-            value_strs.append(self.generate_expression(value))
-        sql += ", ".join(value_strs)
-        sql += ")"
+        sql += " VALUES "
+        row_strs = []
+        for row in ast.data['rows']:
+            row_strs.append("(" + ", ".join(self.generate_expression(value) for value in row) + ")")
+        sql += ", ".join(row_strs)
 
         return sql
 
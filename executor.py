@@ -0,0 +1,843 @@
+from collections import deque
+from contextlib import nullcontext
+from itertools import islice
+from operator import itemgetter
+from time import perf_counter
+import heapq
+import pickle
+import tempfile
+from typing import Dict, List, Any, Optional, Tuple, Callable, Iterator, Iterable, ContextManager
+import sql_compiler as sc
+from zonemap import split_ranges
+
+# Rows a Sort holds in memory before it spills a sorted run to a temporary file
+SORT_BUFFER_ROWS = 100000
+# Rows pickled together when a run is written, and read back together when merging
+SPILL_CHUNK_ROWS = 1000
+
+def column_reference(node: sc.ASTNode) -> Optional[Tuple[Optional[str], str]]:
+    # (table qualifier or None, column name) for "column" and "table.column" nodes
+    if node.type == sc.NodeType.IDENTIFIER:
+        return None, node.data['name']
+    if node.type == sc.NodeType.EXPRESSION and node.data.get('operator') == sc.TokenType.DOT:
+        return node.data['left'].data['name'], node.data['right'].data['name']
+    return None
+
+def aggregate_label(node: sc.ASTNode) -> str:
+    # Name of the column an aggregate's result is stored under, e.g. "SUM(salary)";
+    # expressions above the aggregation refer to the result by this name
+    argument = node.data['argument']
+    if argument is None:
+        return f"{node.data['name']}(*)"
+    qualifier, name = column_reference(argument)
+    return f"{node.data['name']}({qualifier}.{name})" if qualifier else f"{node.data['name']}({name})"
+
+def _combine_optional(combine: Callable[[Any, Any], Any]) -> Callable[[Any, Any], Any]:
+    # Combines two states where None means "no value seen yet"
+    return lambda left, right: right if left is None else (left if right is None else combine(left, right))
+
+# Aggregate functions as (initial state, step(state, value), combine(state, state), result(state)).
+# NULL values are skipped; COUNT(*) steps with a non-NULL value for every row.
+# combine merges the states of one group from two partial aggregations.
+AGGREGATE_FUNCTIONS = {
+    'COUNT': (0, lambda state, value: state if value is None else state + 1,
+              lambda left, right: left + right, lambda state: state),
+    'SUM': (None, lambda state, value: state if value is None else (value if state is None else state + value),
+            _combine_optional(lambda left, right: left + right), lambda state: state),
+    'AVG': ((0, 0), lambda state, value: state if value is None else (state[0] + value, state[1] + 1),
+            lambda left, right: (left[0] + right[0], left[1] + right[1]), lambda state: state[0] / state[1] if state[1] else None),
+    'MIN': (None, lambda state, value: state if value is None or (state is not None and state <= value) else value,
+            _combine_optional(min), lambda state: state),
+    'MAX': (None, lambda state, value: state if value is None or (state is not None and state >= value) else value,
+            _combine_optional(max), lambda state: state),
+}
+
+def aggregate_rows(rows: Iterable[List[Any]], group_indices: List[int], aggregates: List[Tuple[str, Optional[int]]]) -> Dict[Tuple[Any, ...], List[Any]]:
+    # Partial aggregation: the running state of every aggregate, per group key.
+    # Without group columns the whole input is one group, present even if empty.
+    functions = [AGGREGATE_FUNCTIONS[name] for name, _ in aggregates]
+    initial = [function[0] for function in functions]
+    steps = [(i, function[1], arg) for i, (function, (_, arg)) in enumerate(zip(functions, aggregates))]
+    groups: Dict[Tuple[Any, ...], List[Any]] = {}
+    if not group_indices:
+        groups[()] = list(initial)
+    for row in rows:
+        key = tuple([row[i] for i in group_indices])
+        states = groups.get(key)
+        if states is None:
+            states = groups[key] = list(initial)
+        for i, step, arg in steps:
+            states[i] = step(states[i], True if arg is None else row[arg])
+    return groups
+
+def combine_groups(groups: Dict[Tuple[Any, ...], List[Any]], partial: Dict[Tuple[Any, ...], List[Any]], aggregates: List[Tuple[str, Optional[int]]]) -> None:
+    # Merges the groups of a partial aggregation into groups
+    combines = [AGGREGATE_FUNCTIONS[name][2] for name, _ in aggregates]
+    for key, states in partial.items():
+        existing = groups.get(key)
+        if existing is None:
+            groups[key] = states
+        else:
+            groups[key] = [combine(left, right) for combine, left, right in zip(combines, existing, states)]
+
+def finish_groups(groups: Dict[Tuple[Any, ...], List[Any]], aggregates: List[Tuple[str, Optional[int]]]) -> Iterator[List[Any]]:
+    finishes = [AGGREGATE_FUNCTIONS[name][3] for name, _ in aggregates]
+    for key, states in groups.items():
+        yield list(key) + [finish(state) for finish, state in zip(finishes, states)]
+
+class RowSchema:
+    # Describes the rows flowing between operators: for every position in a row,
+    # the table it came from and its ColumnDef. Exposes the same column lookup
+    # interface as Table, so expressions can be compiled against it.
+    def __init__(self, qualifiers: List[str], columns: List[Any]):
+        self.qualifiers = qualifiers
+        self.columns = columns
+
+    @classmethod
+    def for_table(cls, table, column_indices: Optional[List[int]] = None) -> 'RowSchema':
+        if column_indices is None:
+            column_indices = list(range(len(table.columns)))
+        return cls([table.name.lower()] * len(column_indices), [table.columns[i] for i in column_indices])
+
+    def concat(self, other: 'RowSchema') -> 'RowSchema':
+        return RowSchema(self.qualifiers + other.qualifiers, self.columns + other.columns)
+
+    def get_column_index(self, column_name: str, qualifier: Optional[str] = None) -> int:
+        matches = [i for i, col in enumerate(self.columns)
+                   if col.name.lower() == column_name.lower()
+                   and (qualifier is None or self.qualifiers[i] == qualifier.lower())]
+        if len(matches) > 1:
+            raise ValueError(f"Column reference '{column_name}' is ambiguous")
+        return matches[0] if matches else -1
+
+    def has_table(self, table_name: str) -> bool:
+        return table_name.lower() in self.qualifiers
+
+    def column_label(self, i: int) -> str:
+        # Column names are qualified only when another table has a column of the same name
+        name = self.columns[i].name
+        if sum(1 for col in self.columns if col.name.lower() == name.lower()) > 1:
+            return f"{self.qualifiers[i]}.{name}"
+        return name
+
+class Operator:
+    """A physical plan node.
+
+    rows() returns an iterator over the operator's output, pulling from the
+    children on demand; schema describes the rows it yields.
+    """
+    name = "Operator"
+
+    def __init__(self, schema: RowSchema, children: Optional[List['Operator']] = None):
+        self.schema = schema
+        self.children = children or []
+        # Filled in by instrument() while the plan runs
+        self.rows_out = 0
+        self.elapsed = 0.0
+        # The snapshot table reads see (see use_snapshot); None reads the latest committed rows
+        self.snapshot = None
+
+    def rows(self) -> Iterator[List[Any]]:
+        raise NotImplementedError
+
+    def estimated_rows(self) -> int:
+        return self.children[0].estimated_rows() if self.children else 0
+
+    def describe(self) -> str:
+        return self.name
+
+    def rows_read(self) -> int:
+        # Rows this operator read from table storage itself, rather than from a child
+        return 0
+
+    def rows_in(self) -> int:
+        return self.rows_read() + sum(child.rows_out for child in self.children)
+
+    def total_rows_read(self) -> int:
+        return self.rows_read() + sum(child.total_rows_read() for child in self.children)
+
+    def use_snapshot(self, snapshot) -> None:
+        # Makes every operator of the plan read the tables as of snapshot; set
+        # before each run
+        self.snapshot = snapshot
+        for child in self.children:
+            child.use_snapshot(snapshot)
+
+    def instrument(self) -> None:
+        # For EXPLAIN ANALYZE: wraps rows() of this operator and its children so
+        # that each one counts the rows it produces and the time spent producing
+        # them, including the time spent in its children
+        for child in self.children:
+            child.instrument()
+        produce = self.rows
+
+        def timed_rows() -> Iterator[List[Any]]:
+            start = perf_counter()
+            iterator = produce()
+            self.elapsed += perf_counter() - start
+            while True:
+                start = perf_counter()
+                try:
+                    row = next(iterator)
+                except StopIteration:
+                    self.elapsed += perf_counter() - start
+                    return
+                self.elapsed += perf_counter() - start
+                self.rows_out += 1
+                yield row
+        self.rows = timed_rows
+
+    def explain(self, depth: int = 0, analyze: bool = False) -> List[str]:
+        # One line per operator, children indented below their parent. With
+        # analyze, the counters collected by instrument() are included.
+        line = "  " * depth + ("-> " if depth else "") + f"{self.describe()} (est. rows={self.estimated_rows()})"
+        if analyze:
+            own_time = self.elapsed - sum(child.elapsed for child in self.children)
+            line += f" (actual rows in={self.rows_in()} out={self.rows_out}, time={self.elapsed * 1000:.3f} ms, self={own_time * 1000:.3f} ms{self.analyze_details()})"
+        lines = [line]
+        for child in self.children:
+            lines.extend(child.explain(depth + 1, analyze))
+        return lines
+
+    def analyze_details(self) -> str:
+        # Operator-specific counters for EXPLAIN ANALYZE, appended to the actual figures
+        return ""
+
+class TableScan(Operator):
+    # Base of the operators that read a table in position order. With a zone
+    # filter (see zonemap.ZoneFilter), the row groups whose zone map rules out
+    # every row are not read at all.
+    def __init__(self, table, column_indices: Optional[List[int]] = None, zone_filter: Any = None):
+        super().__init__(RowSchema.for_table(table, column_indices))
+        self.table = table
+        self.zone_filter = zone_filter
+        self.row_groups = 0
+        self.row_groups_skipped = 0
+        self.row_groups_bloom_skipped = 0
+
+    def scan_ranges(self, count: int) -> List[Tuple[int, int]]:
+        # [start, stop) ranges of the first count positions that need reading
+        if self.zone_filter is None:
+            return [(0, count)] if count else []
+        ranges, groups, skipped, bloom_skipped = self.zone_filter.ranges(self.table, count)
+        self.row_groups += groups
+        self.row_groups_skipped += skipped
+        self.row_groups_bloom_skipped += bloom_skipped
+        return ranges
+
+    def describe_zone_filter(self) -> str:
+        return f", zone map: {self.zone_filter.description}" if self.zone_filter is not None else ""
+
+    def analyze_details(self) -> str:
+        if self.zone_filter is None:
+            return ""
+        details = f", row groups skipped={self.row_groups_skipped} of {self.row_groups}"
+        if self.row_groups_bloom_skipped:
+            details += f" ({self.row_groups_bloom_skipped} by Bloom filter)"
+        return details
+
+class SeqScan(TableScan):
+    name = "Seq Scan"
+
+    def __init__(self, table, zone_filter: Any = None):
+        super().__init__(table, zone_filter=zone_filter)
+
+    def describe(self) -> str:
+        return f"{self.name} on {self.table.name}{self.describe_zone_filter()}"
+
+    def rows_read(self) -> int:
+        return self.rows_out
+
+    def rows(self) -> Iterator[List[Any]]:
+        if self.zone_filter is None:
+            return iter(self.table.scan_rows(self.snapshot))
+        return self._pruned_rows()
+
+    def _pruned_rows(self) -> Iterator[List[Any]]:
+        # A row group at a time, so paged tables never hold more than that in memory
+        ranges = self.scan_ranges(self.table.version_count())
+        for start, stop in split_ranges(ranges, self.table.zone_map.group_size):
+            yield from self.table.slice_rows(start, stop, self.snapshot)
+
+    def estimated_rows(self) -> int:
+        return self.table.row_count()
+
+class IndexScan(Operator):
+    # Fetches the rows at the positions returned by an index access path, in table
+    # order; with index_order, in the order the index returns them, which lets a
+    # LIMIT stop reading index entries as soon as it has enough rows
+    name = "Index Scan"
+
+    def __init__(self, table, estimated: int, fetch: Callable[[], Iterable[int]], index_name: str, index_order: bool = False):
+        super().__init__(RowSchema.for_table(table))
+        self.table = table
+        self.estimated = estimated
+        self.fetch = fetch
+        self.index_name = index_name
+        self.index_order = index_order
+
+    def rows(self) -> Iterator[List[Any]]:
+        get_row = self.table.get_row
+        positions = self.fetch() if self.index_order else sorted(self.fetch())
+        return map(get_row, self.table.visible_positions(positions, self.snapshot))
+
+    def estimated_rows(self) -> int:
+        return self.estimated
+
+    def describe(self) -> str:
+        return f"{self.name} on {self.table.name} using {self.index_name}"
+
+    def rows_read(self) -> int:
+        return self.rows_out
+
+class OrderedIndexScan(Operator):
+    # Reads the whole table in the key order of an OrderedIndex, NULL keys last
+    name = "Ordered Index Scan"
+
+    def __init__(self, table, index):
+        super().__init__(RowSchema.for_table(table))
+        self.table = table
+        self.index = index
+
+    def rows(self) -> Iterator[List[Any]]:
+        get_row = self.table.get_row
+        positions = self.index.positions + self.index.null_positions
+        return map(get_row, self.table.visible_positions(positions, self.snapshot))
+
+    def estimated_rows(self) -> int:
+        return self.table.row_count()
+
+    def describe(self) -> str:
+        return f"{self.name} on {self.table.name} using {self.index.name}"
+
+    def rows_read(self) -> int:
+        return self.rows_out
+
+class ColumnarScan(TableScan):
+    # Scans a columnar table chunk by chunk. select (from BatchCompiler) turns a
+    # chunk into a selection vector; only the requested columns are decoded.
+    name = "Columnar Scan"
+
+    def __init__(self, table, select: Optional[Callable[[int, int], List[int]]], column_indices: List[int], batch_size: int, condition: str = "",
+                 zone_filter: Any = None):
+        super().__init__(table, column_indices, zone_filter)
+        self.select = select
+        self.column_indices = column_indices
+        self.batch_size = batch_size
+        self.condition = condition
+        self.rows_scanned = 0
+
+    def rows(self) -> Iterator[List[Any]]:
+        vectors = [self.table.vectors[i] for i in self.column_indices]
+        row_count, visible = self.table.visibility(self.snapshot)
+        for start, stop in split_ranges(self.scan_ranges(row_count), self.batch_size):
+            self.rows_scanned += stop - start
+            selection = range(start, stop) if self.select is None else self.select(start, stop)
+            if visible is not None:
+                selection = list(filter(visible, selection))
+            if not selection:
+                continue
+            yield from map(list, zip(*[vector.take(selection) for vector in vectors]))
+
+    def estimated_rows(self) -> int:
+        return self.table.row_count()
+
+    def describe(self) -> str:
+        description = f"{self.name} on {self.table.name}"
+        if self.condition:
+            description += f", vectorized filter: {self.condition}"
+        return description + self.describe_zone_filter()
+
+    def rows_read(self) -> int:
+        return self.rows_scanned
+
+class Filter(Operator):
+    name = "Filter"
+
+    def __init__(self, child: Operator, predicate: Callable[[List[Any]], Any], condition: str = ""):
+        super().__init__(child.schema, [child])
+        self.predicate = predicate
+        self.condition = condition
+
+    def rows(self) -> Iterator[List[Any]]:
+        return filter(self.predicate, self.children[0].rows())
+
+    def describe(self) -> str:
+        return f"{self.name}: {self.condition}"
+
+class Project(Operator):
+    name = "Project"
+
+    def __init__(self, child: Operator, column_indices: List[int], column_names: List[str]):
+        super().__init__(RowSchema([child.schema.qualifiers[i] for i in column_indices],
+                                   [child.schema.columns[i] for i in column_indices]), [child])
+        self.column_indices = column_indices
+        self.column_names = column_names
+
+    def rows(self) -> Iterator[List[Any]]:
+        indices = self.column_indices
+        return ([row[i] for i in indices] for row in self.children[0].rows())
+
+    def describe(self) -> str:
+        return f"{self.name}: {', '.join(self.column_names)}"
+
+class Limit(Operator):
+    # Skips offset rows, then passes on at most count rows (all if count is None).
+    # Rows are pulled on demand, so the operators below stop once it is done.
+    name = "Limit"
+
+    def __init__(self, child: Operator, count: Optional[int], offset: int = 0):
+        super().__init__(child.schema, [child])
+        self.count = count
+        self.offset = offset
+
+    def rows(self) -> Iterator[List[Any]]:
+        stop = None if self.count is None else self.offset + self.count
+        return islice(self.children[0].rows(), self.offset, stop)
+
+    def estimated_rows(self) -> int:
+        estimate = max(self.children[0].estimated_rows() - self.offset, 0)
+        return estimate if self.count is None else min(estimate, self.count)
+
+    def describe(self) -> str:
+        description = self.name if self.count is None else f"{self.name}: {self.count}"
+        if self.offset:
+            description += f" offset {self.offset}"
+        return description
+
+class HashAggregate(Operator):
+    # Single pass over the input that keeps, per group, only the running state
+    # of each aggregate, never the group's rows. Output rows are the group
+    # columns followed by the aggregate results. Without group columns the
+    # whole input is one group, which yields a row even when the input is empty.
+    name = "Hash Aggregate"
+
+    def __init__(self, child: Operator, schema: RowSchema, group_indices: List[int], aggregates: List[Tuple[str, Optional[int]]], labels: List[str]):
+        super().__init__(schema, [child])
+        self.group_indices = group_indices
+        # (function name, argument column or None for COUNT(*))
+        self.aggregates = aggregates
+        self.labels = labels
+
+    def rows(self) -> Iterator[List[Any]]:
+        groups = aggregate_rows(self.children[0].rows(), self.group_indices, self.aggregates)
+        yield from finish_groups(groups, self.aggregates)
+
+    def estimated_rows(self) -> int:
+        return self.children[0].estimated_rows() if self.group_indices else 1
+
+    def describe(self) -> str:
+        if not self.group_indices:
+            return f"Aggregate: {', '.join(self.labels)}"
+        groups = ", ".join(self.schema.column_label(i) for i in range(len(self.group_indices)))
+        return f"{self.name}: group by {groups}" + (f"; {', '.join(self.labels)}" if self.labels else "")
+
+class Gather(TableScan):
+    # Splits a table into morsels of consecutive rows and runs task(morsel) for
+    # each of them in a process pool. Results come back in morsel order; with
+    # flatten each result is a list of rows, otherwise it is yielded as is.
+    # At most two morsels per worker are in flight, which bounds memory use.
+    name = "Gather"
+
+    def __init__(self, table, pool: Callable[[], Any], workers: int, task: Callable[[List[List[Any]]], Any],
+                 morsel_size: int, flatten: bool = True, description: str = "", zone_filter: Any = None):
+        super().__init__(table, zone_filter=zone_filter)
+        self.pool = pool
+        self.workers = workers
+        self.task = task
+        self.morsel_size = morsel_size
+        self.flatten = flatten
+        self.description = description
+        self.rows_shipped = 0
+
+    def rows(self) -> Iterator[Any]:
+        pool = self.pool()
+        morsels = split_ranges(self.scan_ranges(self.table.version_count()), self.morsel_size)
+        pending = deque()
+
+        def submit(start: int, stop: int) -> None:
+            morsel = self.table.slice_rows(start, stop, self.snapshot)
+            self.rows_shipped += len(morsel)
+            pending.append(pool.submit(self.task, morsel))
+
+        try:
+            for start, stop in islice(morsels, 2 * self.workers):
+                submit(start, stop)
+            while pending:
+                result = pending.popleft().result()
+                for start, stop in islice(morsels, 1):
+                    submit(start, stop)
+                if self.flatten:
+                    yield from result
+                else:
+                    yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def estimated_rows(self) -> int:
+        return self.table.row_count()
+
+    def describe(self) -> str:
+        description = f"{self.name} on {self.table.name} ({self.workers} workers, morsels of {self.morsel_size} rows)"
+        description = f"{description}: {self.description}" if self.description else description
+        return description + self.describe_zone_filter()
+
+    def rows_read(self) -> int:
+        return self.rows_shipped
+
+class ParallelAggregate(HashAggregate):
+    # Merges the partial aggregations computed per morsel by a Gather child
+    name = "Parallel Hash Aggregate"
+
+    def rows(self) -> Iterator[List[Any]]:
+        groups: Dict[Tuple[Any, ...], List[Any]] = {}
+        for partial in self.children[0].rows():
+            combine_groups(groups, partial, self.aggregates)
+        if not self.group_indices and not groups:
+            groups[()] = [AGGREGATE_FUNCTIONS[name][0] for name, _ in self.aggregates]
+        yield from finish_groups(groups, self.aggregates)
+
+    def describe(self) -> str:
+        if not self.group_indices:
+            return f"Parallel Aggregate: {', '.join(self.labels)}"
+        return super().describe()
+
+class Descending:
+    # Wraps a sort key part so that it orders in reverse, for DESC keys
+    __slots__ = ('key',)
+
+    def __init__(self, key: Any):
+        self.key = key
+
+    def __lt__(self, other: 'Descending') -> bool:
+        return other.key < self.key
+
+    def __eq__(self, other: 'Descending') -> bool:
+        return self.key == other.key
+
+def sort_key(keys: List[Tuple[int, bool]]) -> Callable[[List[Any]], Any]:
+    # Key function for ORDER BY over (column, descending) pairs. NULLs sort after
+    # every value: last in ascending order, first in descending order.
+    def part(col_idx: int, descending: bool) -> Callable[[List[Any]], Any]:
+        if descending:
+            return lambda row: Descending((1, 0) if row[col_idx] is None else (0, row[col_idx]))
+        return lambda row: (1, 0) if row[col_idx] is None else (0, row[col_idx])
+    parts = [part(col_idx, descending) for col_idx, descending in keys]
+    if len(parts) == 1:
+        return parts[0]
+    return lambda row: tuple(key_part(row) for key_part in parts)
+
+class Sort(Operator):
+    # With a limit (ORDER BY ... LIMIT), keeps only the best rows in a bounded
+    # heap. Otherwise sorts in memory while the input fits in buffer_rows, and
+    # beyond that sorts buffer_rows rows at a time into runs spilled to temporary
+    # files, which are then merged. Both are stable, like list.sort().
+    name = "Sort"
+
+    def __init__(self, child: Operator, key: Callable[[List[Any]], Any], keys_text: str, limit: Optional[int] = None, buffer_rows: int = SORT_BUFFER_ROWS):
+        super().__init__(child.schema, [child])
+        self.key = key
+        self.keys_text = keys_text
+        self.limit = limit
+        self.buffer_rows = buffer_rows
+        self.runs_spilled = 0
+
+    def rows(self) -> Iterator[List[Any]]:
+        if self.limit is not None:
+            return iter(heapq.nsmallest(self.limit, self.children[0].rows(), key=self.key))
+        return self._sorted_rows(self.children[0].rows())
+
+    def _sorted_rows(self, rows: Iterator[List[Any]]) -> Iterator[List[Any]]:
+        runs = []
+        try:
+            while True:
+                buffer = list(islice(rows, self.buffer_rows))
+                buffer.sort(key=self.key)
+                if not runs and len(buffer) < self.buffer_rows:
+                    # Everything fit in memory
+                    yield from buffer
+                    return
+                if buffer:
+                    runs.append(self._spill(buffer))
+                if len(buffer) < self.buffer_rows:
+                    break
+            yield from heapq.merge(*[self._read_run(run) for run in runs], key=self.key)
+        finally:
+            for run in runs:
+                run.close()
+
+    def _spill(self, buffer: List[List[Any]]) -> Any:
+        run = tempfile.TemporaryFile()
+        for start in range(0, len(buffer), SPILL_CHUNK_ROWS):
+            pickle.dump(buffer[start:start + SPILL_CHUNK_ROWS], run, pickle.HIGHEST_PROTOCOL)
+        run.seek(0)
+        self.runs_spilled += 1
+        return run
+
+    def _read_run(self, run: Any) -> Iterator[List[Any]]:
+        while True:
+            try:
+                chunk = pickle.load(run)
+            except EOFError:
+                return
+            yield from chunk
+
+    def estimated_rows(self) -> int:
+        estimate = self.children[0].estimated_rows()
+        return estimate if self.limit is None else min(estimate, self.limit)
+
+    def describe(self) -> str:
+        description = f"{self.name}: {self.keys_text}"
+        if self.limit is not None:
+            description += f" (top {self.limit})"
+        if self.runs_spilled:
+            description += f" (spilled {self.runs_spilled} runs)"
+        return description
+
+class HashJoin(Operator):
+    # Inner equi-join: the input with fewer estimated rows is loaded into a hash
+    # table keyed on its join columns, and the other input is streamed against it.
+    # Output rows are always left columns followed by right columns.
+    name = "Hash Join"
+
+    def __init__(self, left: Operator, right: Operator, left_keys: List[int], right_keys: List[int], condition: str = ""):
+        super().__init__(left.schema.concat(right.schema), [left, right])
+        self.left_keys = left_keys
+        self.right_keys = right_keys
+        self.condition = condition
+        self.build_left = left.estimated_rows() <= right.estimated_rows()
+
+    def rows(self) -> Iterator[List[Any]]:
+        left, right = self.children
+        left_key = itemgetter(*self.left_keys)
+        right_key = itemgetter(*self.right_keys)
+        if self.build_left:
+            buckets = self._build(left.rows(), left_key)
+            for right_row in right.rows():
+                for left_row in buckets.get(right_key(right_row), ()):
+                    yield left_row + right_row
+        else:
+            buckets = self._build(right.rows(), right_key)
+            for left_row in left.rows():
+                for right_row in buckets.get(left_key(left_row), ()):
+                    yield left_row + right_row
+
+    @staticmethod
+    def _build(rows: Iterable[List[Any]], key: Callable[[List[Any]], Any]) -> Dict[Any, List[List[Any]]]:
+        buckets: Dict[Any, List[List[Any]]] = {}
+        for row in rows:
+            buckets.setdefault(key(row), []).append(row)
+        return buckets
+
+    def estimated_rows(self) -> int:
+        return max(child.estimated_rows() for child in self.children)
+
+    def describe(self) -> str:
+        return f"{self.name} on {self.condition} (build: {'left' if self.build_left else 'right'})"
+
+class SortMergeJoin(Operator):
+    # Inner equi-join on a single key: both inputs are ordered by their key
+    # (inputs read through an ordered index are already sorted and skip the
+    # sort) and then merged, pairing up the runs of equal keys
+    name = "Merge Join"
+
+    def __init__(self, left: Operator, right: Operator, left_key: int, right_key: int,
+                 left_sorted: bool = False, right_sorted: bool = False, condition: str = ""):
+        super().__init__(left.schema.concat(right.schema), [left, right])
+        self.left_key = left_key
+        self.right_key = right_key
+        self.left_sorted = left_sorted
+        self.right_sorted = right_sorted
+        self.condition = condition
+
+    def rows(self) -> Iterator[List[Any]]:
+        left, right = self.children
+        left_rows, left_nulls = self._keyed_rows(left, self.left_key, self.left_sorted)
+        right_rows, right_nulls = self._keyed_rows(right, self.right_key, self.right_sorted)
+        i = j = 0
+        while i < len(left_rows) and j < len(right_rows):
+            left_value = left_rows[i][0]
+            right_value = right_rows[j][0]
+            if left_value < right_value:
+                i += 1
+            elif left_value > right_value:
+                j += 1
+            else:
+                i_end = i + 1
+                while i_end < len(left_rows) and left_rows[i_end][0] == left_value:
+                    i_end += 1
+                j_end = j + 1
+                while j_end < len(right_rows) and right_rows[j_end][0] == right_value:
+                    j_end += 1
+                for _, left_row in left_rows[i:i_end]:
+                    for _, right_row in right_rows[j:j_end]:
+                        yield left_row + right_row
+                i, j = i_end, j_end
+        # NULL keys have no order but still equal each other, as in the other joins
+        for left_row in left_nulls:
+            for right_row in right_nulls:
+                yield left_row + right_row
+
+    @staticmethod
+    def _keyed_rows(child: Operator, key_index: int, presorted: bool) -> Tuple[List[Tuple[Any, List[Any]]], List[List[Any]]]:
+        keyed = []
+        nulls = []
+        for row in child.rows():
+            if row[key_index] is None:
+                nulls.append(row)
+            else:
+                keyed.append((row[key_index], row))
+        if not presorted:
+            keyed.sort(key=itemgetter(0))
+        return keyed, nulls
+
+    def estimated_rows(self) -> int:
+        return max(child.estimated_rows() for child in self.children)
+
+    def describe(self) -> str:
+        sorted_sides = [side for side, presorted in (("left", self.left_sorted), ("right", self.right_sorted)) if not presorted]
+        return f"{self.name} on {self.condition} (sort: {', '.join(sorted_sides) or 'none'})"
+
+class IndexNestedLoopJoin(Operator):
+    # Inner equi-join that probes an index on the right table's key column once
+    # per left row, fetching only the matching right rows. right_predicate is the
+    # part of the condition that only involves the right table.
+    name = "Index Nested Loop Join"
+
+    def __init__(self, left: Operator, table, index, left_key: int,
+                 right_predicate: Optional[Callable[[List[Any]], Any]] = None, condition: str = "", right_condition: str = ""):
+        super().__init__(left.schema.concat(RowSchema.for_table(table)), [left])
+        self.table = table
+        self.index = index
+        self.left_key = left_key
+        self.right_predicate = right_predicate
+        self.condition = condition
+        self.right_condition = right_condition
+        self.rows_fetched = 0
+
+    def rows(self) -> Iterator[List[Any]]:
+        lookup = self.index.lookup
+        get_row = self.table.get_row
+        left_key = self.left_key
+        right_predicate = self.right_predicate
+        count, visible = self.table.visibility(self.snapshot)
+        for left_row in self.children[0].rows():
+            positions = lookup(left_row[left_key])
+            self.rows_fetched += len(positions)
+            for position in positions:
+                if position >= count or (visible is not None and not visible(position)):
+                    continue
+                right_row = get_row(position)
+                if right_predicate is None or right_predicate(right_row):
+                    yield left_row + right_row
+
+    def estimated_rows(self) -> int:
+        return max(self.children[0].estimated_rows(), self.table.row_count())
+
+    def describe(self) -> str:
+        description = f"{self.name} on {self.condition} using {self.index.name} on {self.table.name}"
+        if self.right_condition:
+            description += f", filter: {self.right_condition}"
+        return description
+
+    def rows_read(self) -> int:
+        return self.rows_fetched
+
+class NestedLoopJoin(Operator):
+    # Fallback for joins without an equality condition: every left row is paired
+    # with every (materialized) right row and the condition, if any, is checked
+    name = "Nested Loop Join"
+
+    def __init__(self, left: Operator, right: Operator, predicate: Optional[Callable[[List[Any]], Any]] = None, condition: str = ""):
+        super().__init__(left.schema.concat(right.schema), [left, right])
+        self.predicate = predicate
+        self.condition = condition
+
+    def rows(self) -> Iterator[List[Any]]:
+        left, right = self.children
+        right_rows = list(right.rows())
+        predicate = self.predicate
+        for left_row in left.rows():
+            for right_row in right_rows:
+                row = left_row + right_row
+                if predicate is None or predicate(row):
+                    yield row
+
+    def estimated_rows(self) -> int:
+        left, right = self.children
+        return left.estimated_rows() * right.estimated_rows()
+
+    def describe(self) -> str:
+        return f"{self.name} on {self.condition}" if self.condition else self.name
+
+class Cursor:
+    """Streams the result of a plan to the caller.
+
+    Rows are pulled through the operator tree only as they are fetched, so
+    fetchmany(n) costs the work for the next n rows and no more.
+    """
+    arraysize = 100
+
+    def __init__(self, plan: Project, lock: Callable[[], ContextManager] = nullcontext,
+                 release: Optional[Callable[[], None]] = None):
+        self.plan = plan
+        self.columns = plan.column_names
+        # Rows fetched so far
+        self.rowcount = 0
+        self._rows = plan.rows()
+        # Entered around every fetch, e.g. to read-lock the plan's tables
+        self._lock = lock
+        # Called once, when the last row has been fetched or the cursor is closed
+        self._release = release
+
+    def fetchone(self) -> Optional[List[Any]]:
+        with self._lock():
+            row = next(self._rows, None)
+        if row is None:
+            self._finish()
+        else:
+            self.rowcount += 1
+        return row
+
+    def fetchmany(self, size: Optional[int] = None) -> List[List[Any]]:
+        size = self.arraysize if size is None else size
+        with self._lock():
+            rows = list(islice(self._rows, size))
+        if len(rows) < size:
+            self._finish()
+        self.rowcount += len(rows)
+        return rows
+
+    def fetchall(self) -> List[List[Any]]:
+        with self._lock():
+            rows = list(self._rows)
+        self._finish()
+        self.rowcount += len(rows)
+        return rows
+
+    def close(self) -> None:
+        # Operators still holding state (hash tables, sorted runs) are released
+        close = getattr(self._rows, 'close', None)
+        if close is not None:
+            close()
+        self._rows = iter(())
+        self._finish()
+
+    def _finish(self) -> None:
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+    def __iter__(self) -> Iterator[List[Any]]:
+        return self
+
+    def __next__(self) -> List[Any]:
+        try:
+            with self._lock():
+                row = next(self._rows)
+        except StopIteration:
+            self._finish()
+            raise
+        self.rowcount += 1
+        return row
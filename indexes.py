@@ -0,0 +1,215 @@
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from math import ceil, log
+import threading
+from typing import Dict, List, Any, Iterable, Iterator, Tuple
+from zonemap import ROW_GROUP_SIZE
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class HashIndex:
+    # Maps each value of one column to the positions of the rows holding it
+    kind = "HASH"
+    # Options CREATE INDEX ... WITH (...) accepts, with their defaults
+    options: Dict[str, Any] = {}
+
+    def __init__(self, name: str, column_index: int):
+        self.name = name
+        self.column_index = column_index
+        self.entries: Dict[Any, List[int]] = {}
+
+    def settings(self) -> Dict[str, Any]:
+        # The options this index was created with
+        return {}
+
+    def build(self, values: Iterable[Any]) -> None:
+        # values holds the indexed column's value for every row, in row order
+        self.entries = {}
+        for position, value in enumerate(values):
+            self.add(value, position)
+
+    def add(self, key: Any, position: int) -> None:
+        positions = self.entries.get(key)
+        if positions is None:
+            self.entries[key] = [position]
+        else:
+            positions.append(position)
+
+    def lookup(self, key: Any) -> List[int]:
+        return self.entries.get(key, [])
+
+    def distinct_count(self) -> int:
+        return len(self.entries)
+
+class OrderedIndex:
+    # Keeps (key, position) pairs in two parallel lists sorted by key, maintained
+    # with bisect, so range predicates only touch the qualifying slice.
+    # NULL keys cannot be ordered against values and are kept separately.
+    # add() inserts into both lists in place under self._lock, and readers
+    # locate and copy their slice under it too, so an insert never shifts
+    # entries under a reader; build() swaps in new lists.
+    kind = "BTREE"
+    options: Dict[str, Any] = {}
+
+    def __init__(self, name: str, column_index: int):
+        self.name = name
+        self.column_index = column_index
+        self.sorted: Tuple[List[Any], List[int]] = ([], [])
+        self.null_positions: List[int] = []
+        self._lock = threading.Lock()
+
+    def settings(self) -> Dict[str, Any]:
+        return {}
+
+    @property
+    def keys(self) -> List[Any]:
+        return self.sorted[0]
+
+    @property
+    def positions(self) -> List[int]:
+        return self.sorted[1]
+
+    def build(self, values: Iterable[Any]) -> None:
+        pairs = []
+        self.null_positions = []
+        for position, value in enumerate(values):
+            if value is None:
+                self.null_positions.append(position)
+            else:
+                pairs.append((value, position))
+        pairs.sort()
+        self.sorted = ([key for key, _ in pairs], [position for _, position in pairs])
+
+    def add(self, key: Any, position: int) -> None:
+        if key is None:
+            self.null_positions.append(position)
+            return
+        with self._lock:
+            keys, positions = self.sorted
+            i = bisect_right(keys, key)
+            keys.insert(i, key)
+            positions.insert(i, position)
+
+    def lookup(self, key: Any) -> List[int]:
+        if key is None:
+            return self.null_positions
+        with self._lock:
+            keys, positions = self.sorted
+            return positions[bisect_left(keys, key):bisect_right(keys, key)]
+
+    def distinct_count(self) -> int:
+        keys = self.keys
+        return sum(1 for i in range(len(keys)) if i == 0 or keys[i] != keys[i - 1]) + (1 if self.null_positions else 0)
+
+    def range_bounds(self, keys: List[Any], low: Any = None, low_inclusive: bool = True,
+                     high: Any = None, high_inclusive: bool = True) -> Tuple[int, int]:
+        # Slice [start, stop) of the sorted keys covering the requested range;
+        # a bound of None leaves that side open
+        start = 0
+        stop = len(keys)
+        if low is not None:
+            start = bisect_left(keys, low) if low_inclusive else bisect_right(keys, low)
+        if high is not None:
+            stop = bisect_right(keys, high) if high_inclusive else bisect_left(keys, high)
+        return start, max(start, stop)
+
+    def range(self, low: Any = None, low_inclusive: bool = True,
+              high: Any = None, high_inclusive: bool = True) -> List[int]:
+        with self._lock:
+            keys, positions = self.sorted
+            start, stop = self.range_bounds(keys, low, low_inclusive, high, high_inclusive)
+            return positions[start:stop]
+
+    def iter_range(self, low: Any = None, low_inclusive: bool = True,
+                   high: Any = None, high_inclusive: bool = True) -> Iterator[int]:
+        # Like range(), as an iterator over the positions in key order; the
+        # slice is copied up front (a single memory copy), since add() changes
+        # the lists in place
+        return iter(self.range(low, low_inclusive, high, high_inclusive))
+
+class BloomIndex:
+    # One Bloom filter per row group of the table (see zonemap.py) over the
+    # column's non-NULL values. It holds no positions: it only tells scans
+    # which row groups cannot contain a value, for "column = value"
+    # predicates, at about 10 bits per row for a 1% false positive rate.
+    # Filters are sized for a full row group; bits are only ever set, and
+    # build() swaps in a new list of filters, so readers need no lock.
+    kind = "BLOOM"
+    options: Dict[str, Any] = {'false_positive_rate': 0.01}
+
+    def __init__(self, name: str, column_index: int, false_positive_rate: float = 0.01, group_size: int = ROW_GROUP_SIZE):
+        self.name = name
+        self.column_index = column_index
+        self.false_positive_rate = false_positive_rate
+        self.group_size = group_size
+        bits = ceil(-group_size * log(false_positive_rate) / log(2) ** 2)
+        self.filter_bytes = max(1, -(-bits // 8))
+        self.bits = self.filter_bytes * 8
+        self.hash_count = max(1, round(self.bits / group_size * log(2)))
+        self.filters: List[bytearray] = []
+
+    def settings(self) -> Dict[str, Any]:
+        return {'false_positive_rate': self.false_positive_rate}
+
+    def build(self, values: Iterable[Any]) -> None:
+        filters: List[bytearray] = []
+        values = iter(values)
+        while True:
+            group = list(islice(values, self.group_size))
+            if not group:
+                break
+            filters.append(self._group_filter([value for value in group if value is not None]))
+        self.filters = filters
+
+    def _group_filter(self, keys: List[Any]) -> bytearray:
+        if np is None or not keys:
+            bits = bytearray(self.filter_bytes)
+            for key in keys:
+                for bit in self._probes(key):
+                    bits[bit >> 3] |= 1 << (bit & 7)
+            return bits
+        # The probes of every key at once, computed as in _probes()
+        hashes = np.fromiter(map(hash, zip(keys)), dtype=np.int64, count=len(keys)).view(np.uint64)
+        first, step = hashes & np.uint64(0xFFFFFFFF), (hashes >> np.uint64(32)) | np.uint64(1)
+        probes = (first[:, None] + step[:, None] * np.arange(self.hash_count, dtype=np.uint64)) % np.uint64(self.bits)
+        bitset = np.zeros(self.bits, dtype=bool)
+        bitset[probes.ravel()] = True
+        return bytearray(np.packbits(bitset, bitorder='little').tobytes())
+
+    def add(self, key: Any, position: int) -> None:
+        group = position // self.group_size
+        while len(self.filters) <= group:
+            self.filters.append(bytearray(self.filter_bytes))
+        if key is not None:
+            bits = self.filters[group]
+            for bit in self._probes(key):
+                bits[bit >> 3] |= 1 << (bit & 7)
+
+    def may_contain(self, group: int, key: Any) -> bool:
+        # False only if no row of the group holds key
+        filters = self.filters
+        if group >= len(filters):
+            return True
+        bits = filters[group]
+        return all(bits[bit >> 3] >> (bit & 7) & 1 for bit in self._probes(key))
+
+    def _probes(self, key: Any) -> List[int]:
+        # Double hashing. Hashing a 1-tuple mixes the bits of int keys, whose own
+        # hash is the value; 1 and 1.0 still hash alike, as they compare equal.
+        h = hash((key,)) & 0xFFFFFFFFFFFFFFFF
+        first, step = h & 0xFFFFFFFF, (h >> 32) | 1
+        bits = self.bits
+        return [(first + i * step) % bits for i in range(self.hash_count)]
+
+    def nbytes(self) -> int:
+        return len(self.filters) * self.filter_bytes
+
+# Index implementations by the method name used in CREATE INDEX ... USING <method>
+INDEX_METHODS = {
+    HashIndex.kind: HashIndex,
+    OrderedIndex.kind: OrderedIndex,
+    BloomIndex.kind: BloomIndex,
+}
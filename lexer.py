@@ -18,6 +18,20 @@ class TokenType(Enum):
     CREATE = auto()
     TABLE = auto()
     DROP = auto()
+    INDEX = auto()
+    USING = auto()
+    EXPLAIN = auto()
+    ANALYZE = auto()
+    COPY = auto()
+    TO = auto()
+    LIMIT = auto()
+    OFFSET = auto()
+    ORDER = auto()
+    BY = auto()
+    ASC = auto()
+    DESC = auto()
+    GROUP = auto()
+    HAVING = auto()
     JOIN = auto()
     ON = auto()
     AND = auto()
@@ -53,9 +67,19 @@ class TokenType(Enum):
     INTEGER = auto()
     FLOAT_LITERAL = auto()
     STRING = auto()
+    PARAMETER = auto()
     EOF = auto()
     ERROR = auto()
 
+# Keywords added after the original grammar; they still name tables and
+# columns wherever the parser expects a name
+NON_RESERVED_KEYWORDS = {
+    TokenType.INDEX, TokenType.USING, TokenType.EXPLAIN, TokenType.ANALYZE,
+    TokenType.COPY, TokenType.TO, TokenType.LIMIT, TokenType.OFFSET,
+    TokenType.ORDER, TokenType.BY, TokenType.ASC, TokenType.DESC,
+    TokenType.GROUP, TokenType.HAVING,
+}
+
 # Token structure
 class Token:
     def __init__(self, type: TokenType, lexeme: str, line: int, column: int):
@@ -75,6 +99,12 @@ class NodeType(Enum):
     DELETE_STMT = auto()
     CREATE_STMT = auto()
     DROP_STMT = auto()
+    CREATE_INDEX_STMT = auto()
+    DROP_INDEX_STMT = auto()
+    EXPLAIN_STMT = auto()
+    COPY_STMT = auto()
+    SORT_KEY = auto()
+    FUNCTION_CALL = auto()
     COLUMN_LIST = auto()
     TABLE_REF = auto()
     JOIN = auto()
@@ -84,6 +114,7 @@ class NodeType(Enum):
     COLUMN_DEF = auto()
     LITERAL = auto()
     IDENTIFIER = auto()
+    PARAMETER = auto()
 
 # AST node structure
 class ASTNode:
@@ -113,6 +144,20 @@ class Lexer:
             'create': TokenType.CREATE,
             'table': TokenType.TABLE,
             'drop': TokenType.DROP,
+            'index': TokenType.INDEX,
+            'using': TokenType.USING,
+            'explain': TokenType.EXPLAIN,
+            'analyze': TokenType.ANALYZE,
+            'copy': TokenType.COPY,
+            'to': TokenType.TO,
+            'limit': TokenType.LIMIT,
+            'offset': TokenType.OFFSET,
+            'order': TokenType.ORDER,
+            'by': TokenType.BY,
+            'asc': TokenType.ASC,
+            'desc': TokenType.DESC,
+            'group': TokenType.GROUP,
+            'having': TokenType.HAVING,
             'join': TokenType.JOIN,
             'on': TokenType.ON,
             'and': TokenType.AND,
@@ -232,6 +277,17 @@ class Lexer:
         if char == '.':
             self.advance()
             return Token(TokenType.DOT, ".", self.line, self.column - 1)
+
+        # Parameter placeholders: ? (positional) and :name (named)
+        if char == '?':
+            self.advance()
+            return Token(TokenType.PARAMETER, "?", self.line, self.column - 1)
+
+        if char == ':' and self.position + 1 < len(self.input) and (self.input[self.position + 1].isalpha() or self.input[self.position + 1] == '_'):
+            start_column = self.column
+            self.advance()
+            name = self.identifier()
+            return Token(TokenType.PARAMETER, ":" + name.lexeme, self.line, start_column)
         
         # Unrecognized character
         self.advance()
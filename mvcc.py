@@ -0,0 +1,100 @@
+from typing import Dict, FrozenSet, Iterable, Tuple
+import threading
+
+# Version stamp that no snapshot ever sees: the deleted stamp of a live row
+# version, and the created stamp of a rolled-back one
+NEVER = 2**63 - 1
+
+class Snapshot:
+    """The committed state of the database at the moment a statement started.
+
+    A write is visible if its version was handed out before the snapshot was
+    taken and was no longer in progress at that moment.
+    """
+    __slots__ = ('horizon', 'in_progress', 'xmin', 'pinned')
+
+    def __init__(self, horizon: int, in_progress: FrozenSet[int], pinned: Tuple = ()):
+        self.horizon = horizon
+        self.in_progress = in_progress
+        # Every version below xmin was settled (committed or rolled back) when the snapshot was taken
+        self.xmin = min(in_progress, default=horizon)
+        self.pinned = pinned
+
+    def sees(self, version: int) -> bool:
+        return version < self.horizon and version not in self.in_progress
+
+class VersionManager:
+    # Hands out write versions and snapshots for all tables of a database, and
+    # tracks the open snapshots so vacuum knows which row versions are still needed
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next = 1
+        self._in_progress: set = set()
+        # Writes that are complete but not yet durable (see settle())
+        self._settled: set = set()
+        # xmin of every open snapshot -> number of snapshots with it
+        self._open: Dict[int, int] = {}
+        # Tables read by open cursors -> number of cursors
+        self._pinned: Dict[object, int] = {}
+
+    def begin_write(self) -> int:
+        with self._lock:
+            version = self._next
+            self._next += 1
+            self._in_progress.add(version)
+            return version
+
+    def end_write(self, version: int) -> None:
+        # Commits the version: snapshots taken from now on see its writes
+        self.end_writes([version])
+
+    def end_writes(self, versions: Iterable[int]) -> None:
+        # Commits the versions at once, so no snapshot sees some of them but not the others
+        with self._lock:
+            for version in versions:
+                self._in_progress.discard(version)
+                self._settled.discard(version)
+
+    def settle(self, version: int) -> None:
+        # The write is complete and waits to be made durable before it commits.
+        # Meanwhile the next writer of its tables must build on it, so latest()
+        # sees it already; registered snapshots do not.
+        with self._lock:
+            self._settled.add(version)
+
+    def latest(self) -> Snapshot:
+        # An unregistered snapshot for reads that finish before vacuum can run,
+        # and for writers
+        with self._lock:
+            return Snapshot(self._next, frozenset(self._in_progress - self._settled))
+
+    def snapshot(self, pinned: Iterable = ()) -> Snapshot:
+        # A registered snapshot; it must be passed to release() when done. Vacuum
+        # keeps every row version it sees, and leaves the pinned tables alone
+        # altogether, since their row positions must stay valid until then.
+        with self._lock:
+            snapshot = Snapshot(self._next, frozenset(self._in_progress), tuple(pinned))
+            self._open[snapshot.xmin] = self._open.get(snapshot.xmin, 0) + 1
+            for table in snapshot.pinned:
+                self._pinned[table] = self._pinned.get(table, 0) + 1
+            return snapshot
+
+    def release(self, snapshot: Snapshot) -> None:
+        with self._lock:
+            self._open[snapshot.xmin] -= 1
+            if not self._open[snapshot.xmin]:
+                del self._open[snapshot.xmin]
+            for table in snapshot.pinned:
+                self._pinned[table] -= 1
+                if not self._pinned[table]:
+                    del self._pinned[table]
+
+    def is_pinned(self, table: object) -> bool:
+        with self._lock:
+            return table in self._pinned
+
+    def vacuum_horizon(self) -> int:
+        # Row versions deleted by a version below this are invisible to every
+        # open snapshot and to every snapshot taken from now on
+        with self._lock:
+            return min([min(self._in_progress, default=self._next)] + list(self._open))
@@ -0,0 +1,139 @@
+from contextlib import contextmanager, suppress
+from typing import Dict, List, Any, Tuple, Iterator
+import os
+import tempfile
+import threading
+import weakref
+from wal import encode_rows, decode_rows
+
+PAGE_SIZE = 8192
+
+def _remove_file(file: Any, path: str) -> None:
+    file.close()
+    # Its directory may be gone already
+    with suppress(FileNotFoundError):
+        os.remove(path)
+
+class PageFile:
+    # A data file of fixed-size pages. Each page holds a batch of rows, encoded
+    # like the rows of WAL records; a row too big for one page gets a run of
+    # consecutive pages (an extent) to itself. Pages are written once and never
+    # changed. The file is deleted when the PageFile is garbage collected.
+    def __init__(self, directory: str, prefix: str):
+        fd, self.path = tempfile.mkstemp(dir=directory, prefix=prefix + '.', suffix='.pages')
+        self._file = os.fdopen(fd, 'w+b')
+        self._lock = threading.Lock()
+        self.page_count = 0
+        weakref.finalize(self, _remove_file, self._file, self.path)
+
+    def write_page(self, rows: List[List[Any]]) -> Tuple[int, int, int]:
+        # Appends as many of rows as fit in a page (at least one) to the file.
+        # Returns (first page, number of pages, number of rows written).
+        count = len(rows)
+        data = encode_rows(rows)
+        while len(data) > PAGE_SIZE and count > 1:
+            count = max(1, min(count - 1, count * PAGE_SIZE // len(data)))
+            data = encode_rows(rows[:count])
+        pages = -(-len(data) // PAGE_SIZE)
+        with self._lock:
+            first = self.page_count
+            self._file.seek(first * PAGE_SIZE)
+            self._file.write(data.ljust(pages * PAGE_SIZE, b'\0'))
+            self.page_count += pages
+        return first, pages, count
+
+    def read(self, first: int, pages: int) -> List[List[Any]]:
+        with self._lock:
+            self._file.seek(first * PAGE_SIZE)
+            data = self._file.read(pages * PAGE_SIZE)
+        return decode_rows(data, 0)[0]
+
+class Frame:
+    # A buffer pool slot holding the decoded rows of one extent
+    __slots__ = ('key', 'rows', 'pages', 'pins', 'referenced')
+
+    def __init__(self, key: Tuple[PageFile, int], rows: List[List[Any]], pages: int):
+        self.key = key
+        self.rows = rows
+        self.pages = pages
+        self.pins = 0
+        self.referenced = True
+
+class BufferPool:
+    """Cache of decoded pages, shared by the paged tables of a database.
+
+    size is the memory budget, counted in bytes of pages as stored on disk.
+    pin() returns the frame holding an extent, reading it on a miss, and the
+    frame stays in memory until the matching unpin(). When the pool is full,
+    clock replacement picks the frame to evict: a hand sweeps the frames,
+    skips pinned ones and gives recently used ones a second chance by
+    clearing their reference bit. If every frame is pinned the pool goes over
+    budget rather than make readers wait.
+    """
+
+    def __init__(self, size: int):
+        self.capacity = max(1, size // PAGE_SIZE)
+        self._lock = threading.Lock()
+        self._frames: Dict[Tuple[PageFile, int], Frame] = {}
+        self._clock: List[Frame] = []
+        self._hand = 0
+        self._used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def pin(self, file: PageFile, first: int, pages: int) -> Frame:
+        key = (file, first)
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is None:
+                self.misses += 1
+                self._make_room(pages)
+                frame = self._frames[key] = Frame(key, file.read(first, pages), pages)
+                self._clock.append(frame)
+                self._used += pages
+            else:
+                self.hits += 1
+                frame.referenced = True
+            frame.pins += 1
+            return frame
+
+    def unpin(self, frame: Frame) -> None:
+        with self._lock:
+            frame.pins -= 1
+
+    @contextmanager
+    def pinned(self, file: PageFile, first: int, pages: int) -> Iterator[List[List[Any]]]:
+        frame = self.pin(file, first, pages)
+        try:
+            yield frame.rows
+        finally:
+            self.unpin(frame)
+
+    def discard(self, file: PageFile) -> None:
+        # Drops the frames of a file that is no longer read
+        with self._lock:
+            self._clock = [frame for frame in self._clock if frame.key[0] is not file]
+            for key in [key for key in self._frames if key[0] is file]:
+                self._used -= self._frames.pop(key).pages
+            self._hand = 0
+
+    def _make_room(self, pages: int) -> None:
+        # Called with the lock held
+        clock = self._clock
+        steps = 0
+        while self._used + pages > self.capacity and clock and steps <= 2 * len(clock):
+            if self._hand >= len(clock):
+                self._hand = 0
+            frame = clock[self._hand]
+            if frame.pins:
+                self._hand += 1
+            elif frame.referenced:
+                frame.referenced = False
+                self._hand += 1
+            else:
+                del clock[self._hand]
+                del self._frames[frame.key]
+                self._used -= frame.pages
+                self.evictions += 1
+            steps += 1
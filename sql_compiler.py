@@ -1,5 +1,7 @@
 import re
 import sys
+import threading
+from collections import OrderedDict
 from enum import Enum, auto
 from typing import Dict, List, Optional, Union, Any, Tuple
 
@@ -18,6 +20,20 @@ class TokenType(Enum):
     CREATE = auto()
     TABLE = auto()
     DROP = auto()
+    INDEX = auto()
+    USING = auto()
+    EXPLAIN = auto()
+    ANALYZE = auto()
+    COPY = auto()
+    TO = auto()
+    LIMIT = auto()
+    OFFSET = auto()
+    ORDER = auto()
+    BY = auto()
+    ASC = auto()
+    DESC = auto()
+    GROUP = auto()
+    HAVING = auto()
     JOIN = auto()
     ON = auto()
     AND = auto()
@@ -53,9 +69,19 @@ class TokenType(Enum):
     INTEGER = auto()
     FLOAT_LITERAL = auto()
     STRING = auto()
+    PARAMETER = auto()
     EOF = auto()
     ERROR = auto()
 
+# Keywords added after the original grammar; they still name tables and
+# columns wherever the parser expects a name
+NON_RESERVED_KEYWORDS = {
+    TokenType.INDEX, TokenType.USING, TokenType.EXPLAIN, TokenType.ANALYZE,
+    TokenType.COPY, TokenType.TO, TokenType.LIMIT, TokenType.OFFSET,
+    TokenType.ORDER, TokenType.BY, TokenType.ASC, TokenType.DESC,
+    TokenType.GROUP, TokenType.HAVING,
+}
+
 # Token structure
 class Token:
     def __init__(self, type: TokenType, lexeme: str, line: int, column: int):
@@ -75,6 +101,12 @@ class NodeType(Enum):
     DELETE_STMT = auto()
     CREATE_STMT = auto()
     DROP_STMT = auto()
+    CREATE_INDEX_STMT = auto()
+    DROP_INDEX_STMT = auto()
+    EXPLAIN_STMT = auto()
+    COPY_STMT = auto()
+    SORT_KEY = auto()
+    FUNCTION_CALL = auto()
     COLUMN_LIST = auto()
     TABLE_REF = auto()
     JOIN = auto()
@@ -84,6 +116,7 @@ class NodeType(Enum):
     COLUMN_DEF = auto()
     LITERAL = auto()
     IDENTIFIER = auto()
+    PARAMETER = auto()
 
 # AST node structure
 class ASTNode:
@@ -114,6 +147,20 @@ class Lexer:
             'create': TokenType.CREATE,
             'table': TokenType.TABLE,
             'drop': TokenType.DROP,
+            'index': TokenType.INDEX,
+            'using': TokenType.USING,
+            'explain': TokenType.EXPLAIN,
+            'analyze': TokenType.ANALYZE,
+            'copy': TokenType.COPY,
+            'to': TokenType.TO,
+            'limit': TokenType.LIMIT,
+            'offset': TokenType.OFFSET,
+            'order': TokenType.ORDER,
+            'by': TokenType.BY,
+            'asc': TokenType.ASC,
+            'desc': TokenType.DESC,
+            'group': TokenType.GROUP,
+            'having': TokenType.HAVING,
             'join': TokenType.JOIN,
             'on': TokenType.ON,
             'and': TokenType.AND,
@@ -234,6 +281,17 @@ class Lexer:
             self.advance()
             return Token(TokenType.DOT, ".", self.line, self.column - 1)
 
+        # Parameter placeholders: ? (positional) and :name (named)
+        if char == '?':
+            self.advance()
+            return Token(TokenType.PARAMETER, "?", self.line, self.column - 1)
+
+        if char == ':' and self.position + 1 < len(self.input) and (self.input[self.position + 1].isalpha() or self.input[self.position + 1] == '_'):
+            start_column = self.column
+            self.advance()
+            name = self.identifier()
+            return Token(TokenType.PARAMETER, ":" + name.lexeme, self.line, start_column)
+
         # Unrecognized character
         self.advance()
         return Token(TokenType.ERROR, char, self.line, self.column - 1)
@@ -286,6 +344,8 @@ class Parser:
     def __init__(self, lexer: Lexer):
         self.lexer = lexer
         self.current_token = self.lexer.get_next_token()
+        # PARAMETER nodes in the order they were parsed
+        self.parameters: List[ASTNode] = []
 
     def consume(self, expected_type: TokenType) -> Token:
         if self.current_token.type == expected_type:
@@ -295,6 +355,14 @@ class Parser:
         else:
             raise SyntaxError(f"Expected {expected_type}, got {self.current_token.type} at line {self.current_token.line}, column {self.current_token.column}")
 
+    def at_name(self) -> bool:
+        # Whether the current token can be a name; a non-reserved keyword is
+        # turned into an identifier here
+        token = self.current_token
+        if token.type in NON_RESERVED_KEYWORDS:
+            self.current_token = Token(TokenType.IDENTIFIER, token.lexeme, token.line, token.column)
+        return self.current_token.type == TokenType.IDENTIFIER
+
     def parse_statement(self) -> Optional[ASTNode]:
         # This method parses a single SQL statement
         if self.current_token.type == TokenType.EOF:
@@ -315,6 +383,10 @@ class Parser:
             return self.create_statement()
         elif self.current_token.type == TokenType.DROP:
             return self.drop_statement()
+        elif self.current_token.type == TokenType.EXPLAIN:
+            return self.explain_statement()
+        elif self.current_token.type == TokenType.COPY:
+            return self.copy_statement()
         else:
             raise SyntaxError(f"Unexpected token {self.current_token.type} at line {self.current_token.line}, column {self.current_token.column}")
 
@@ -339,8 +411,57 @@ class Parser:
         else:
             node.data['where_clause'] = None
 
+        # Optional GROUP BY expr, ... and HAVING condition
+        node.data['group_by'] = []
+        if self.current_token.type == TokenType.GROUP:
+            self.consume(TokenType.GROUP)
+            self.consume(TokenType.BY)
+            node.data['group_by'].append(self.expression())
+            while self.current_token.type == TokenType.COMMA:
+                self.consume(TokenType.COMMA)
+                node.data['group_by'].append(self.expression())
+        node.data['having'] = None
+        if self.current_token.type == TokenType.HAVING:
+            self.consume(TokenType.HAVING)
+            node.data['having'] = self.condition()
+
+        # Optional ORDER BY expr [ASC | DESC], ...
+        node.data['order_by'] = []
+        if self.current_token.type == TokenType.ORDER:
+            self.consume(TokenType.ORDER)
+            self.consume(TokenType.BY)
+            node.data['order_by'].append(self.sort_key())
+            while self.current_token.type == TokenType.COMMA:
+                self.consume(TokenType.COMMA)
+                node.data['order_by'].append(self.sort_key())
+
+        # Optional LIMIT n and OFFSET m
+        node.data['limit'] = None
+        node.data['offset'] = 0
+        if self.current_token.type == TokenType.LIMIT:
+            self.consume(TokenType.LIMIT)
+            node.data['limit'] = self.row_count("LIMIT")
+        if self.current_token.type == TokenType.OFFSET:
+            self.consume(TokenType.OFFSET)
+            node.data['offset'] = self.row_count("OFFSET")
+
+        return node
+
+    def sort_key(self) -> ASTNode:
+        node = ASTNode(NodeType.SORT_KEY)
+        node.data['expression'] = self.expression()
+        node.data['descending'] = self.current_token.type == TokenType.DESC
+        if self.current_token.type in [TokenType.ASC, TokenType.DESC]:
+            self.consume(self.current_token.type)
         return node
 
+    def row_count(self, clause: str) -> int:
+        if self.current_token.type != TokenType.INTEGER:
+            raise SyntaxError(f"Expected a row count after {clause}, got {self.current_token.type} at line {self.current_token.line}, column {self.current_token.column}")
+        count = int(self.current_token.lexeme)
+        self.consume(TokenType.INTEGER)
+        return count
+
     def column_list(self) -> List[ASTNode]:
         columns = []
 
@@ -375,7 +496,7 @@ class Parser:
     def table_reference(self) -> ASTNode:
         node = ASTNode(NodeType.TABLE_REF)
 
-        if self.current_token.type == TokenType.IDENTIFIER:
+        if self.at_name():
             node.data['name'] = self.current_token.lexeme
             self.consume(TokenType.IDENTIFIER)
         else:
@@ -429,16 +550,48 @@ class Parser:
         return node
 
     def expression(self) -> ASTNode:
-        if self.current_token.type == TokenType.IDENTIFIER:
+        # Additive level: term ((+ | -) term)*
+        node = self.term()
+
+        while self.current_token.type in [TokenType.PLUS, TokenType.MINUS]:
+            node = self.binary_expression(node, self.term)
+
+        return node
+
+    def term(self) -> ASTNode:
+        # Multiplicative level: primary ((* | /) primary)*
+        node = self.primary()
+
+        while self.current_token.type in [TokenType.ASTERISK, TokenType.DIVIDE]:
+            node = self.binary_expression(node, self.primary)
+
+        return node
+
+    def binary_expression(self, left: ASTNode, operand) -> ASTNode:
+        operator_type = self.current_token.type
+        self.consume(operator_type)
+
+        expr_node = ASTNode(NodeType.EXPRESSION)
+        expr_node.data['left'] = left
+        expr_node.data['operator'] = operator_type
+        expr_node.data['right'] = operand()
+
+        return expr_node
+
+    def primary(self) -> ASTNode:
+        if self.at_name():
             node = ASTNode(NodeType.IDENTIFIER)
             node.data['name'] = self.current_token.lexeme
             self.consume(TokenType.IDENTIFIER)
 
+            if self.current_token.type == TokenType.LEFT_PAREN:
+                return self.function_call(node.data['name'])
+
             # Check for table.column notation
             if self.current_token.type == TokenType.DOT:
                 self.consume(TokenType.DOT)
 
-                if self.current_token.type == TokenType.IDENTIFIER:
+                if self.at_name():
                     column_node = ASTNode(NodeType.IDENTIFIER)
                     column_node.data['name'] = self.current_token.lexeme
                     self.consume(TokenType.IDENTIFIER)
@@ -455,6 +608,8 @@ class Parser:
             return node
         elif self.current_token.type in [TokenType.INTEGER, TokenType.FLOAT_LITERAL, TokenType.STRING, TokenType.NULL]:
             return self.literal()
+        elif self.current_token.type == TokenType.PARAMETER:
+            return self.parameter()
         elif self.current_token.type == TokenType.LEFT_PAREN:
             self.consume(TokenType.LEFT_PAREN)
             node = self.expression()
@@ -463,6 +618,21 @@ class Parser:
         else:
             raise SyntaxError(f"Unexpected token in expression: {self.current_token.type}")
 
+    def function_call(self, name: str) -> ASTNode:
+        # name(expression) or name(*); the argument is None for *
+        node = ASTNode(NodeType.FUNCTION_CALL)
+        node.data['name'] = name.upper()
+
+        self.consume(TokenType.LEFT_PAREN)
+        if self.current_token.type == TokenType.ASTERISK:
+            self.consume(TokenType.ASTERISK)
+            node.data['argument'] = None
+        else:
+            node.data['argument'] = self.expression()
+        self.consume(TokenType.RIGHT_PAREN)
+
+        return node
+
     def literal(self) -> ASTNode:
         node = ASTNode(NodeType.LITERAL)
 
@@ -487,13 +657,29 @@ class Parser:
 
         return node
 
+    def parameter(self) -> ASTNode:
+        # The value is filled in when a prepared statement is executed
+        node = ASTNode(NodeType.PARAMETER)
+        lexeme = self.current_token.lexeme
+        if lexeme == "?":
+            if any('name' in parameter.data for parameter in self.parameters):
+                raise SyntaxError("Cannot mix ? and :name parameters in one statement")
+            node.data['index'] = len(self.parameters)
+        else:
+            if any('index' in parameter.data for parameter in self.parameters):
+                raise SyntaxError("Cannot mix ? and :name parameters in one statement")
+            node.data['name'] = lexeme[1:]
+        self.consume(TokenType.PARAMETER)
+        self.parameters.append(node)
+        return node
+
     def insert_statement(self) -> ASTNode:
         node = ASTNode(NodeType.INSERT_STMT)
 
         self.consume(TokenType.INSERT)
         self.consume(TokenType.INTO)
 
-        if self.current_token.type == TokenType.IDENTIFIER:
+        if self.at_name():
             table_node = ASTNode(NodeType.IDENTIFIER)
             table_node.data['name'] = self.current_token.lexeme
             node.data['table'] = table_node
@@ -509,26 +695,35 @@ class Parser:
         else:
             node.data['columns'] = []
 
+        # VALUES (...), (...), ...: one list of expressions per row
         self.consume(TokenType.VALUES)
+        node.data['rows'] = [self.value_tuple()]
+
+        while self.current_token.type == TokenType.COMMA:
+            self.consume(TokenType.COMMA)
+            node.data['rows'].append(self.value_tuple())
+
+        return node
+
+    def value_tuple(self) -> List[ASTNode]:
         self.consume(TokenType.LEFT_PAREN)
 
-        node.data['values'] = []
-        node.data['values'].append(self.expression())
+        values = [self.expression()]
 
         while self.current_token.type == TokenType.COMMA:
             self.consume(TokenType.COMMA)
-            node.data['values'].append(self.expression())
+            values.append(self.expression())
 
         self.consume(TokenType.RIGHT_PAREN)
 
-        return node
+        return values
 
     def update_statement(self) -> ASTNode:
         node = ASTNode(NodeType.UPDATE_STMT)
 
         self.consume(TokenType.UPDATE)
 
-        if self.current_token.type == TokenType.IDENTIFIER:
+        if self.at_name():
             table_node = ASTNode(NodeType.IDENTIFIER)
             table_node.data['name'] = self.current_token.lexeme
             node.data['table'] = table_node
@@ -543,7 +738,7 @@ class Parser:
         # First set clause
         set_clause = ASTNode(NodeType.EXPRESSION)
 
-        if self.current_token.type == TokenType.IDENTIFIER:
+        if self.at_name():
             column_node = ASTNode(NodeType.IDENTIFIER)
             column_node.data['name'] = self.current_token.lexeme
             set_clause.data['left'] = column_node
@@ -563,7 +758,7 @@ class Parser:
 
             set_clause = ASTNode(NodeType.EXPRESSION)
 
-            if self.current_token.type == TokenType.IDENTIFIER:
+            if self.at_name():
                 column_node = ASTNode(NodeType.IDENTIFIER)
                 column_node.data['name'] = self.current_token.lexeme
                 set_clause.data['left'] = column_node
@@ -592,7 +787,7 @@ class Parser:
         self.consume(TokenType.DELETE)
         self.consume(TokenType.FROM)
 
-        if self.current_token.type == TokenType.IDENTIFIER:
+        if self.at_name():
             table_node = ASTNode(NodeType.IDENTIFIER)
             table_node.data['name'] = self.current_token.lexeme
             node.data['table'] = table_node
@@ -610,12 +805,14 @@ class Parser:
         return node
 
     def create_statement(self) -> ASTNode:
-        node = ASTNode(NodeType.CREATE_STMT)
-
         self.consume(TokenType.CREATE)
+        if self.current_token.type == TokenType.INDEX:
+            return self.create_index_statement()
+
+        node = ASTNode(NodeType.CREATE_STMT)
         self.consume(TokenType.TABLE)
 
-        if self.current_token.type == TokenType.IDENTIFIER:
+        if self.at_name():
             table_node = ASTNode(NodeType.IDENTIFIER)
             table_node.data['name'] = self.current_token.lexeme
             node.data['table'] = table_node
@@ -637,12 +834,19 @@ class Parser:
 
         self.consume(TokenType.RIGHT_PAREN)
 
+        # Optional storage layout: USING ROW (default) or USING COLUMNAR
+        if self.current_token.type == TokenType.USING:
+            self.consume(TokenType.USING)
+            node.data['storage'] = self.identifier("table storage").data['name'].upper()
+        else:
+            node.data['storage'] = "ROW"
+
         return node
 
     def column_definition(self) -> ASTNode:
         node = ASTNode(NodeType.COLUMN_DEF)
 
-        if self.current_token.type == TokenType.IDENTIFIER:
+        if self.at_name():
             name_node = ASTNode(NodeType.IDENTIFIER)
             name_node.data['name'] = self.current_token.lexeme
             node.data['name'] = name_node
@@ -661,12 +865,14 @@ class Parser:
         return node
 
     def drop_statement(self) -> ASTNode:
-        node = ASTNode(NodeType.DROP_STMT)
-
         self.consume(TokenType.DROP)
+        if self.current_token.type == TokenType.INDEX:
+            return self.drop_index_statement()
+
+        node = ASTNode(NodeType.DROP_STMT)
         self.consume(TokenType.TABLE)
 
-        if self.current_token.type == TokenType.IDENTIFIER:
+        if self.at_name():
             table_node = ASTNode(NodeType.IDENTIFIER)
             table_node.data['name'] = self.current_token.lexeme
             node.data['table'] = table_node
@@ -676,22 +882,201 @@ class Parser:
 
         return node
 
+    def create_index_statement(self) -> ASTNode:
+        # CREATE INDEX name ON table [USING HASH | BTREE | BLOOM] (column) [WITH (option = value, ...)]
+        node = ASTNode(NodeType.CREATE_INDEX_STMT)
+
+        self.consume(TokenType.INDEX)
+        node.data['index'] = self.identifier("index name")
+
+        self.consume(TokenType.ON)
+        node.data['table'] = self.identifier("table name")
+
+        if self.current_token.type == TokenType.USING:
+            self.consume(TokenType.USING)
+            node.data['method'] = self.identifier("index method").data['name'].upper()
+        else:
+            node.data['method'] = "HASH"
+
+        self.consume(TokenType.LEFT_PAREN)
+        node.data['column'] = self.identifier("column name")
+        self.consume(TokenType.RIGHT_PAREN)
+
+        if self.current_token.type == TokenType.IDENTIFIER and self.current_token.lexeme.lower() == "with":
+            self.consume(TokenType.IDENTIFIER)
+            self.consume(TokenType.LEFT_PAREN)
+            options = {}
+            while True:
+                option = self.identifier("index option").data['name'].lower()
+                self.consume(TokenType.EQUALS)
+                options[option] = self.literal().data['value']
+                if self.current_token.type != TokenType.COMMA:
+                    break
+                self.consume(TokenType.COMMA)
+            self.consume(TokenType.RIGHT_PAREN)
+            node.data['options'] = options
+
+        return node
+
+    def drop_index_statement(self) -> ASTNode:
+        node = ASTNode(NodeType.DROP_INDEX_STMT)
+
+        self.consume(TokenType.INDEX)
+        node.data['index'] = self.identifier("index name")
+
+        return node
+
+    def explain_statement(self) -> ASTNode:
+        # EXPLAIN [ANALYZE] <statement>
+        node = ASTNode(NodeType.EXPLAIN_STMT)
+
+        self.consume(TokenType.EXPLAIN)
+        node.data['analyze'] = self.current_token.type == TokenType.ANALYZE
+        if node.data['analyze']:
+            self.consume(TokenType.ANALYZE)
+        node.data['statement'] = self.sql_statement()
+
+        return node
+
+    def copy_statement(self) -> ASTNode:
+        # COPY table FROM 'path' [WITH HEADER]
+        # COPY { table | (SELECT ...) } TO 'path' [WITH HEADER]
+        node = ASTNode(NodeType.COPY_STMT)
+
+        self.consume(TokenType.COPY)
+        if self.current_token.type == TokenType.LEFT_PAREN:
+            self.consume(TokenType.LEFT_PAREN)
+            node.data['query'] = self.select_statement()
+            self.consume(TokenType.RIGHT_PAREN)
+            self.consume(TokenType.TO)
+            node.data['direction'] = "TO"
+        else:
+            node.data['table'] = self.identifier("table name")
+            if self.current_token.type == TokenType.TO:
+                self.consume(TokenType.TO)
+                node.data['direction'] = "TO"
+            else:
+                self.consume(TokenType.FROM)
+                node.data['direction'] = "FROM"
+
+        if self.current_token.type != TokenType.STRING:
+            raise SyntaxError(f"Expected file path string, got {self.current_token.type}")
+        node.data['path'] = self.current_token.lexeme
+        self.consume(TokenType.STRING)
+
+        node.data['header'] = False
+        if self.current_token.type == TokenType.IDENTIFIER and self.current_token.lexeme.lower() == "with":
+            self.consume(TokenType.IDENTIFIER)
+            option = self.identifier("COPY option").data['name']
+            if option.lower() != "header":
+                raise SyntaxError(f"Unknown COPY option '{option}'")
+            node.data['header'] = True
+
+        return node
+
+    def identifier(self, description: str) -> ASTNode:
+        if self.at_name():
+            node = ASTNode(NodeType.IDENTIFIER)
+            node.data['name'] = self.current_token.lexeme
+            self.consume(TokenType.IDENTIFIER)
+            return node
+        raise SyntaxError(f"Expected {description}, got {self.current_token.type}")
+
 # SQL Generator
+def normalize_sql(query: str) -> str:
+    # Collapses whitespace outside string literals and drops trailing semicolons,
+    # so trivially different spellings of a query share one cache entry
+    parts = re.split(r"('[^']*'|\"[^\"]*\")", query)
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r"\s+", " ", parts[i])
+    return "".join(parts).strip().rstrip(";").strip()
+
+class ASTCache:
+    # Bounded LRU map from normalized query text to the parsed statements.
+    # Safe to share between threads; cached statements are only read.
+    def __init__(self, capacity: int = 128):
+        self.capacity = capacity
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[List[ASTNode]]:
+        with self._lock:
+            statements = self.entries.get(key)
+            if statements is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return statements
+
+    def put(self, key: str, statements: List[ASTNode]) -> None:
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self.entries[key] = statements
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
 class SQLGenerator:
-    def __init__(self, db):
+    def __init__(self, db, cache_size: int = 128):
         self.db = db
         self.lexer = None
         self.parser = Parser
+        self.ast_cache = ASTCache(cache_size)
 
     def execute_without_cursor(self, query: str):
+        # Statements of a query seen before are taken from the AST cache instead of
+        # being parsed again; schema changes (CREATE/DROP TABLE or INDEX) clear it
+        schema_version = self.db.schema_version
+        cache_key = normalize_sql(query)
+        statements = self.ast_cache.get(cache_key)
+        if statements is not None:
+            results = [self.execute_statement(ast) for ast in statements]
+        else:
+            results = self.parse_and_execute(query, cache_key)
+        if self.db.schema_version != schema_version:
+            self.ast_cache.clear()
+
+        # For simplicity in the UI, return the result of the last executed statement
+        # In a real application, you might return all results
+        if results:
+            return results[-1]
+        return None # Or some other indicator for no statements executed
+
+    def execute_statement(self, ast: ASTNode):
+        try:
+            return self.db.execute_query(ast)
+        except Exception as e:
+            print(f"Execution error: {e}")
+            return False
+
+    def parse_and_execute(self, query: str, cache_key: str) -> List[Any]:
         results = []
+        statements = []
+        cacheable = True
         lexer = Lexer(query)
         parser = self.parser(lexer)
 
         while parser.current_token.type != TokenType.EOF:
             try:
+                parser.parameters = []
                 ast = parser.parse_statement()
-                if ast:
+                if ast and parser.parameters:
+                    print("Error: Statement has parameter placeholders; use prepare() and execute() instead")
+                    results.append(False)
+                    cacheable = False
+                elif ast:
+                    statements.append(ast)
                     result = self.db.execute_query(ast)
                     results.append(result)
 
@@ -702,6 +1087,7 @@ class SQLGenerator:
             except SyntaxError as e:
                 print(f"Syntax Error: {str(e)}")
                 results.append(False) # Indicate failure for this statement
+                cacheable = False
                 # Attempt to recover by advancing the lexer past the current token
                 # This might not always work for complex errors but can help with simple ones
                 parser.current_token = parser.lexer.get_next_token()
@@ -716,18 +1102,43 @@ class SQLGenerator:
             except Exception as e:
                print(f"Execution error: {e}")
                results.append(False) # Indicate failure for this statement
+               cacheable = False
                # Attempt to skip to the next semicolon or EOF on execution error
                while parser.current_token.type not in [TokenType.SEMICOLON, TokenType.EOF]:
                     parser.current_token = parser.lexer.get_next_token()
                if parser.current_token.type == TokenType.SEMICOLON:
                    parser.consume(TokenType.SEMICOLON)
 
-        # For simplicity in the UI, return the result of the last executed statement
-        # In a real application, you might return all results
-        if results:
-            return results[-1]
-        return None # Or some other indicator for no statements executed
-
+        if cacheable and statements:
+            self.ast_cache.put(cache_key, statements)
+        return results
+
+
+    def prepare(self, query: str):
+        # Lexes and parses a single statement once; the returned statement object
+        # (see Database.prepare) is executed with parameter values as often as needed
+        ast, parameters = self.parse_single_statement(query, "prepared")
+        return self.db.prepare(ast, parameters)
+
+    def open_cursor(self, query: str):
+        # Returns a cursor (see Database.open_cursor) whose rows are computed as
+        # they are fetched, or None if the query cannot be planned
+        ast, parameters = self.parse_single_statement(query, "opened as a cursor")
+        if parameters:
+            raise SyntaxError("Statement has parameter placeholders; use prepare() and execute() instead")
+        return self.db.open_cursor(ast)
+
+    def parse_single_statement(self, query: str, purpose: str) -> Tuple[ASTNode, List[ASTNode]]:
+        # The statement's AST and its parameter placeholders
+        parser = self.parser(Lexer(query))
+        ast = parser.parse_statement()
+        if ast is None:
+            raise SyntaxError(f"No statement to be {purpose}")
+        if parser.current_token.type == TokenType.SEMICOLON:
+            parser.consume(TokenType.SEMICOLON)
+        if parser.current_token.type != TokenType.EOF:
+            raise SyntaxError(f"Only one statement can be {purpose}, found more at line {parser.current_token.line}, column {parser.current_token.column}")
+        return ast, parser.parameters
 
     def tokenize(self, query: str):
         self.lexer = Lexer(query)
@@ -751,6 +1162,14 @@ class SQLGenerator:
             return self.generate_create(ast)
         elif ast.type == NodeType.DROP_STMT:
             return self.generate_drop(ast)
+        elif ast.type == NodeType.CREATE_INDEX_STMT:
+            return self.generate_create_index(ast)
+        elif ast.type == NodeType.DROP_INDEX_STMT:
+            return self.generate_drop_index(ast)
+        elif ast.type == NodeType.EXPLAIN_STMT:
+            return self.generate_explain(ast)
+        elif ast.type == NodeType.COPY_STMT:
+            return self.generate_copy(ast)
         else:
             raise ValueError(f"Unsupported AST node type: {ast.type}")
 
@@ -768,8 +1187,26 @@ class SQLGenerator:
             sql += " WHERE "
             sql += self.generate_condition(ast.data['where_clause'])
 
+        if ast.data.get('group_by'):
+            sql += " GROUP BY " + ", ".join(self.generate_expression(expr) for expr in ast.data['group_by'])
+
+        if ast.data.get('having'):
+            sql += " HAVING " + self.generate_condition(ast.data['having'])
+
+        if ast.data.get('order_by'):
+            sql += " ORDER BY " + self.generate_order_by(ast.data['order_by'])
+
+        if ast.data.get('limit') is not None:
+            sql += f" LIMIT {ast.data['limit']}"
+        if ast.data.get('offset'):
+            sql += f" OFFSET {ast.data['offset']}"
+
         return sql
 
+    def generate_order_by(self, order_by: List[ASTNode]) -> str:
+        return ", ".join(self.generate_expression(item.data['expression']) + (" DESC" if item.data['descending'] else "")
+                         for item in order_by)
+
     def generate_column_list(self, columns: List[ASTNode]) -> str:
         if not columns:
             return "*"
@@ -799,6 +1236,9 @@ class SQLGenerator:
 
     def generate_condition(self, condition: ASTNode) -> str:
         if condition.type == NodeType.CONDITION:
+            if condition.data.get('operator') in (TokenType.AND, TokenType.OR):
+                operator = self.token_type_to_string(condition.data['operator'])
+                return f"{self.generate_logical_operand(condition.data['left'])} {operator} {self.generate_logical_operand(condition.data['right'])}"
             left = self.generate_expression(condition.data['left'])
             if 'operator' in condition.data and 'right' in condition.data:
                 operator = self.token_type_to_string(condition.data['operator'])
@@ -809,19 +1249,40 @@ class SQLGenerator:
         else:
             return self.generate_expression(condition)
 
+    def generate_logical_operand(self, condition: ASTNode) -> str:
+        # Nested AND/OR is parenthesized, like nested arithmetic in generate_operand
+        sql = self.generate_condition(condition)
+        if condition.type == NodeType.CONDITION and condition.data.get('operator') in (TokenType.AND, TokenType.OR):
+            return f"({sql})"
+        return sql
+
     def generate_expression(self, expr: ASTNode) -> str:
         if expr.type == NodeType.IDENTIFIER:
             return expr.data['name']
         elif expr.type == NodeType.LITERAL:
             return self.generate_literal(expr)
+        elif expr.type == NodeType.PARAMETER:
+            return ":" + expr.data['name'] if 'name' in expr.data else "?"
+        elif expr.type == NodeType.FUNCTION_CALL:
+            argument = expr.data['argument']
+            return f"{expr.data['name']}({'*' if argument is None else self.generate_expression(argument)})"
         elif expr.type == NodeType.EXPRESSION:
-            left = self.generate_expression(expr.data['left'])
+            if expr.data['operator'] == TokenType.DOT:
+                return f"{expr.data['left'].data['name']}.{expr.data['right'].data['name']}"
+            left = self.generate_operand(expr.data['left'])
             operator = self.token_type_to_string(expr.data['operator'])
-            right = self.generate_expression(expr.data['right'])
+            right = self.generate_operand(expr.data['right'])
             return f"{left} {operator} {right}"
         else:
             raise ValueError(f"Unsupported expression node type: {expr.type}")
 
+    def generate_operand(self, expr: ASTNode) -> str:
+        # Nested arithmetic is parenthesized so the generated SQL keeps the AST's grouping
+        sql = self.generate_expression(expr)
+        if expr.type == NodeType.EXPRESSION and expr.data['operator'] != TokenType.DOT:
+            return f"({sql})"
+        return sql
+
     def generate_literal(self, literal: ASTNode) -> str:
         if literal.data['value_type'] == TokenType.INTEGER:
             return str(literal.data['value'])
@@ -843,12 +1304,11 @@ class SQLGenerator:
             sql += self.generate_column_list(ast.data['columns'])
             sql += ")"
 
-        sql += " VALUES ("
-        value_strs = []
-        for value in ast.data['values']:
-            value_strs.append(self.generate_expression(value))
-        sql += ", ".join(value_strs)
-        sql += ")"
+        sql += " VALUES "
+        row_strs = []
+        for row in ast.data['rows']:
+            row_strs.append("(" + ", ".join(self.generate_expression(value) for value in row) + ")")
+        sql += ", ".join(row_strs)
 
         return sql
 
@@ -890,6 +1350,8 @@ class SQLGenerator:
             column_strs.append(self.generate_column_definition(column))
         sql += ", ".join(column_strs)
         sql += ")"
+        if ast.data.get('storage', "ROW") != "ROW":
+            sql += " USING " + ast.data['storage']
 
         return sql
 
@@ -943,6 +1405,37 @@ class SQLGenerator:
         sql += self.generate_table_reference(ast.data['table'])
         return sql
 
+    def generate_create_index(self, ast: ASTNode) -> str:
+        sql = "CREATE INDEX "
+        sql += self.generate_table_reference(ast.data['index'])
+        sql += " ON "
+        sql += self.generate_table_reference(ast.data['table'])
+        if ast.data.get('method', "HASH") != "HASH":
+            sql += " USING " + ast.data['method']
+        sql += " (" + self.generate_expression(ast.data['column']) + ")"
+        if ast.data.get('options'):
+            sql += " WITH (" + ", ".join(f"{name} = {value!r}" for name, value in ast.data['options'].items()) + ")"
+        return sql
+
+    def generate_drop_index(self, ast: ASTNode) -> str:
+        sql = "DROP INDEX "
+        sql += self.generate_table_reference(ast.data['index'])
+        return sql
+
+    def generate_explain(self, ast: ASTNode) -> str:
+        sql = "EXPLAIN ANALYZE " if ast.data.get('analyze') else "EXPLAIN "
+        return sql + self.generate_sql(ast.data['statement'])
+
+    def generate_copy(self, ast: ASTNode) -> str:
+        if 'query' in ast.data:
+            sql = "COPY (" + self.generate_select(ast.data['query']) + ")"
+        else:
+            sql = "COPY " + self.generate_table_reference(ast.data['table'])
+        sql += f" {ast.data['direction']} '{ast.data['path']}'"
+        if ast.data.get('header'):
+            sql += " WITH HEADER"
+        return sql
+
     def token_type_to_string(self, token_type: TokenType) -> str:
         token_strings = {
             TokenType.SELECT: "SELECT",
@@ -957,6 +1450,20 @@ class SQLGenerator:
             TokenType.CREATE: "CREATE",
             TokenType.TABLE: "TABLE",
             TokenType.DROP: "DROP",
+            TokenType.INDEX: "INDEX",
+            TokenType.USING: "USING",
+            TokenType.EXPLAIN: "EXPLAIN",
+            TokenType.ANALYZE: "ANALYZE",
+            TokenType.COPY: "COPY",
+            TokenType.TO: "TO",
+            TokenType.LIMIT: "LIMIT",
+            TokenType.OFFSET: "OFFSET",
+            TokenType.ORDER: "ORDER",
+            TokenType.BY: "BY",
+            TokenType.ASC: "ASC",
+            TokenType.DESC: "DESC",
+            TokenType.GROUP: "GROUP",
+            TokenType.HAVING: "HAVING",
             TokenType.JOIN: "JOIN",
             TokenType.ON: "ON",
             TokenType.AND: "AND",
@@ -1,5 +1,10 @@
 import sql_compiler as sc
+import database
 from database import Database
+from executor import SeqScan, Sort, sort_key
+from locks import ReadWriteLock
+import threading
+import time
 
 def test_sql():
     # Create a database
@@ -61,5 +66,606 @@ def test_sql():
         except Exception as e:
             print(f"Error: {str(e)}")
 
+def _run(db, sql):
+    return sc.SQLGenerator(db).execute_without_cursor(sql)
+
+def _users_db():
+    db = Database()
+    _run(db, "CREATE TABLE users (id INT, name TEXT, age INT, salary FLOAT);")
+    _run(db, "INSERT INTO users VALUES (1, 'John', 30, 50000.0);")
+    _run(db, "INSERT INTO users VALUES (2, 'Jane', 25, 60000.0);")
+    _run(db, "INSERT INTO users VALUES (3, 'Bob', 40, NULL);")
+    _run(db, "INSERT INTO users VALUES (4, 'Abhijeet', 40, 70000.0);")
+    return db
+
+def test_compiled_where_matches_interpreter():
+    db = _users_db()
+    table = db.get_table('users')
+    for where in ["age > 30", "30 < age", "age >= 30 AND salary < 65000.0",
+                  "name = 'Jane' OR age = 40", "salary != 50000.0", "age = 'x'"]:
+        ast = sc.Parser(sc.Lexer(f"SELECT * FROM users WHERE {where}")).parse_statement()
+        condition = ast.data['where_clause']
+        predicate = db._compile_where(condition, table)
+        expected = [bool(db._evaluate_condition(condition, table, row)) for row in table.rows]
+        assert [bool(predicate(row)) for row in table.rows] == expected, where
+
+def test_hash_index_lookup_and_maintenance():
+    db = _users_db()
+    assert _run(db, "CREATE INDEX idx_users_age ON users (age);") is True
+    table = db.get_table('users')
+    where = sc.Parser(sc.Lexer("SELECT * FROM users WHERE age = 40")).parse_statement().data['where_clause']
+    assert db._index_lookup(where, table) == [2, 3]
+
+    _run(db, "UPDATE users SET age = 41 WHERE id = 3;")
+    assert _run(db, "SELECT id FROM users WHERE age = 40;") == (['id'], [[4]])
+    _run(db, "DELETE FROM users WHERE age = 25;")
+    assert _run(db, "SELECT id FROM users WHERE age = 41;") == (['id'], [[3]])
+    # The update appended a new version of row 3; vacuum drops the old versions and renumbers
+    assert table.indexes['idx_users_age'].lookup(41) == [4]
+    db.vacuum()
+    assert table.indexes['idx_users_age'].lookup(41) == [2]
+    assert _run(db, "DROP INDEX idx_users_age;") is True
+    assert not table.indexes
+
+def test_ordered_index_range_lookup():
+    db = _users_db()
+    assert _run(db, "CREATE INDEX idx_users_age ON users USING BTREE (age);") is True
+    table = db.get_table('users')
+    where = sc.Parser(sc.Lexer("SELECT * FROM users WHERE age > 25 AND age <= 30")).parse_statement().data['where_clause']
+    assert db._index_lookup(where, table) == [0]
+
+    _run(db, "INSERT INTO users VALUES (5, 'Eve', 28, 40000.0);")
+    _run(db, "UPDATE users SET age = 26 WHERE id = 2;")
+    _run(db, "DELETE FROM users WHERE id = 1;")
+    # The updated row is stored as a new version, after the inserted one
+    assert _run(db, "SELECT id FROM users WHERE age > 25 AND age <= 30;") == (['id'], [[5], [2]])
+    assert _run(db, "SELECT id FROM users WHERE 40 <= age;") == (['id'], [[3], [4]])
+
+def test_columnar_table_matches_row_table():
+    row_db = _users_db()
+    col_db = Database()
+    _run(col_db, "CREATE TABLE users (id INT, name TEXT, age INT, salary FLOAT) USING COLUMNAR;")
+    for row in row_db.get_table('users').rows:
+        assert col_db.get_table('users').add_row(list(row))
+    table = col_db.get_table('users')
+    assert table.storage == "COLUMNAR"
+    assert table.vectors[1].dictionary == ['John', 'Jane', 'Bob', 'Abhijeet']
+    assert table.vectors[3].nulls.null_count == 1
+
+    for db in (row_db, col_db):
+        _run(db, "CREATE INDEX idx_users_age ON users USING BTREE (age);")
+        _run(db, "UPDATE users SET name = 'Robert', salary = 65000.0 WHERE id = 3;")
+        _run(db, "DELETE FROM users WHERE age < 30;")
+    for sql in ["SELECT * FROM users;", "SELECT name FROM users WHERE age >= 40;",
+                "SELECT id FROM users WHERE salary > 60000.0;"]:
+        assert _run(row_db, sql) == _run(col_db, sql), sql
+    assert _run(col_db, "INSERT INTO users VALUES (99999999999999999999, 'Big', 1, 1.0);") is False
+
+def test_batch_filter_matches_row_filter():
+    import vectorized
+    db = Database()
+    _run(db, "CREATE TABLE t (id INT, a INT, b FLOAT, name TEXT) USING COLUMNAR;")
+    table = db.get_table('t')
+    for i in range(100):
+        table.add_row([i, None if i % 7 == 0 else i % 5, None if i % 11 == 0 else i / 4, ['x', 'y', None][i % 3]])
+    backends = [False] + ([True] if vectorized.np is not None else [])
+    for where in ["a > 2", "a * 2 + 1 >= b", "b / a < 1.5", "a = b", "name = 'y' OR a = 0", "'x' < name AND id < 50"]:
+        condition = sc.Parser(sc.Lexer(f"SELECT * FROM t WHERE {where}")).parse_statement().data['where_clause']
+        predicate = db._compile_where(condition, table)
+        expected = [i for i, row in enumerate(table.scan_rows()) if predicate(row)]
+        for use_numpy in backends:
+            select = vectorized.BatchCompiler(table, use_numpy=use_numpy).compile_filter(condition)
+            assert select(0, 40) + select(40, 100) == expected, (where, use_numpy)
+
+def test_join_execution():
+    db = _users_db()
+    _run(db, "CREATE TABLE orders (user_id INT, total FLOAT, name TEXT);")
+    _run(db, "INSERT INTO orders VALUES (1, 10.0, 'book');")
+    _run(db, "INSERT INTO orders VALUES (4, 25.5, 'lamp');")
+    _run(db, "INSERT INTO orders VALUES (1, 7.5, 'pen');")
+    _run(db, "INSERT INTO orders VALUES (9, 3.0, 'cup');")
+
+    columns, rows = _run(db, "SELECT users.name, orders.name, total FROM users JOIN orders ON users.id = orders.user_id;")
+    assert columns == ['users.name', 'orders.name', 'total']
+    assert sorted(rows) == [['Abhijeet', 'lamp', 25.5], ['John', 'book', 10.0], ['John', 'pen', 7.5]]
+
+    # Comma joins take their join condition from WHERE; single-table conjuncts are pushed to the scans
+    assert _run(db, "SELECT id, total FROM users, orders WHERE orders.user_id = users.id AND age > 30 AND total > 5.0;") == (['id', 'total'], [[4, 25.5]])
+    # Non-equality joins fall back to a nested loop
+    assert len(_run(db, "SELECT id FROM users JOIN orders ON users.id > orders.user_id;")[1]) == 6
+    # Unqualified names that exist in both tables are rejected
+    assert _run(db, "SELECT name FROM users JOIN orders ON id = user_id;") is False
+
+def test_join_strategy_choice():
+    db = _users_db()
+    _run(db, "CREATE TABLE orders (user_id INT, total FLOAT);")
+    for i in range(40):
+        _run(db, f"INSERT INTO orders VALUES ({i % 6}, {i}.5);")
+    query = "SELECT name, total FROM users JOIN orders ON users.id = orders.user_id WHERE total < 10.0"
+    expected = sorted(_run(db, query + ";")[1])
+
+    plan = [line for [line] in _run(db, "EXPLAIN " + query + ";")[1]]
+    assert "Hash Join on users.id = orders.user_id (build: left)" in plan[1]
+
+    # A small outer input and a hash index on the inner join key favour index probes
+    _run(db, "CREATE INDEX idx_orders_user ON orders (user_id);")
+    plan = [line for [line] in _run(db, "EXPLAIN " + query + ";")[1]]
+    assert "Index Nested Loop Join" in plan[1] and "filter: total < 10.0" in plan[1]
+    assert sorted(_run(db, query + ";")[1]) == expected
+
+    # Two large inputs that can both be read in key order make the merge join cheapest
+    for i in range(5, 40):
+        _run(db, f"INSERT INTO users VALUES ({i}, 'user{i}', 20, 1000.0);")
+    expected = sorted(_run(db, query + ";")[1])
+    _run(db, "DROP INDEX idx_orders_user;")
+    _run(db, "CREATE INDEX idx_orders_user ON orders USING BTREE (user_id);")
+    _run(db, "CREATE INDEX idx_users_id ON users USING BTREE (id);")
+    plan = [line for [line] in _run(db, "EXPLAIN " + query + ";")[1]]
+    assert "Merge Join on users.id = orders.user_id (sort: none)" in plan[1]
+    assert sorted(_run(db, query + ";")[1]) == expected
+
+def test_explain_analyze():
+    db = _users_db()
+    _run(db, "CREATE INDEX idx_users_age ON users (age);")
+    columns, rows = _run(db, "EXPLAIN ANALYZE SELECT name FROM users WHERE age = 40;")
+    assert columns == ['QUERY PLAN']
+    lines = [line for [line] in rows]
+    assert lines[0].startswith("Project: name (est. rows=2) (actual rows in=2 out=2")
+    assert lines[2].startswith("    -> Index Scan on users using idx_users_age")
+    assert lines[-2] == "Rows examined: 2, rows returned: 2"
+    assert lines[-1].startswith("Execution time: ")
+    assert _run(db, "EXPLAIN DELETE FROM users;") is False
+
+def test_prepared_statements():
+    db = _users_db()
+    generator = sc.SQLGenerator(db)
+    insert = generator.prepare("INSERT INTO users (id, name, age) VALUES (?, ?, ?);")
+    for i in range(5, 9):
+        assert insert.execute((i, f"user{i}", 20 + i)) is True
+    assert insert.execute((9, "x")) is False
+
+    _run(db, "CREATE INDEX idx_users_age ON users (age);")
+    select = generator.prepare("SELECT id FROM users WHERE age = :age AND id > :min_id")
+    assert select.execute({'age': 40, 'min_id': 0}) == (['id'], [[3], [4]])
+    assert select.execute({'age': 40, 'min_id': 3}) == (['id'], [[4]])
+    assert select.execute({'age': 'old', 'min_id': 0}) == (['id'], [])
+
+    # Data and schema changes after prepare are picked up
+    generator.prepare("UPDATE users SET age = age + ? WHERE id = ?").execute((1, 4))
+    _run(db, "DROP INDEX idx_users_age;")
+    assert select.execute({'age': 41, 'min_id': 0}) == (['id'], [[4]])
+
+    # Placeholders are only accepted through prepare()
+    assert _run(db, "SELECT id FROM users WHERE age = ?;") is False
+
+def test_ast_cache():
+    db = _users_db()
+    generator = sc.SQLGenerator(db, cache_size=2)
+    query = "SELECT name FROM users WHERE age = 40;"
+    assert generator.execute_without_cursor(query) == (['name'], [['Bob'], ['Abhijeet']])
+    assert generator.execute_without_cursor("  SELECT name\n FROM users   WHERE age = 40 ") == (['name'], [['Bob'], ['Abhijeet']])
+    assert (generator.ast_cache.hits, generator.ast_cache.misses) == (1, 1)
+
+    # Least recently used entries are evicted beyond the capacity
+    generator.execute_without_cursor("SELECT id FROM users;")
+    generator.execute_without_cursor("SELECT age FROM users;")
+    assert len(generator.ast_cache) == 2 and sc.normalize_sql(query) not in generator.ast_cache.entries
+
+    # Statements with syntax errors are not cached; schema changes clear the cache
+    generator.execute_without_cursor("SELECT FROM users;")
+    assert len(generator.ast_cache) == 2
+    generator.execute_without_cursor("CREATE TABLE t (id INT);")
+    assert len(generator.ast_cache) == 0
+
+def test_multi_row_insert():
+    for storage in ("", " USING COLUMNAR"):
+        db = Database()
+        _run(db, f"CREATE TABLE t (id INT, name TEXT, score FLOAT){storage};")
+        _run(db, "CREATE INDEX idx_t_id ON t (id);")
+        assert _run(db, "INSERT INTO t VALUES (1, 'a', 1.5), (2, 'b', NULL), (3, NULL, 2);") is True
+        assert _run(db, "INSERT INTO t (name, id) VALUES ('d', 4), ('e', 5);") is True
+        assert _run(db, "SELECT id, name, score FROM t WHERE id >= 2;")[1] == [[2, 'b', None], [3, None, 2], [4, 'd', None], [5, 'e', None]]
+
+        # A bad row rejects the whole statement
+        assert _run(db, "INSERT INTO t VALUES (6, 'f', 1.0), (7, 8, 1.0);") is False
+        assert _run(db, "INSERT INTO t VALUES (6, 'f', 1.0), (7, 'g');") is False
+        assert db.get_table("t").row_count() == 5
+        assert _run(db, "SELECT name FROM t WHERE id = 5;")[1] == [['e']]
+
+def test_copy_from_csv(tmp_path):
+    path = tmp_path / "people.csv"
+    path.write_text('id,name,score\n1,"Smith, Ann",1.5\n2,,\n3,Bob,2\n')
+    for storage in ("", " USING COLUMNAR"):
+        db = Database()
+        _run(db, f"CREATE TABLE people (id INT, name TEXT, score FLOAT){storage};")
+        _run(db, "CREATE INDEX idx_people_id ON people (id);")
+        assert _run(db, f"COPY people FROM '{path}' WITH HEADER;") is True
+        assert _run(db, "SELECT * FROM people;")[1] == [[1, 'Smith, Ann', 1.5], [2, None, None], [3, 'Bob', 2.0]]
+        assert db.import_csv("people", str(path), header=True, batch_size=2) == 3
+
+        # A bad line rolls back the rows of earlier batches
+        bad = tmp_path / "bad.csv"
+        bad.write_text('7,x,1\n8,y,2\nnine,z,3\n')
+        assert db.import_csv("people", str(bad), batch_size=1) is None
+        assert db.get_table("people").row_count() == 6
+        assert _run(db, "SELECT name FROM people WHERE id = 3;")[1] == [['Bob'], ['Bob']]
+        assert _run(db, f"COPY people FROM '{tmp_path / 'missing.csv'}';") is False
+
+def test_copy_to_csv(tmp_path):
+    db = _users_db()
+    path = tmp_path / "out.csv"
+    assert _run(db, f"COPY (SELECT id, name FROM users WHERE age = 40) TO '{path}' WITH HEADER;") is True
+    assert path.read_text().splitlines() == ["id,name", "3,Bob", "4,Abhijeet"]
+
+    # A table export reads back unchanged, NULLs included
+    _run(db, "INSERT INTO users (id, name) VALUES (5, 'Eve, Jr.');")
+    assert _run(db, f"COPY users TO '{path}';") is True
+    _run(db, "CREATE TABLE copy_of_users (id INT, name TEXT, age INT, salary FLOAT);")
+    assert _run(db, f"COPY copy_of_users FROM '{path}';") is True
+    assert _run(db, "SELECT * FROM copy_of_users;") == (['id', 'name', 'age', 'salary'], db.get_table("users").rows)
+    assert db.export_csv(str(tmp_path / "none" / "x.csv"), [], []) is None
+
+def test_cursor_fetchmany():
+    db = _users_db()
+    generator = sc.SQLGenerator(db)
+    cursor = generator.open_cursor("SELECT name FROM users WHERE age >= 30;")
+    assert cursor.columns == ['name']
+    assert cursor.fetchmany(2) == [['John'], ['Bob']]
+    assert cursor.fetchone() == ['Abhijeet']
+    assert cursor.fetchmany(2) == [] and cursor.fetchone() is None
+    assert cursor.rowcount == 3
+    assert generator.open_cursor("DELETE FROM users;") is None
+
+    # Rows are computed as they are fetched: a columnar scan stops after the first chunk
+    _run(db, "CREATE TABLE numbers (n INT) USING COLUMNAR;")
+    db.get_table("numbers").add_rows([[i] for i in range(40000)])
+    cursor = generator.open_cursor("SELECT n FROM numbers WHERE n > 5")
+    assert cursor.fetchmany(3) == [[6], [7], [8]]
+    scan = cursor.plan.children[0]
+    assert scan.rows_scanned < 40000
+    cursor.close()
+    assert cursor.fetchall() == []
+
+def test_limit_offset():
+    db = _users_db()
+    assert _run(db, "SELECT id FROM users LIMIT 2;")[1] == [[1], [2]]
+    assert _run(db, "SELECT id FROM users WHERE age >= 30 LIMIT 5 OFFSET 1;")[1] == [[3], [4]]
+    assert _run(db, "SELECT id FROM users OFFSET 3;")[1] == [[4]]
+    assert _run(db, "SELECT id FROM users LIMIT 0;")[1] == []
+    assert _run(db, "SELECT id FROM users LIMIT 'x';") is False
+
+    # Through an ordered index, only offset + count index entries are read
+    _run(db, "CREATE TABLE numbers (n INT);")
+    db.get_table("numbers").add_rows([[i] for i in range(1000, 0, -1)])
+    _run(db, "CREATE INDEX idx_numbers_n ON numbers USING BTREE (n);")
+    assert _run(db, "SELECT n FROM numbers WHERE n > 10 LIMIT 3 OFFSET 2;")[1] == [[13], [14], [15]]
+    lines = [line for [line] in _run(db, "EXPLAIN ANALYZE SELECT n FROM numbers WHERE n > 10 LIMIT 3 OFFSET 2;")[1]]
+    assert lines[1].startswith("  -> Limit: 3 offset 2")
+    assert lines[-2] == "Rows examined: 5, rows returned: 3"
+
+def test_order_by():
+    db = _users_db()
+    assert _run(db, "SELECT name FROM users ORDER BY age DESC, name;")[1] == [['Abhijeet'], ['Bob'], ['John'], ['Jane']]
+    assert _run(db, "SELECT id FROM users ORDER BY salary;")[1] == [[1], [2], [4], [3]]
+    assert _run(db, "SELECT id FROM users ORDER BY salary DESC LIMIT 2 OFFSET 1;")[1] == [[4], [2]]
+    assert _run(db, "SELECT id FROM users ORDER BY missing;") is False
+    lines = [line for [line] in _run(db, "EXPLAIN SELECT id FROM users ORDER BY salary DESC LIMIT 2;")[1]]
+    assert lines[2] == "    -> Sort: salary DESC (top 2) (est. rows=2)"
+
+    # An ordered index on the sort column replaces the sort
+    _run(db, "CREATE INDEX idx_users_age ON users USING BTREE (age);")
+    lines = [line for [line] in _run(db, "EXPLAIN SELECT name FROM users ORDER BY age LIMIT 1;")[1]]
+    assert lines[2].startswith("    -> Ordered Index Scan on users using idx_users_age")
+    assert _run(db, "SELECT name FROM users ORDER BY age LIMIT 1;")[1] == [['Jane']]
+
+    # Sorts larger than the buffer spill sorted runs and merge them
+    table = db.get_table("users")
+    rows = [[i % 7, None if i % 5 == 0 else f"n{i % 3}"] for i in range(100)]
+    scan = SeqScan(table)
+    scan.rows = lambda: iter(rows)
+    sort = Sort(scan, sort_key([(1, True), (0, False)]), "", buffer_rows=8)
+    expected = sorted(rows, key=lambda row: row[0])
+    expected = [row for row in expected if row[1] is None] + sorted((row for row in expected if row[1] is not None), key=lambda row: row[1], reverse=True)
+    assert list(sort.rows()) == expected and sort.runs_spilled == 13
+
+def test_non_reserved_keywords_as_names():
+    db = Database()
+    assert _run(db, "CREATE TABLE order (index INT, group TEXT, desc INT, to INT);") is True
+    _run(db, "INSERT INTO order VALUES (1, 'a', 2, 0), (2, 'b', 1, 0), (3, 'a', 3, 1);")
+    assert _run(db, "SELECT index, group FROM order WHERE desc > 1 ORDER BY desc DESC LIMIT 5;")[1] == [[3, 'a'], [1, 'a']]
+    assert _run(db, "SELECT group, COUNT(*) FROM order GROUP BY group ORDER BY group;")[1] == [['a', 2], ['b', 1]]
+    assert _run(db, "SELECT order.index FROM order WHERE order.to = 1;")[1] == [[3]]
+    _run(db, "UPDATE order SET desc = 0, to = 2 WHERE index = 2;")
+    assert _run(db, "SELECT desc, to FROM order WHERE index = 2;")[1] == [[0, 2]]
+    assert _run(db, "CREATE INDEX by ON order USING BTREE (index);") is True
+    _run(db, "DELETE FROM order WHERE index = 1;")
+    assert _run(db, "SELECT index FROM order ORDER BY index;")[1] == [[2], [3]]
+    assert _run(db, "DROP INDEX by;") is True
+    assert _run(db, "DROP TABLE order;") is True
+
+def test_group_by_aggregates():
+    db = _users_db()
+    assert _run(db, "SELECT age, COUNT(*), AVG(salary), MAX(name) FROM users GROUP BY age ORDER BY age;") == (
+        ['age', 'COUNT(*)', 'AVG(salary)', 'MAX(name)'], [[25, 1, 60000.0, 'Jane'], [30, 1, 50000.0, 'John'], [40, 2, 70000.0, 'Bob']])
+    assert _run(db, "SELECT age FROM users GROUP BY age HAVING COUNT(salary) = 1 ORDER BY age DESC;")[1] == [[40], [30], [25]]
+    assert _run(db, "SELECT age FROM users GROUP BY age ORDER BY COUNT(*) DESC, age LIMIT 2;")[1] == [[40], [25]]
+
+    # Without GROUP BY the whole input is one group, even when it is empty
+    assert _run(db, "SELECT COUNT(*), SUM(salary), MIN(age) FROM users;")[1] == [[4, 180000.0, 25]]
+    assert _run(db, "SELECT COUNT(*), SUM(salary) FROM users WHERE age > 100;")[1] == [[0, None]]
+
+    assert _run(db, "SELECT name, COUNT(*) FROM users GROUP BY age;") is False
+    assert _run(db, "SELECT SUM(name) FROM users;") is False
+    assert _run(db, "SELECT id FROM users WHERE COUNT(*) > 1;") is False
+
+    # Grouping over a join and over columnar storage
+    _run(db, "CREATE TABLE orders (user_id INT, amount FLOAT) USING COLUMNAR;")
+    _run(db, "INSERT INTO orders VALUES (1, 10.0), (1, 5.0), (3, 7.5), (4, NULL);")
+    assert _run(db, "SELECT user_id, SUM(amount) FROM orders GROUP BY user_id HAVING SUM(amount) > 7;")[1] == [[1, 15.0], [3, 7.5]]
+    assert _run(db, "SELECT users.age, COUNT(orders.amount) FROM users JOIN orders ON users.id = orders.user_id GROUP BY users.age ORDER BY users.age;")[1] == [[30, 2], [40, 1]]
+
+def test_parallel_execution(monkeypatch):
+    monkeypatch.setattr(database, "PARALLEL_MIN_ROWS", 100)
+    monkeypatch.setattr(database, "MORSEL_SIZE", 64)
+    queries = ["SELECT b, COUNT(*), SUM(a), AVG(a), MIN(b), MAX(a) FROM t WHERE a > 3 GROUP BY b ORDER BY b;",
+               "SELECT COUNT(*), SUM(a) FROM t WHERE a > 1000;",
+               "SELECT a, b FROM t WHERE a = 7 OR b = 'y';"]
+    results = []
+    for workers in (1, 2):
+        db = Database(max_workers=workers)
+        _run(db, "CREATE TABLE t (a INT, b TEXT);")
+        db.get_table("t").add_rows([[i % 13, None if i % 7 == 0 else "xyz"[i % 3]] for i in range(500)])
+        results.append([_run(db, query) for query in queries])
+        plan = [line for [line] in _run(db, "EXPLAIN " + queries[0])[1]]
+        db.close()
+    assert results[0] == results[1]
+    assert plan[3].startswith("      -> Gather on t (2 workers, morsels of 64 rows): partial aggregate, filter: a > 3")
+
+def test_concurrent_statements():
+    db = Database()
+    _run(db, "CREATE TABLE t (n INT);")
+    generator = sc.SQLGenerator(db)
+    batch = "INSERT INTO t VALUES " + ", ".join(f"({i})" for i in range(50)) + ";"
+    counts = set()
+
+    def write():
+        for _ in range(20):
+            generator.execute_without_cursor(batch)
+            generator.execute_without_cursor("DELETE FROM t;")
+
+    def read():
+        for _ in range(20):
+            counts.add(len(generator.open_cursor("SELECT n FROM t").fetchall()))
+
+    # Writers hold the table exclusively, so readers see either none or all of a batch
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counts <= {0, 50}
+
+    # A waiting writer blocks new readers until the current ones are done
+    lock = ReadWriteLock()
+    lock.acquire_read()
+    writer = threading.Thread(target=lock.acquire_write)
+    writer.start()
+    while not lock._writers_waiting:
+        time.sleep(0.001)
+    assert not lock._writer
+    lock.release_read()
+    writer.join()
+    assert lock._writer
+
+def test_mvcc_snapshots():
+    for storage in ("", " USING COLUMNAR"):
+        db = Database(vacuum_interval=None)
+        _run(db, f"CREATE TABLE t (n INT, s TEXT){storage};")
+        _run(db, "CREATE INDEX idx_t_n ON t USING BTREE (n);")
+        table = db.get_table("t")
+        table.add_rows([[i, str(i)] for i in range(10)])
+        generator = sc.SQLGenerator(db)
+
+        # A cursor keeps reading the snapshot it was opened with
+        cursor = generator.open_cursor("SELECT n FROM t WHERE n >= 0")
+        assert cursor.fetchmany(3) == [[0], [1], [2]]
+        _run(db, "UPDATE t SET n = n + 100;")
+        _run(db, "DELETE FROM t WHERE n >= 105;")
+        _run(db, "INSERT INTO t VALUES (50, 'x');")
+        assert db.vacuum() == 0
+        assert cursor.fetchall() == [[i] for i in range(3, 10)]
+        assert _run(db, "SELECT n FROM t WHERE n >= 0;")[1] == [[100], [101], [102], [103], [104], [50]]
+
+        # A reader holding its snapshot does not hold up writers
+        with db._reading([table]) as snapshot:
+            writer = threading.Thread(target=_run, args=(db, "DELETE FROM t WHERE n = 50;"))
+            writer.start()
+            writer.join(timeout=5)
+            assert not writer.is_alive()
+            assert [row[0] for row in table.scan_rows(snapshot)] == [100, 101, 102, 103, 104, 50]
+
+        # A failed UPDATE changes nothing
+        assert _run(db, "UPDATE t SET s = 1 WHERE n = 104;") is False
+        assert _run(db, "SELECT s FROM t WHERE n = 104;")[1] == [['4']]
+
+        # Dead versions are reclaimed once no snapshot can see them
+        assert table.version_count() == 21 and table.row_count() == 5
+        assert db.vacuum() == 16
+        assert table.version_count() == 5 and table.indexes['idx_t_n'].lookup(103) == [3]
+        assert _run(db, "SELECT n FROM t WHERE n > 102;")[1] == [[103], [104]]
+
+def test_prepared_filter_after_vacuum():
+    # Vacuum re-encodes dictionary columns; compiled filters must not keep
+    # their verdicts for the old codes
+    db = Database(vacuum_interval=None)
+    _run(db, "CREATE TABLE t (id INT, name TEXT) USING COLUMNAR;")
+    _run(db, "INSERT INTO t VALUES (1, 'a'), (2, 'z'), (3, 'b');")
+    select = sc.SQLGenerator(db).prepare("SELECT id, name FROM t WHERE name > 'm'")
+    assert select.execute() == (['id', 'name'], [[2, 'z']])
+    _run(db, "DELETE FROM t WHERE id = 1;")
+    assert db.vacuum() == 1
+    assert select.execute() == (['id', 'name'], [[2, 'z']])
+    _run(db, "INSERT INTO t VALUES (4, 'y');")
+    assert select.execute() == (['id', 'name'], [[2, 'z'], [4, 'y']])
+
+def test_write_ahead_log(tmp_path):
+    path = str(tmp_path / "db.wal")
+    db = Database(vacuum_interval=None, log_path=path)
+    _run(db, "CREATE TABLE t (n INT, s TEXT, x FLOAT);")
+    _run(db, "CREATE INDEX idx_t_n ON t USING BTREE (n);")
+    _run(db, "INSERT INTO t VALUES (1, 'a', 1.5), (2, NULL, 2.5), (3, 'c', NULL);")
+    _run(db, "UPDATE t SET s = 'b' WHERE n = 2;")
+    _run(db, "DELETE FROM t WHERE n = 1;")
+    db.vacuum()
+    _run(db, "UPDATE t SET x = 9.5 WHERE n = 3;")
+    _run(db, "CREATE TABLE gone (n INT);")
+    _run(db, "DROP TABLE gone;")
+    # Failed statements are not logged
+    assert _run(db, "UPDATE t SET s = 1;") is False
+
+    # Concurrent statements share fsyncs
+    def insert(start):
+        for n in range(start, start + 20):
+            _run(db, f"INSERT INTO t VALUES ({n}, 'w', 0.5);")
+    writers = [threading.Thread(target=insert, args=(start,)) for start in range(100, 180, 20)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    assert db.wal.syncs < db.wal.records
+    expected = db.get_table("t").rows
+    db.close()
+
+    # Replay rebuilds the tables and indexes; a torn last record is dropped
+    with open(path, "ab") as file:
+        file.write(b"\x40\x00\x00\x00garbage")
+    db = Database(vacuum_interval=None, log_path=path)
+    assert list(db.tables) == ["t"]
+    assert db.get_table("t").rows == expected
+    assert expected[:2] == [[2, 'b', 2.5], [3, 'c', 9.5]]
+    assert _run(db, "SELECT s FROM t WHERE n = 2;")[1] == [['b']]
+    assert "idx_t_n" in db.get_table("t").indexes
+    db.close()
+
+def test_checkpoint_and_load(tmp_path):
+    checkpoint_path = str(tmp_path / "db.ckpt")
+    log_path = str(tmp_path / "db.wal")
+    db = Database(vacuum_interval=None, log_path=log_path)
+    _run(db, "CREATE TABLE t (n INT, s TEXT, x FLOAT);")
+    _run(db, "CREATE TABLE c (n INT, s TEXT) USING COLUMNAR;")
+    _run(db, "CREATE INDEX idx_t_n ON t USING BTREE (n);")
+    db.get_table("t").add_rows([[i, None if i % 7 == 0 else f"s{i}", i / 4] for i in range(1000)])
+    db.get_table("c").add_rows([[i, "nul\0byte" if i == 3 else None] for i in range(10)])
+    _run(db, "DELETE FROM t WHERE n >= 500;")
+    assert db.checkpoint(checkpoint_path)
+    # The log restarts from the checkpoint and only holds later changes
+    _run(db, "UPDATE c SET s = 'late' WHERE n = 9;")
+    expected = {name: table.rows for name, table in db.tables.items()}
+    db.close()
+
+    loaded = Database(vacuum_interval=None)
+    assert loaded.load(checkpoint_path)
+    assert loaded.get_table("t").rows == expected["t"]
+    assert loaded.get_table("c").storage == "COLUMNAR"
+    assert loaded.get_table("c").rows[3] == [3, "nul\0byte"]
+    assert _run(loaded, "SELECT s FROM t WHERE n = 42;")[1] == [[None]]
+    assert loaded.get_table("t").indexes["idx_t_n"].lookup(499) == [499]
+    assert not loaded.load(checkpoint_path)
+
+    reopened = Database(vacuum_interval=None, log_path=log_path)
+    assert {name: table.rows for name, table in reopened.tables.items()} == expected
+    reopened.close()
+
+def test_paged_table(tmp_path):
+    # A buffer pool of four pages, far smaller than the table
+    db = Database(vacuum_interval=None, data_dir=str(tmp_path), buffer_pool_size=4 * database.PAGE_SIZE)
+    reference = Database(vacuum_interval=None)
+    for target, storage in ((db, " USING PAGED"), (reference, "")):
+        _run(target, f"CREATE TABLE t (id INT, name TEXT, v FLOAT){storage};")
+        target.get_table("t").add_rows([[i, None if i % 13 == 0 else f"name{i % 97}", i / 4] for i in range(20000)])
+        _run(target, "INSERT INTO t VALUES (-1, 'x', 1.0);")
+        _run(target, "CREATE INDEX idx_t_id ON t USING BTREE (id);")
+        _run(target, "UPDATE t SET v = 0.0 WHERE id < 100;")
+        _run(target, "DELETE FROM t WHERE v > 4000.0;")
+    table = db.get_table("t")
+    assert table.pages.page_count > db.buffer_pool.capacity
+    assert len(list(tmp_path.iterdir())) == 1
+    for query in ["SELECT COUNT(*), SUM(v) FROM t;",
+                  "SELECT * FROM t WHERE id BETWEEN 15000 AND 15010;",
+                  "SELECT name, COUNT(*) FROM t GROUP BY name ORDER BY name LIMIT 5;",
+                  "SELECT * FROM t WHERE id = 50;"]:
+        assert _run(db, query) == _run(reference, query)
+    assert db.buffer_pool.evictions > 0
+
+    # Vacuum rewrites the data file without the dead versions
+    assert db.vacuum() == reference.vacuum() > 0
+    assert table.rows == reference.get_table("t").rows
+    assert _run(db, "SELECT * FROM t WHERE id = 16000;")[1] == [[16000, 'name92', 4000.0]]
+    _run(db, "DROP TABLE t;")
+    del table
+    assert list(tmp_path.iterdir()) == []
+
+def test_paged_index_before_bulk_insert(tmp_path):
+    # Indexes of an empty table are rebuilt from rows not yet stamped
+    db = Database(vacuum_interval=None, data_dir=str(tmp_path))
+    _run(db, "CREATE TABLE t (id INT, name TEXT) USING PAGED;")
+    _run(db, "CREATE INDEX idx_t_id ON t (id);")
+    _run(db, "CREATE INDEX idx_t_name ON t USING BTREE (name);")
+    _run(db, "INSERT INTO t VALUES (1, 'a'), (2, 'b'), (3, 'c');")
+    assert _run(db, "SELECT * FROM t WHERE id = 2;") == (['id', 'name'], [[2, 'b']])
+    assert _run(db, "SELECT id FROM t WHERE name >= 'b';") == (['id'], [[2], [3]])
+
+def test_zone_maps():
+    db, reference = Database(vacuum_interval=None), Database(vacuum_interval=None)
+    for target, storage in ((db, " USING COLUMNAR"), (reference, "")):
+        _run(target, f"CREATE TABLE t (id INT, name TEXT){storage};")
+        target.get_table("t").add_rows([[i, None if i % 3 else f"n{i}"] for i in range(20000)])
+        _run(target, "UPDATE t SET id = 20005 WHERE id = 5;")
+    for target in (db, reference):
+        lines = [line for [line] in _run(target, "EXPLAIN ANALYZE SELECT id FROM t WHERE id >= 19000 AND id < 30000;")[1]]
+        assert "row groups skipped=4 of 5" in "\n".join(lines)
+    for query in ["SELECT * FROM t WHERE id > 16000 AND name = 'n17001';",
+                  "SELECT id FROM t WHERE 20005 = id;",
+                  "SELECT COUNT(id) FROM t WHERE name < 'n2';"]:
+        assert _run(db, query) == _run(reference, query)
+
+    # Deletes and vacuum keep the statistics safe to skip by; so do parameters
+    _run(reference, "DELETE FROM t WHERE id > 4000;")
+    assert reference.vacuum() == 16000 + 1
+    _run(reference, "INSERT INTO t VALUES (50000, NULL);")
+    select = sc.SQLGenerator(reference).prepare("SELECT id FROM t WHERE id > ?")
+    assert select.execute((3998,)) == (['id'], [[3999], [4000], [50000]])
+    assert select.execute((None,)) == (['id'], [])
+
+def test_bloom_filters(tmp_path):
+    log_path = str(tmp_path / "db.log")
+    db, reference = Database(vacuum_interval=None, log_path=log_path), Database(vacuum_interval=None)
+    names = [f"user{(i * 7919) % 20000}" for i in range(20000)]
+    for target in (db, reference):
+        _run(target, "CREATE TABLE t (id INT, name TEXT);")
+        target.get_table("t").add_rows([[i, name] for i, name in enumerate(names)])
+    assert _run(db, "CREATE INDEX idx_t_name ON t USING BLOOM (name) WITH (false_positive_rate = 0.001);") is True
+    assert _run(db, "CREATE INDEX idx_t_id ON t USING HASH (id) WITH (false_positive_rate = 0.1);") is False
+    assert _run(db, "CREATE INDEX idx_t_id ON t USING BLOOM (id) WITH (false_positive_rate = 1.5);") is False
+    _run(db, "INSERT INTO t VALUES (20000, 'Abhijeet');")
+    _run(reference, "INSERT INTO t VALUES (20000, 'Abhijeet');")
+
+    # Zone maps cannot narrow an unordered column; the Bloom filters can
+    lines = [line for [line] in _run(db, "EXPLAIN ANALYZE SELECT id FROM t WHERE name = 'user12345';")[1]]
+    assert "row groups skipped=4 of 5 (4 by Bloom filter)" in "\n".join(lines)
+    for query in ["SELECT id FROM t WHERE name = 'user12345';",
+                  "SELECT id FROM t WHERE name = 'Abhijeet';",
+                  "SELECT id FROM t WHERE name = 'nobody';"]:
+        assert _run(db, query) == _run(reference, query)
+    select = sc.SQLGenerator(db).prepare("SELECT id FROM t WHERE ? = name")
+    assert select.execute(("user7919",)) == (['id'], [[1]])
+
+    # The false positive rate survives a restart
+    db.close()
+    restarted = Database(vacuum_interval=None, log_path=log_path)
+    assert restarted.get_table("t").indexes['idx_t_name'].settings() == {'false_positive_rate': 0.001}
+    assert _run(restarted, "SELECT id FROM t WHERE name = 'Abhijeet';") == (['id'], [[20000]])
+    restarted.close()
+
 if __name__ == "__main__":
     test_sql()
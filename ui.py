@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import ttk, scrolledtext, filedialog, messagebox
 import sys
 import os
+import csv
 import json
 import re
 from datetime import datetime
@@ -473,6 +474,31 @@ class SQLCompilerUI:
         # Create schema tree view
         self.create_schema_view()
         
+        # Plan tab for EXPLAIN / EXPLAIN ANALYZE output
+        self.plan_frame = ttk.Frame(self.results_notebook, style="Card.TFrame")
+        self.results_notebook.add(self.plan_frame, text="Plan")
+        
+        plan_container = ttk.Frame(self.plan_frame)
+        plan_container.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+        
+        self.plan_text = tk.Text(
+            plan_container,
+            font=("Cascadia Code", 11),
+            wrap=tk.NONE,
+            background="white",
+            foreground="#1F2937",
+            borderwidth=1,
+            relief=tk.SOLID,
+            highlightthickness=0,
+            state=tk.DISABLED
+        )
+        plan_y_scrollbar = ttk.Scrollbar(plan_container, orient=tk.VERTICAL, command=self.plan_text.yview)
+        plan_x_scrollbar = ttk.Scrollbar(plan_container, orient=tk.HORIZONTAL, command=self.plan_text.xview)
+        self.plan_text.config(yscrollcommand=plan_y_scrollbar.set, xscrollcommand=plan_x_scrollbar.set)
+        plan_y_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        plan_x_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.plan_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
         # Status bar with improved styling
         status_frame = ttk.Frame(self.root, style="TFrame")
         status_frame.pack(side=tk.BOTTOM, fill=tk.X)
@@ -519,7 +545,7 @@ class SQLCompilerUI:
             "JOIN", "INNER", "LEFT", "RIGHT", "OUTER", "ON", "GROUP", "BY", "HAVING", "ORDER",
             "ASC", "DESC", "LIMIT", "OFFSET", "UNION", "ALL", "DISTINCT", "AS", "CASE", "WHEN",
             "THEN", "ELSE", "END", "IF", "EXISTS", "PRIMARY", "KEY", "FOREIGN", "REFERENCES",
-            "DEFAULT", "AUTO_INCREMENT", "UNIQUE", "INDEX", "CHECK", "CONSTRAINT"
+            "DEFAULT", "AUTO_INCREMENT", "UNIQUE", "INDEX", "CHECK", "CONSTRAINT", "USING", "EXPLAIN", "ANALYZE", "COPY", "HEADER"
         ]
         
         # SQL functions
@@ -1024,8 +1050,11 @@ class SQLCompilerUI:
             self.history.append({"query": query, "timestamp": timestamp})
             self.history_list.insert(0, history_item)
             
-            # Display results
-            self.display_results(result)
+            # Display results; EXPLAIN output goes to the Plan tab
+            if isinstance(result, tuple) and len(result) == 2 and result[0] == ['QUERY PLAN']:
+                self.display_plan(result[1])
+            else:
+                self.display_results(result)
             
             # Update status
             self.status_var.set(f"Query executed successfully at {timestamp}")
@@ -1175,6 +1204,13 @@ class SQLCompilerUI:
             )
             message_label.pack(expand=True)
 
+    def display_plan(self, rows):
+        self.plan_text.config(state=tk.NORMAL)
+        self.plan_text.delete("1.0", tk.END)
+        self.plan_text.insert(tk.END, "\n".join(row[0] for row in rows))
+        self.plan_text.config(state=tk.DISABLED)
+        self.results_notebook.select(self.plan_frame)
+
     def display_error(self, error_message):
         # Clear previous results
         for widget in self.table_frame.winfo_children():
@@ -1288,20 +1324,11 @@ class SQLCompilerUI:
         
         if file_path:
             try:
-                with open(file_path, "w") as file:
-                    # Write header
-                    file.write(",".join([f'"{col}"' for col in columns]) + "\n")
-                    
-                    # Write data rows - FIXED VERSION
-                    for row in rows:
-                        csv_row = []
-                        for val in row:
-                            if val is None:
-                                csv_row.append('""')
-                            else:
-                                # Properly escape quotes by doubling them and wrap in quotes
-                                csv_row.append(f'"{str(val).replace("\"", "\"\"")}"')
-                        file.write(",".join(csv_row) + "\n")
+                with open(file_path, "w", newline="") as file:
+                    # Every field is quoted; NULLs are written as empty fields
+                    writer = csv.writer(file, quoting=csv.QUOTE_ALL)
+                    writer.writerow(columns)
+                    writer.writerows(['' if val is None else val for val in row] for row in rows)
                     
                     self.status_var.set(f"Results exported to {os.path.basename(file_path)}")
             except Exception as e:
@@ -0,0 +1,270 @@
+from itertools import compress, repeat
+from typing import List, Any, Callable, Optional, Tuple
+import operator
+import sql_compiler as sc
+from columnar import NumericColumn, DictionaryColumn, NullBitmap
+from executor import column_reference
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Number of rows evaluated per column chunk
+BATCH_SIZE = 16384
+
+BATCH_COMPARISONS = {
+    sc.TokenType.EQUALS: operator.eq,
+    sc.TokenType.NOT_EQUALS: operator.ne,
+    sc.TokenType.GREATER: operator.gt,
+    sc.TokenType.LESS: operator.lt,
+    sc.TokenType.GREATER_EQUALS: operator.ge,
+    sc.TokenType.LESS_EQUALS: operator.le,
+}
+
+BATCH_ARITHMETIC = {
+    sc.TokenType.PLUS: operator.add,
+    sc.TokenType.MINUS: operator.sub,
+    sc.TokenType.ASTERISK: operator.mul,
+}
+
+# "literal < column" is evaluated as "column > literal"
+SWAPPED_COMPARISONS = {
+    operator.gt: operator.lt,
+    operator.lt: operator.gt,
+    operator.ge: operator.le,
+    operator.le: operator.ge,
+}
+
+class NotVectorizable(Exception):
+    # Raised at compile time for conditions the batch executor cannot evaluate;
+    # callers fall back to the row-at-a-time path
+    pass
+
+class BatchCompiler:
+    """Compiles a WHERE clause over a ColumnarTable into a chunk filter.
+
+    The compiled filter takes a [start, stop) row range and returns the
+    selection vector: the positions in that range whose rows satisfy the
+    condition. Comparisons and arithmetic run over whole column chunks, with
+    NumPy when it is installed and with C-level map()/compress() otherwise.
+    NULLs never satisfy a comparison, matching the row-at-a-time executor.
+    """
+
+    def __init__(self, table, use_numpy: bool = np is not None):
+        self.table = table
+        self.use_numpy = use_numpy
+
+    def compile_filter(self, condition: sc.ASTNode) -> Callable[[int, int], List[int]]:
+        compute_mask = self._compile_mask(condition)
+        if self.use_numpy:
+            def select(start: int, stop: int) -> List[int]:
+                return (np.flatnonzero(compute_mask(start, stop)) + start).tolist()
+        else:
+            def select(start: int, stop: int) -> List[int]:
+                return list(compress(range(start, stop), compute_mask(start, stop)))
+        return select
+
+    # Masks: one boolean per row of the chunk
+
+    def _compile_mask(self, condition: sc.ASTNode) -> Callable[[int, int], Any]:
+        if condition.type != sc.NodeType.CONDITION or 'operator' not in condition.data:
+            raise NotVectorizable("bare expression used as a condition")
+        op = condition.data['operator']
+        if op in (sc.TokenType.AND, sc.TokenType.OR):
+            left = self._compile_mask(condition.data['left'])
+            right = self._compile_mask(condition.data['right'])
+            combine = operator.and_ if op == sc.TokenType.AND else operator.or_
+            if self.use_numpy:
+                return lambda start, stop: combine(left(start, stop), right(start, stop))
+            return lambda start, stop: list(map(combine, left(start, stop), right(start, stop)))
+        if op == sc.TokenType.NOT:
+            right = self._compile_mask(condition.data['right'])
+            if self.use_numpy:
+                return lambda start, stop: ~right(start, stop)
+            return lambda start, stop: [not value for value in right(start, stop)]
+        if op in BATCH_COMPARISONS:
+            return self._compile_comparison(BATCH_COMPARISONS[op], condition.data['left'], condition.data['right'])
+        raise NotVectorizable(f"unsupported operator {op}")
+
+    def _compile_comparison(self, compare: Callable[[Any, Any], Any], left_node: sc.ASTNode, right_node: sc.ASTNode) -> Callable[[int, int], Any]:
+        dictionary_comparison = self._compile_dictionary_comparison(compare, left_node, right_node)
+        if dictionary_comparison is not None:
+            return dictionary_comparison
+
+        left, left_is_scalar = self._compile_values(left_node)
+        right, right_is_scalar = self._compile_values(right_node)
+        if left_is_scalar and right_is_scalar:
+            raise NotVectorizable("comparison between two constants")
+
+        def comparison(start: int, stop: int) -> Any:
+            left_values, left_nulls = left(start, stop)
+            right_values, right_nulls = right(start, stop)
+            if self.use_numpy:
+                mask = compare(left_values, right_values)
+            elif left_is_scalar:
+                mask = list(map(compare, repeat(left_values), right_values))
+            elif right_is_scalar:
+                mask = list(map(compare, left_values, repeat(right_values)))
+            else:
+                mask = list(map(compare, left_values, right_values))
+            mask = self._exclude_nulls(mask, self._union_nulls(left_nulls, right_nulls))
+            if compare is operator.eq and left_nulls is not None and right_nulls is not None:
+                # The row executor treats NULL = NULL as true
+                mask = self._union_nulls(mask, self._intersect_nulls(left_nulls, right_nulls))
+            return mask
+        return comparison
+
+    def _compile_dictionary_comparison(self, compare: Callable[[Any, Any], Any], left_node: sc.ASTNode, right_node: sc.ASTNode) -> Optional[Callable[[int, int], Any]]:
+        # TEXT/DATE column vs string literal: the comparison is decided once per
+        # distinct dictionary entry and then looked up by code for every row
+        if left_node.type == sc.NodeType.LITERAL:
+            left_node, right_node = right_node, left_node
+            compare = SWAPPED_COMPARISONS.get(compare, compare)
+        reference = column_reference(left_node)
+        if reference is None or right_node.type != sc.NodeType.LITERAL:
+            return None
+        col_idx = self.table.get_column_index(reference[1], reference[0])
+        if col_idx == -1 or not isinstance(self.table.vectors[col_idx], DictionaryColumn):
+            return None
+        value = right_node.data['value']
+        if not isinstance(value, str):
+            raise NotVectorizable("TEXT column compared with a non-string value")
+
+        vector = self.table.vectors[col_idx]
+        if compare is operator.eq:
+            # Equality only needs the value's code, not a verdict for every
+            # dictionary entry, which is costly for high-cardinality columns
+            def equality(start: int, stop: int) -> Any:
+                code = vector.lookup.get(value)
+                codes = vector.codes[start:stop]
+                if self.use_numpy:
+                    mask = np.frombuffer(codes, dtype=f"i{codes.itemsize}") == code if code is not None else np.zeros(stop - start, dtype=bool)
+                else:
+                    mask = [entry == code for entry in codes]
+                return self._exclude_nulls(mask, self._null_mask(vector.nulls, start, stop))
+            return equality
+
+        # (dictionary the verdicts are for, verdict per code, lookup by code)
+        cache: List[Any] = [None, [], None]
+
+        def comparison(start: int, stop: int) -> Any:
+            # A dictionary only grows, so entries seen before keep their verdict;
+            # vacuum re-encodes the column into a new dictionary, which starts over
+            dictionary, qualifies, lookup = cache
+            if dictionary is not vector.dictionary:
+                dictionary, qualifies, lookup = vector.dictionary, [], None
+            if lookup is None or len(qualifies) < len(dictionary):
+                qualifies.extend(compare(entry, value) for entry in dictionary[len(qualifies):])
+                # NULL slots hold code 0 even while the dictionary is empty
+                verdicts = qualifies or [False]
+                lookup = np.array(verdicts, dtype=bool) if self.use_numpy else verdicts.__getitem__
+                cache[:] = [dictionary, qualifies, lookup]
+            codes = vector.codes[start:stop]
+            if self.use_numpy:
+                mask = lookup[np.frombuffer(codes, dtype=f"i{codes.itemsize}")]
+            else:
+                mask = list(map(lookup, codes))
+            return self._exclude_nulls(mask, self._null_mask(vector.nulls, start, stop))
+        return comparison
+
+    # Values: (chunk of values, null mask or None); scalars are returned as-is
+
+    def _compile_values(self, expr: sc.ASTNode) -> Tuple[Callable[[int, int], Tuple[Any, Any]], bool]:
+        reference = column_reference(expr)
+        if reference is not None:
+            col_idx = self.table.get_column_index(reference[1], reference[0])
+            if col_idx == -1 or not isinstance(self.table.vectors[col_idx], NumericColumn):
+                raise NotVectorizable(f"'{reference[1]}' is not a numeric column")
+            vector = self.table.vectors[col_idx]
+            return (lambda start, stop: (self._chunk(vector, start, stop), self._null_mask(vector.nulls, start, stop))), False
+        if expr.type == sc.NodeType.LITERAL:
+            value = expr.data['value']
+            if not isinstance(value, (int, float)):
+                raise NotVectorizable("non-numeric literal")
+            return (lambda start, stop: (value, None)), True
+        if expr.type == sc.NodeType.EXPRESSION:
+            return self._compile_arithmetic(expr)
+        raise NotVectorizable(f"unsupported expression {expr.type}")
+
+    def _compile_arithmetic(self, expr: sc.ASTNode) -> Tuple[Callable[[int, int], Tuple[Any, Any]], bool]:
+        op = expr.data['operator']
+        if op != sc.TokenType.DIVIDE and op not in BATCH_ARITHMETIC:
+            raise NotVectorizable(f"unsupported operator {op}")
+        left, left_is_scalar = self._compile_values(expr.data['left'])
+        right, right_is_scalar = self._compile_values(expr.data['right'])
+        if left_is_scalar and right_is_scalar:
+            raise NotVectorizable("arithmetic between two constants")
+
+        def arithmetic(start: int, stop: int) -> Tuple[Any, Any]:
+            left_values, left_nulls = left(start, stop)
+            right_values, right_nulls = right(start, stop)
+            nulls = self._union_nulls(left_nulls, right_nulls)
+            if op == sc.TokenType.DIVIDE:
+                return self._divide(left_values, left_is_scalar, right_values, right_is_scalar, nulls, stop - start)
+            apply = BATCH_ARITHMETIC[op]
+            if self.use_numpy:
+                return apply(left_values, right_values), nulls
+            if left_is_scalar:
+                return list(map(apply, repeat(left_values), right_values)), nulls
+            if right_is_scalar:
+                return list(map(apply, left_values, repeat(right_values))), nulls
+            return list(map(apply, left_values, right_values)), nulls
+        return arithmetic, False
+
+    def _divide(self, left_values: Any, left_is_scalar: bool, right_values: Any, right_is_scalar: bool, nulls: Any, length: int) -> Tuple[Any, Any]:
+        # Division by zero yields NULL, as in the row-at-a-time executor
+        if right_is_scalar:
+            if right_values == 0:
+                return (np.zeros(length) if self.use_numpy else [0.0] * length), (np.ones(length, dtype=bool) if self.use_numpy else [True] * length)
+            if self.use_numpy:
+                return left_values / right_values, nulls
+            return [value / right_values for value in left_values], nulls
+        if self.use_numpy:
+            zero = right_values == 0
+            return left_values / np.where(zero, 1, right_values), self._union_nulls(nulls, zero)
+        zero = [value == 0 for value in right_values]
+        numerators = repeat(left_values) if left_is_scalar else left_values
+        quotients = [numerator / divisor if divisor else 0.0 for numerator, divisor in zip(numerators, right_values)]
+        return quotients, self._union_nulls(nulls, zero if any(zero) else None)
+
+    # Chunk helpers
+
+    def _chunk(self, vector: NumericColumn, start: int, stop: int) -> Any:
+        # Slicing copies the chunk, so no buffer of the live table array stays exported
+        values = vector.values[start:stop]
+        if self.use_numpy:
+            return np.frombuffer(values, dtype='i8' if values.typecode == 'q' else 'f8')
+        return values
+
+    def _null_mask(self, nulls: NullBitmap, start: int, stop: int) -> Any:
+        if not nulls.null_count:
+            return None
+        bits = nulls.bits
+        if self.use_numpy:
+            first_byte = start >> 3
+            unpacked = np.unpackbits(np.frombuffer(bytes(bits[first_byte:(stop + 7) >> 3]), dtype=np.uint8), bitorder='little')
+            offset = start - (first_byte << 3)
+            return unpacked[offset:offset + stop - start].astype(bool)
+        return [(bits[i >> 3] >> (i & 7)) & 1 == 1 for i in range(start, stop)]
+
+    def _union_nulls(self, left: Any, right: Any) -> Any:
+        if left is None:
+            return right
+        if right is None:
+            return left
+        if self.use_numpy:
+            return left | right
+        return list(map(operator.or_, left, right))
+
+    def _intersect_nulls(self, left: Any, right: Any) -> Any:
+        if self.use_numpy:
+            return left & right
+        return list(map(operator.and_, left, right))
+
+    def _exclude_nulls(self, mask: Any, nulls: Any) -> Any:
+        if nulls is None:
+            return mask
+        if self.use_numpy:
+            return mask & ~nulls
+        return [value and not is_null for value, is_null in zip(mask, nulls)]
@@ -0,0 +1,375 @@
+from array import array
+from typing import Dict, List, Any, Optional, Tuple, Callable, Iterator, Sequence
+import os
+import random
+import struct
+import sys
+import threading
+import zlib
+
+# Record types
+CREATE_TABLE = 1
+DROP_TABLE = 2
+CREATE_INDEX = 3
+DROP_INDEX = 4
+INSERT = 5
+UPDATE = 6
+DELETE = 7
+# First record of every log: its id and the checkpoint it continues from
+LOG_START = 8
+
+# Every record is framed as (payload length, CRC-32 of the payload), so a
+# record torn by a crash is detected and dropped on replay
+FRAME = struct.Struct('<II')
+
+# How the values of one column of a batch of rows are encoded
+INT64_COLUMN = 0
+FLOAT64_COLUMN = 1
+TEXT_COLUMN = 2
+TAGGED_COLUMN = 3
+
+# Per-value tags of TAGGED_COLUMN, for columns mixing value types
+NULL_VALUE = 0
+INT_VALUE = 1
+FLOAT_VALUE = 2
+TEXT_VALUE = 3
+
+LITTLE_ENDIAN = sys.byteorder == 'little'
+
+class WriteAheadLog:
+    """Append-only log of committed changes, synced with group commit.
+
+    append() queues the records of a statement and returns its log sequence
+    number; wait() returns once that record is on disk. The first waiter
+    writes and fsyncs everything queued so far on behalf of all waiters, and
+    statements that queue records meanwhile are covered by the next fsync,
+    so concurrent writers share syncs instead of paying one each. Once a
+    batch is durable, on_durable is called with the write versions it
+    contained, all at once.
+
+    log_id is that of the existing log at path, as read by replay; without
+    it a new log is started.
+    """
+
+    def __init__(self, path: str, on_durable: Callable[[List[int]], None], log_id: Optional[int] = None, sync: bool = True):
+        self.path = path
+        self.on_durable = on_durable
+        self.sync = sync
+        if log_id is None:
+            self._file = None
+            self.restart('')
+        else:
+            self.log_id = log_id
+            self._file = open(path, 'ab')
+            # Bytes of the log on disk
+            self.size = os.path.getsize(path)
+        self._lock = threading.Lock()
+        self._synced = threading.Condition(self._lock)
+        self._queue: List[bytes] = []
+        self._queued_versions: List[int] = []
+        self._appended = 0
+        self._durable = 0
+        self._flushing = False
+        self._error: Optional[OSError] = None
+        # Records appended and fsyncs done, to see how well commits are grouped
+        self.records = 0
+        self.syncs = 0
+
+    def append(self, records: List[bytes], version: Optional[int] = None) -> int:
+        with self._lock:
+            self._queue.extend(map(_frame, records))
+            if version is not None:
+                self._queued_versions.append(version)
+            self._appended += 1
+            self.records += len(records)
+            return self._appended
+
+    def wait(self, lsn: int) -> None:
+        with self._lock:
+            while self._durable < lsn:
+                if self._flushing:
+                    self._synced.wait()
+                    continue
+                self._flush()
+            if self._error is not None:
+                raise self._error
+
+    def _flush(self) -> None:
+        # Called with the lock held; releases it while writing and syncing
+        batch, self._queue = self._queue, []
+        versions, self._queued_versions = self._queued_versions, []
+        target = self._appended
+        self._flushing = True
+        self._lock.release()
+        data = b''.join(batch)
+        try:
+            self._file.write(data)
+            self._file.flush()
+            if self.sync:
+                os.fsync(self._file.fileno())
+        except OSError as e:
+            self._error = e
+        finally:
+            # The changes are applied in memory either way; they must not stay in progress
+            self.on_durable(versions)
+            self._lock.acquire()
+            self._flushing = False
+        self._durable = target
+        self.size += len(data)
+        self.syncs += 1
+        self._synced.notify_all()
+
+    def flush(self) -> None:
+        # Waits until every record appended so far is durable
+        self.wait(self._appended)
+
+    def restart(self, checkpoint_path: str) -> None:
+        # Replaces the log with a new, empty one continuing from the checkpoint
+        # at checkpoint_path ('' for none). The caller makes sure every record
+        # is durable and that nothing is appended meanwhile.
+        self.log_id = random.getrandbits(63)
+        start = _frame(log_start_record(self.log_id, os.path.abspath(checkpoint_path) if checkpoint_path else ''))
+        temporary = self.path + '.tmp'
+        with open(temporary, 'wb') as file:
+            file.write(start)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.path)
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.path, 'ab')
+        self.size = len(start)
+
+    def close(self) -> None:
+        self.flush()
+        self._file.close()
+
+def read_log(path: str) -> Iterator[Tuple[int, Tuple[Any, ...]]]:
+    # (offset just past the record, decoded record), oldest first. A torn or
+    # corrupt record ends the log: the file is truncated before it, so new
+    # records follow the last good one.
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb') as file:
+        data = file.read()
+    offset = 0
+    while offset + FRAME.size <= len(data):
+        length, checksum = FRAME.unpack_from(data, offset)
+        payload = data[offset + FRAME.size:offset + FRAME.size + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            break
+        offset += FRAME.size + length
+        yield offset, decode_record(payload)
+    if offset < len(data):
+        with open(path, 'r+b') as file:
+            file.truncate(offset)
+
+def _frame(record: bytes) -> bytes:
+    return FRAME.pack(len(record), zlib.crc32(record)) + record
+
+# Records
+
+def log_start_record(log_id: int, checkpoint_path: str) -> bytes:
+    return bytes([LOG_START]) + struct.pack('<Q', log_id) + _text(checkpoint_path)
+
+def create_table_record(name: str, title: str, storage: str, columns: List[Tuple[str, str]]) -> bytes:
+    parts = [bytes([CREATE_TABLE]), _text(name), _text(title), _text(storage), struct.pack('<H', len(columns))]
+    for column_name, type_name in columns:
+        parts.append(_text(column_name))
+        parts.append(_text(type_name))
+    return b''.join(parts)
+
+def drop_table_record(name: str) -> bytes:
+    return bytes([DROP_TABLE]) + _text(name)
+
+def create_index_record(index_name: str, table_name: str, column_name: str, method: str, options: Optional[Dict[str, float]] = None) -> bytes:
+    # Numeric options (CREATE INDEX ... WITH) follow the method, if there are any
+    record = bytes([CREATE_INDEX]) + _text(index_name) + _text(table_name) + _text(column_name) + _text(method)
+    if options:
+        record += struct.pack('<H', len(options))
+        for name, value in options.items():
+            record += _text(name) + struct.pack('<d', value)
+    return record
+
+def drop_index_record(index_name: str) -> bytes:
+    return bytes([DROP_INDEX]) + _text(index_name)
+
+def insert_record(table_name: str, rows: List[List[Any]]) -> bytes:
+    return bytes([INSERT]) + _text(table_name) + encode_rows(rows)
+
+def insert_columns_record(table_name: str, columns: List[Sequence[Any]], count: int) -> bytes:
+    # Same record as insert_record, from a list of values per column
+    return bytes([INSERT]) + _text(table_name) + encode_columns(columns, count)
+
+def update_record(table_name: str, ordinals: List[int], rows: List[List[Any]]) -> bytes:
+    # Rows are identified by their ordinal among the table's live rows, which
+    # replay reproduces no matter how the stored versions were laid out
+    return bytes([UPDATE]) + _text(table_name) + _ordinals(ordinals) + encode_rows(rows)
+
+def delete_record(table_name: str, ordinals: List[int]) -> bytes:
+    return bytes([DELETE]) + _text(table_name) + _ordinals(ordinals)
+
+def decode_record(payload: bytes) -> Tuple[Any, ...]:
+    kind = payload[0]
+    offset = 1
+    if kind == CREATE_TABLE:
+        name, offset = _read_text(payload, offset)
+        title, offset = _read_text(payload, offset)
+        storage, offset = _read_text(payload, offset)
+        (count,) = struct.unpack_from('<H', payload, offset)
+        offset += 2
+        columns = []
+        for _ in range(count):
+            column_name, offset = _read_text(payload, offset)
+            type_name, offset = _read_text(payload, offset)
+            columns.append((column_name, type_name))
+        return kind, name, title, storage, columns
+    if kind in (DROP_TABLE, DROP_INDEX):
+        name, offset = _read_text(payload, offset)
+        return kind, name
+    if kind == LOG_START:
+        (log_id,) = struct.unpack_from('<Q', payload, offset)
+        checkpoint_path, offset = _read_text(payload, offset + 8)
+        return kind, log_id, checkpoint_path
+    if kind == CREATE_INDEX:
+        fields = []
+        for _ in range(4):
+            field, offset = _read_text(payload, offset)
+            fields.append(field)
+        options = {}
+        if offset < len(payload):
+            (count,) = struct.unpack_from('<H', payload, offset)
+            offset += 2
+            for _ in range(count):
+                name, offset = _read_text(payload, offset)
+                (options[name],) = struct.unpack_from('<d', payload, offset)
+                offset += 8
+        return (kind, *fields, options)
+    table_name, offset = _read_text(payload, offset)
+    if kind == INSERT:
+        rows, offset = decode_rows(payload, offset)
+        return kind, table_name, rows
+    ordinals, offset = _read_ordinals(payload, offset)
+    if kind == UPDATE:
+        rows, offset = decode_rows(payload, offset)
+        return kind, table_name, ordinals, rows
+    if kind == DELETE:
+        return kind, table_name, ordinals
+    raise ValueError(f"Unknown log record type {kind}")
+
+# Rows are encoded column by column, so that whole columns of INT, FLOAT and
+# TEXT values are packed with array/bytes operations rather than value by value
+
+def encode_rows(rows: List[List[Any]]) -> bytes:
+    return encode_columns(list(zip(*rows)), len(rows))
+
+def decode_rows(payload: bytes, offset: int) -> Tuple[List[List[Any]], int]:
+    columns, offset = decode_columns(payload, offset)
+    return [list(row) for row in zip(*columns)], offset
+
+def encode_columns(columns: List[Sequence[Any]], count: int) -> bytes:
+    # count rows given as one sequence of values per column
+    return struct.pack('<IH', count, len(columns)) + b''.join(map(_encode_column, columns))
+
+def decode_columns(payload: bytes, offset: int) -> Tuple[List[List[Any]], int]:
+    count, width = struct.unpack_from('<IH', payload, offset)
+    offset += 6
+    columns = []
+    for _ in range(width):
+        values, offset = _decode_column(payload, offset, count)
+        columns.append(values)
+    return columns, offset
+
+def _encode_column(values: Sequence[Any]) -> bytes:
+    nulls = [i for i, value in enumerate(values) if value is None]
+    present = [value for value in values if value is not None] if nulls else values
+    kinds = set(map(type, present))
+    kind = TAGGED_COLUMN
+    if kinds <= {int} and all(-2**63 <= value < 2**63 for value in present):
+        kind, packed = INT64_COLUMN, _pack_array('q', [0 if value is None else value for value in values])
+    elif kinds == {float}:
+        kind, packed = FLOAT64_COLUMN, _pack_array('d', [0.0 if value is None else value for value in values])
+    elif kinds == {str}:
+        # NUL-separated, unless a value contains NUL itself
+        text = '\0'.join(['' if value is None else value for value in values] if nulls else values).encode('utf-8')
+        if text.count(0) == len(values) - 1:
+            kind, packed = TEXT_COLUMN, struct.pack('<I', len(text)) + text
+    if kind == TAGGED_COLUMN:
+        return bytes([kind]) + b''.join(_tagged(value) for value in values)
+    return bytes([kind]) + struct.pack('<I', len(nulls)) + _pack_array('I', nulls) + packed
+
+def _decode_column(payload: bytes, offset: int, count: int) -> Tuple[List[Any], int]:
+    kind = payload[offset]
+    offset += 1
+    if kind == TAGGED_COLUMN:
+        values = []
+        for _ in range(count):
+            value, offset = _read_tagged(payload, offset)
+            values.append(value)
+        return values, offset
+    (null_count,) = struct.unpack_from('<I', payload, offset)
+    offset += 4
+    nulls, offset = _unpack_array('I', payload, offset, null_count)
+    if kind == TEXT_COLUMN:
+        (length,) = struct.unpack_from('<I', payload, offset)
+        offset += 4
+        values = payload[offset:offset + length].decode('utf-8').split('\0')
+        offset += length
+    else:
+        values, offset = _unpack_array('q' if kind == INT64_COLUMN else 'd', payload, offset, count)
+    for i in nulls:
+        values[i] = None
+    return values, offset
+
+def _pack_array(typecode: str, values: List[Any]) -> bytes:
+    packed = array(typecode, values)
+    if not LITTLE_ENDIAN:
+        packed.byteswap()
+    return packed.tobytes()
+
+def _unpack_array(typecode: str, payload: bytes, offset: int, count: int) -> Tuple[List[Any], int]:
+    unpacked = array(typecode)
+    end = offset + unpacked.itemsize * count
+    unpacked.frombytes(payload[offset:end])
+    if not LITTLE_ENDIAN:
+        unpacked.byteswap()
+    return unpacked.tolist(), end
+
+def _tagged(value: Any) -> bytes:
+    if value is None:
+        return bytes([NULL_VALUE])
+    if isinstance(value, int):
+        # Arbitrary precision, as row tables allow
+        encoded = str(value).encode('ascii')
+        return bytes([INT_VALUE]) + struct.pack('<I', len(encoded)) + encoded
+    if isinstance(value, float):
+        return bytes([FLOAT_VALUE]) + struct.pack('<d', value)
+    return bytes([TEXT_VALUE]) + _text(value)
+
+def _read_tagged(payload: bytes, offset: int) -> Tuple[Any, int]:
+    tag = payload[offset]
+    offset += 1
+    if tag == NULL_VALUE:
+        return None, offset
+    if tag == INT_VALUE:
+        text, offset = _read_text(payload, offset)
+        return int(text), offset
+    if tag == FLOAT_VALUE:
+        return struct.unpack_from('<d', payload, offset)[0], offset + 8
+    return _read_text(payload, offset)
+
+def _text(value: str) -> bytes:
+    encoded = value.encode('utf-8')
+    return struct.pack('<I', len(encoded)) + encoded
+
+def _read_text(payload: bytes, offset: int) -> Tuple[str, int]:
+    (length,) = struct.unpack_from('<I', payload, offset)
+    offset += 4
+    return payload[offset:offset + length].decode('utf-8'), offset + length
+
+def _ordinals(ordinals: List[int]) -> bytes:
+    return struct.pack('<I', len(ordinals)) + _pack_array('Q', ordinals)
+
+def _read_ordinals(payload: bytes, offset: int) -> Tuple[List[int], int]:
+    (count,) = struct.unpack_from('<I', payload, offset)
+    return _unpack_array('Q', payload, offset + 4, count)
@@ -0,0 +1,127 @@
+from itertools import islice
+from typing import List, Any, Tuple, Callable, Iterable, Iterator, Sequence
+import sql_compiler as sc
+
+# Rows per row group
+ROW_GROUP_SIZE = 4096
+
+# Whether a row group whose non-NULL values lie within [low, high] can hold a
+# value satisfying "value <op> operand"
+MAY_MATCH = {
+    sc.TokenType.EQUALS: lambda low, high, operand: low <= operand <= high,
+    sc.TokenType.GREATER: lambda low, high, operand: high > operand,
+    sc.TokenType.GREATER_EQUALS: lambda low, high, operand: high >= operand,
+    sc.TokenType.LESS: lambda low, high, operand: low < operand,
+    sc.TokenType.LESS_EQUALS: lambda low, high, operand: low <= operand,
+}
+
+# A prunable comparison: (column index, operator, function returning the operand,
+# or None when the comparison cannot be used to skip row groups right now)
+ZoneTerm = Tuple[int, sc.TokenType, Callable[[], Any]]
+
+class ZoneMap:
+    """Minimum, maximum and NULL count per column of each row group.
+
+    Row groups are consecutive runs of ROW_GROUP_SIZE row positions. The
+    statistics cover every stored row version, live or not, so updates and
+    deletes (which append versions and stamp old ones) only ever make them
+    looser, never wrong; vacuum rebuilds them. Each group's statistics for
+    a column are one (min, max, null count) tuple, replaced whole, so
+    readers never see half an update.
+    """
+
+    def __init__(self, column_count: int, group_size: int = ROW_GROUP_SIZE):
+        self.group_size = group_size
+        self.stats: List[List[Tuple[Any, Any, int]]] = [[] for _ in range(column_count)]
+        self.row_count = 0
+
+    def extend(self, rows: List[List[Any]]) -> None:
+        # Rows appended at the next positions
+        self.extend_columns(list(zip(*rows)), len(rows))
+
+    def extend_columns(self, columns: List[Sequence[Any]], count: int) -> None:
+        offset = 0
+        while offset < count:
+            group, used = divmod(self.row_count, self.group_size)
+            take = min(self.group_size - used, count - offset)
+            for stats, values in zip(self.stats, columns):
+                chunk = values[offset:offset + take]
+                nulls = chunk.count(None)
+                if nulls:
+                    chunk = [value for value in chunk if value is not None]
+                low, high = (min(chunk), max(chunk)) if chunk else (None, None)
+                if used:
+                    old_low, old_high, old_nulls = stats[group]
+                    if old_low is not None:
+                        low = old_low if low is None else min(low, old_low)
+                        high = old_high if high is None else max(high, old_high)
+                    stats[group] = (low, high, nulls + old_nulls)
+                else:
+                    stats.append((low, high, nulls))
+            self.row_count += take
+            offset += take
+
+    def rebuild(self, rows: Iterable[List[Any]]) -> None:
+        # Recomputes the statistics from every stored row version
+        self.stats = [[] for _ in self.stats]
+        self.row_count = 0
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.group_size))
+            if not chunk:
+                return
+            self.extend(chunk)
+
+class ZoneFilter:
+    # The comparisons of a WHERE clause that a scan checks against the zone map
+    # of its table, and for equality against the table's Bloom filters on the
+    # column; description is their SQL text, for EXPLAIN
+    def __init__(self, terms: List[ZoneTerm], description: str):
+        self.terms = terms
+        self.description = description
+
+    def ranges(self, table: Any, count: int) -> Tuple[List[Tuple[int, int]], int, int, int]:
+        # ([start, stop) position ranges of the row groups below count that may
+        # hold rows satisfying every term, consecutive groups merged; number of
+        # groups; groups skipped; of those, groups only Bloom filters ruled out)
+        zone_map = table.zone_map
+        checks, blooms = [], []
+        for col_idx, op, operand in self.terms:
+            value = operand()
+            if value is None:
+                continue
+            checks.append((zone_map.stats[col_idx], MAY_MATCH[op], value))
+            if op == sc.TokenType.EQUALS:
+                blooms.extend((bloom, value) for bloom in table.bloom_filters(col_idx))
+        size = zone_map.group_size
+        groups = -(-count // size)
+        ranges: List[Tuple[int, int]] = []
+        skipped = bloom_skipped = 0
+        for group in range(groups):
+            if not all(_may_match(stats, group, may_match, value) for stats, may_match, value in checks):
+                skipped += 1
+                continue
+            if not all(bloom.may_contain(group, value) for bloom, value in blooms):
+                skipped += 1
+                bloom_skipped += 1
+                continue
+            start, stop = group * size, min((group + 1) * size, count)
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], stop)
+            else:
+                ranges.append((start, stop))
+        return ranges, groups, skipped, bloom_skipped
+
+def _may_match(stats: List[Tuple[Any, Any, int]], group: int, may_match: Callable[[Any, Any, Any], bool], value: Any) -> bool:
+    if group >= len(stats):
+        # Statistics still being added by a writer
+        return True
+    low, high, _ = stats[group]
+    # A group of NULLs matches no comparison with a value
+    return low is not None and may_match(low, high, value)
+
+def split_ranges(ranges: Iterable[Tuple[int, int]], size: int) -> Iterator[Tuple[int, int]]:
+    # Cuts position ranges into pieces of at most size positions
+    for start, stop in ranges:
+        for piece in range(start, stop, size):
+            yield piece, min(piece + size, stop)